@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Computer-controlled narwhal for single-player matches
+#
+# Every tick the bot sets its narwhal's turn within a fixed time budget:
+#
+#   reactive  Point the horn at where the nearest opponent's heart (its pos,
+#             which is what horn hits are scored against) will be, and swerve
+#             when the water ahead of the horn is blocked. When obstacles make
+#             the way round clearly longer than the straight line, follow the
+#             navigation flow field toward the opponent instead (nav_field.py;
+#             fields are built with the budget left over, over several ticks
+#             when need be). A few microseconds.
+#   search    Spend what is left of the budget on lookahead: MatchBranch forks
+#             that hold a left, straight or right turn for BOT_HOLD ticks and
+#             then swim straight to BOT_HORIZON, while the opponents keep the
+#             turn they had. Branches are stepped a few ticks per frame, so one
+#             search spans several frames. A candidate that scores more hits (or
+#             takes fewer) than holding the reactive turn, for instance through a
+#             bounce that swings the horn round, becomes the plan for the held
+#             ticks the game has not passed yet.
+#
+# A branch step is only started when its measured cost still fits in the
+# budget, and a search only when all of it fits in the first half of the
+# ticks its plan would cover. On a slow machine or a small budget the bot stops searching
+# and plays on the reactive steering alone.
+import math
+import time
+
+import fast_math
+from match_state import MatchBranch
+from nav_field import nav_grid
+
+BOT_BUDGET_US = 2000   # Hard limit per tick (an eighth of a 60 FPS frame)
+BOT_HOLD = 15          # Ticks a candidate turn is held
+BOT_HORIZON = 45       # Ticks each branch is simulated
+BOT_CHUNK = 5          # Most ticks per branch step: what one underestimate can overrun by
+BOT_TURNS = (-1, 0, 1)
+BOT_SWERVE = 35        # Degrees either side probed when the way ahead is blocked
+BOT_DEADBAND = 3       # Degrees off target that are not worth a turn
+NAV_DETOUR = 96        # World units the way round must add before the flow field is followed
+SEARCH_MARGIN = 0.25   # Share of the budget kept back for timing noise
+
+class BotController:
+    def __init__(self, player, step, budget_us=BOT_BUDGET_US):
+        # step is starwhals.step_players, run headless in the lookahead branches
+        self.player = player
+        self.step = step
+        self.budget_us = budget_us
+        self.tick_cost = 50e-6    # Seconds per branch tick, refined as branches run
+        self.call_cost = 30e-6    # Seconds a branch step costs besides its ticks
+        self.floors = (self.tick_cost, self.call_cost)  # Cheapest of each measured so far
+        self.search = None        # [turn, branch, ticks simulated] candidates being stepped
+        self.search_age = 0       # Game ticks since the search started
+        self.search_turn = 0      # Reactive turn when the search started
+        self.plan = None          # (turn, ticks left)
+        self.decision_time = 0.0  # Seconds spent on the last tick
+        self.mode = "reactive"    # What the last tick's turn came from: "reactive", "flow" or "plan"
+        self.nav = None           # NavGrid of the layout passed to prepare()
+        self.nav_obstacles = None
+        self.nav_field = None     # Latest complete field toward the target's goal cell
+
+    def prepare(self, obstacles, world_size):
+        # Look up (or build) the navigation grid for a fixed layout, outside the tick budget
+        self.nav = bot_nav_grid(self.player, obstacles, world_size)
+        self.nav_obstacles = obstacles if self.nav is not None else None
+        self.nav_field = None
+
+    def update(self, players, obstacles, world_size):
+        start = time.perf_counter()
+        deadline = start + self.budget_us * 1e-6
+        search_deadline = deadline - self.budget_us * 1e-6 * SEARCH_MARGIN
+        me = self.player
+        opponents = [player for player in players if player is not me and player.health > 0]
+        if me.health <= 0 or not opponents:
+            me.turn = 0
+            self.search = self.plan = None
+            self.decision_time = time.perf_counter() - start
+            return
+        target = min(opponents, key=lambda player: math.dist(player.pos, me.pos))
+        turn = self.reactive(me, target, obstacles, world_size)
+
+        if self.plan is not None:
+            plan_turn, left = self.plan
+            if left > 0 and not self.blocked(me, me.angle, obstacles, world_size):
+                turn = plan_turn
+                self.mode = "plan"
+                self.plan = (plan_turn, left - 1)
+            else:
+                self.plan = None
+
+        if self.nav is not None and obstacles is self.nav_obstacles:
+            # Work on the field toward the target's goal cell; until it is complete the
+            # last one (a goal cell the target was in moments ago) stands in
+            field = self.nav.field(self.nav.goal_of(*target.pos))
+            if field.advance(search_deadline):
+                self.nav_field = field
+
+        if self.search is not None and self.search_age >= BOT_HOLD:
+            self.search = None  # Too late to follow any of it
+        if self.search is None:
+            if self.search_fits(search_deadline - time.perf_counter()):
+                self.start_search(players, obstacles, world_size, turn)
+            else:
+                # Reactive only. Let estimates inflated by a stall (GC, a busy CPU) come
+                # back down, but no further than this machine has shown it can go.
+                self.tick_cost = max(self.tick_cost * 0.95, self.floors[0])
+                self.call_cost = max(self.call_cost * 0.95, self.floors[1])
+        if self.search is not None:
+            self.search_age += 1
+            self.advance_search(players.index(me), search_deadline)
+            if self.search_ticks >= BOT_HORIZON:
+                self.finish_search(players.index(me))
+
+        me.turn = turn
+        self.decision_time = time.perf_counter() - start
+
+    def reactive(self, me, target, obstacles, world_size):
+        # Lead the heart by the time the horn needs to get there
+        tip_x, tip_y = me.get_horn_tip()
+        closing = max(fast_math.length(me.vel[0], me.vel[1]), 1.0)
+        lead = min(math.dist((tip_x, tip_y), target.pos) / closing, 30)
+        aim_x = target.pos[0] + target.vel[0] * lead
+        aim_y = target.pos[1] + target.vel[1] * lead
+        aim = fast_math.heading(aim_x - me.pos[0], aim_y - me.pos[1])
+        self.mode = "reactive"
+        if self.nav_field is not None and obstacles is self.nav_obstacles:
+            # Obstacles in the way: swim round them along the flow field
+            path = self.nav_field.path_length(me.pos[0], me.pos[1])
+            if path is not None and path > math.dist(me.pos, target.pos) + NAV_DETOUR:
+                flow = self.nav_field.flow(me.pos[0], me.pos[1])
+                if flow is not None:
+                    aim = flow
+                    self.mode = "flow"
+        error = fast_math.wrap_degrees(aim - me.angle)
+        turn = 0 if abs(error) < BOT_DEADBAND else (1 if error > 0 else -1)
+        if self.blocked(me, me.angle, obstacles, world_size):
+            # Swerve to whichever side is open, preferring the side the target is on
+            sides = (1, -1) if error >= 0 else (-1, 1)
+            open_sides = [side for side in sides
+                          if not self.blocked(me, me.angle + side * BOT_SWERVE, obstacles, world_size)]
+            turn = (open_sides or sides)[0]
+        return turn
+
+    def blocked(self, me, angle, obstacles, world_size):
+        # Obstacle or wall where the horn will be in a few ticks at this heading
+        direction_x, direction_y = fast_math.direction(angle)
+        reach = me.length / 2 + me.horn_length + fast_math.length(me.vel[0], me.vel[1]) * 8
+        x = me.pos[0] + direction_x * reach
+        y = me.pos[1] + direction_y * reach
+        if world_size is not None and not (0 < x < world_size[0] and 0 < y < world_size[1]):
+            return True
+        return len(obstacles.near(x, y, me.width)) > 0
+
+    def search_fits(self, available):
+        # Whether a whole search fits in what this tick leaves, every tick, within half
+        # the hold, so that its plan still has ticks to be followed for
+        steps = len(BOT_TURNS) * math.ceil(BOT_HORIZON / BOT_CHUNK)
+        cost = len(BOT_TURNS) * BOT_HORIZON * self.tick_cost + (steps + 1) * self.call_cost
+        return available > self.call_cost and available * (BOT_HOLD // 2) > cost
+
+    def start_search(self, players, obstacles, world_size, reactive_turn):
+        # The root copies the narwhals now (the match moves on under the search);
+        # it takes about as long as the fixed part of a branch step
+        start = time.perf_counter()
+        root = MatchBranch(players, obstacles, world_size, self.step)
+        root.step([None] * len(players), 0)
+        self.search = [[turn, root.fork(), 0] for turn in BOT_TURNS]
+        self.call_cost = time.perf_counter() - start
+        self.floors = (self.floors[0], min(self.floors[1], self.call_cost))
+        self.search_age = 0
+        self.search_turn = reactive_turn
+
+    def advance_search(self, index, deadline):
+        # Step the candidate furthest behind, a chunk at a time, while the budget
+        # left covers the estimated cost
+        while True:
+            candidate = min(self.search, key=lambda candidate: candidate[2])
+            turn, branch, done = candidate
+            if done >= BOT_HORIZON:
+                return
+            ticks = int((deadline - time.perf_counter() - self.call_cost) / self.tick_cost)
+            ticks = min(ticks, BOT_CHUNK, (BOT_HOLD if done < BOT_HOLD else BOT_HORIZON) - done)
+            if ticks <= 0:
+                return
+            turns = [None] * len(branch.players)
+            turns[index] = turn if done < BOT_HOLD else 0
+            start = time.perf_counter()
+            branch.step(turns, ticks)
+            measured = max(time.perf_counter() - start - self.call_cost, 0) / ticks
+            # Rise at once and come down slowly: ticks with contacts cost far more than open water
+            self.tick_cost = max(measured, self.tick_cost * 0.9 + measured * 0.1, 1e-6)
+            self.floors = (min(self.floors[0], self.tick_cost), self.floors[1])
+            candidate[2] += ticks
+
+    @property
+    def search_ticks(self):
+        return min(candidate[2] for candidate in self.search) if self.search is not None else 0
+
+    def finish_search(self, index):
+        # Hits scored minus hits taken in each candidate. Only a candidate that beats
+        # holding the reactive turn becomes a plan (for the held ticks still to come).
+        def net_hits(candidate):
+            hits = candidate[1].hits
+            return (sum(1 for _, attacker, _ in hits if attacker == index)
+                    - sum(1 for _, _, victim in hits if victim == index))
+        best = max(self.search, key=net_hits)
+        baseline = next(candidate for candidate in self.search if candidate[0] == self.search_turn)
+        if net_hits(best) > net_hits(baseline) and self.search_age < BOT_HOLD:
+            self.plan = (best[0], BOT_HOLD - self.search_age)
+        self.search = None
+
+def bot_nav_grid(player, obstacles, world_size):
+    # Navigation grid for a narwhal of this size; None in worlds without walls
+    if world_size is None:
+        return None
+    return nav_grid(obstacles, world_size, player.width * 0.6, player.length / 2)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+# Arena heatmaps: where narwhals swim, hit each other and bounce off obstacles
+#
+# An ArenaHeatmap bins positions into fixed NumPy grids of HEATMAP_CELL world
+# units. Per-tick samples are buffered and binned in vectorized batches, so it
+# can ride along with a live match (it accepts the same calls as a
+# TelemetrySink) as well as digest recorded telemetry files. Heatmaps from many
+# headless matches or files are built and merged in worker processes, then
+# drawn as PNGs over the obstacle layouts without needing a display.
+#
+# Usage: python arena_analytics.py --matches 32 --output heatmaps
+#        python arena_analytics.py --telemetry matches/*.swt --output heatmaps
+import argparse
+import functools
+import math
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from telemetry import EVENT_HIT, EVENT_MATCH_START, EVENT_OBSTACLE, read_telemetry
+
+HEATMAP_CELL = 32       # World units per histogram cell
+PENDING_POINTS = 4096   # Samples buffered per layer before they are binned
+HEATMAP_LAYERS = ("occupancy", "hits", "bounces")
+HEATMAP_WIDTH = 1024    # PNG width in pixels
+MATCH_TICKS = 3600      # Longest headless match (a minute at 60 ticks per second)
+
+class ArenaHeatmap:
+    def __init__(self, world_size, cell_size=HEATMAP_CELL):
+        width, height = world_size
+        self.world_size = (float(width), float(height))
+        self.cell_size = cell_size
+        self.shape = (math.ceil(height / cell_size), math.ceil(width / cell_size))
+        self.grids = {layer: np.zeros(self.shape, dtype=np.int64) for layer in HEATMAP_LAYERS}
+        self.coverage = np.zeros(self.shape, dtype=np.int64)  # Layouts with an obstacle in each cell
+        self.layouts = 0
+        self.matches = 0
+        self.ticks = 0
+        self._pending = {layer: np.empty((PENDING_POINTS, 2)) for layer in HEATMAP_LAYERS}
+        self._pending_count = dict.fromkeys(HEATMAP_LAYERS, 0)
+
+    # --- Accumulation ---
+    def add_points(self, layer, points):
+        # Bin an (N, 2) array of world positions into a layer
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return
+        cols = np.clip((points[:, 0] / self.cell_size).astype(np.intp), 0, self.shape[1] - 1)
+        rows = np.clip((points[:, 1] / self.cell_size).astype(np.intp), 0, self.shape[0] - 1)
+        counts = np.bincount(rows * self.shape[1] + cols, minlength=self.coverage.size)
+        self.grids[layer] += counts.reshape(self.shape)
+
+    def _add_point(self, layer, x, y):
+        count = self._pending_count[layer]
+        if count == PENDING_POINTS:
+            self._flush(layer)
+            count = 0
+        self._pending[layer][count] = (x, y)
+        self._pending_count[layer] = count + 1
+
+    def _flush(self, layer):
+        self.add_points(layer, self._pending[layer][:self._pending_count[layer]])
+        self._pending_count[layer] = 0
+
+    def flush(self):
+        for layer in HEATMAP_LAYERS:
+            self._flush(layer)
+
+    def add_layout(self, rects):
+        # Count the cells the obstacles of one arena layout touch ((N, 4) x, y, width, height)
+        covered = np.zeros(self.shape, dtype=bool)
+        for x, y, width, height in rects:
+            covered[int(y // self.cell_size):int(math.ceil((y + height) / self.cell_size)),
+                    int(x // self.cell_size):int(math.ceil((x + width) / self.cell_size))] = True
+        self.coverage += covered
+        self.layouts += 1
+
+    # Same calls as a TelemetrySink, so a heatmap can be passed to step_players and run_game
+    def start_match(self, players, world_size=None, obstacles=None):
+        self.matches += 1
+        if obstacles is not None:
+            self.add_layout(obstacles.rects())
+
+    def record_tick(self, players):
+        for player in players:
+            if player.health > 0:
+                self._add_point("occupancy", player.pos[0], player.pos[1])
+        self.ticks += 1
+
+    def event(self, kind, player, other, x, y, strength=0.0):
+        if kind == EVENT_HIT:
+            self._add_point("hits", x, y)
+        elif kind == EVENT_OBSTACLE:
+            self._add_point("bounces", x, y)
+
+    def add_telemetry(self, records):
+        # Recorded matches; positions are rescaled if they were played on another world size
+        events = records["event"]
+        starts = events[events["kind"] == EVENT_MATCH_START]
+        scale = (1.0, 1.0)
+        if len(starts) and starts["x"][0] > 0:
+            scale = (self.world_size[0] / starts["x"][0], self.world_size[1] / starts["y"][0])
+        states = records["state"]
+        living = states[states["health"] > 0]
+        self.add_points("occupancy", np.column_stack((living["x"] * scale[0], living["y"] * scale[1])))
+        for layer, kind in (("hits", EVENT_HIT), ("bounces", EVENT_OBSTACLE)):
+            chosen = events[events["kind"] == kind]
+            self.add_points(layer, np.column_stack((chosen["x"] * scale[0], chosen["y"] * scale[1])))
+        layout = records["layout"]
+        for tick in starts["tick"]:
+            rects = layout[layout["tick"] == tick]
+            if len(rects):
+                self.add_layout(np.column_stack((rects["x"] * scale[0], rects["y"] * scale[1],
+                                                 rects["w"] * scale[0], rects["h"] * scale[1])))
+        self.matches += len(starts)
+        self.ticks += len(np.unique(states["tick"]))
+
+    def __iadd__(self, other):
+        if other.shape != self.shape:
+            raise ValueError(f"cannot merge heatmaps of shapes {self.shape} and {other.shape}")
+        self.flush()
+        other.flush()
+        for layer in HEATMAP_LAYERS:
+            self.grids[layer] += other.grids[layer]
+        self.coverage += other.coverage
+        self.layouts += other.layouts
+        self.matches += other.matches
+        self.ticks += other.ticks
+        return self
+
+    # --- Output ---
+    def render(self, layer, background_color, obstacle_color, path, title=None, width=HEATMAP_WIDTH):
+        # PNG of one layer over the obstacle layouts (darker where obstacles were more common)
+        import pygame
+        self.flush()
+        height = round(width * self.world_size[1] / self.world_size[0])
+        # Grid arrays are (rows, cols); surfaces are indexed (x, y)
+        cover = (self.coverage / max(self.layouts, 1)).T[:, :, None]
+        base = np.asarray(background_color, dtype=float) * (1 - cover) + np.asarray(obstacle_color, dtype=float) * cover
+        image = pygame.transform.scale(pygame.surfarray.make_surface(base.astype(np.uint8)), (width, height))
+
+        counts = self.grids[layer].T
+        level = np.log1p(counts) / np.log1p(counts.max()) if counts.max() > 0 else np.zeros(counts.shape)
+        heat = pygame.Surface(counts.shape, pygame.SRCALPHA)
+        pygame.surfarray.pixels3d(heat)[:] = heat_colors(level)
+        pygame.surfarray.pixels_alpha(heat)[:] = (np.sqrt(level) * 220).astype(np.uint8)
+        image.blit(pygame.transform.smoothscale(heat, (width, height)), (0, 0))
+
+        if title:
+            pygame.font.init()
+            font = pygame.font.Font(None, 28)
+            label = font.render(title, True, (255, 255, 255), (0, 0, 0))
+            image.blit(label, (8, 8))
+        pygame.image.save(image, path)
+
+def heat_colors(level):
+    # Black-red-yellow-white ramp for values in [0, 1], shape (..., 3)
+    level = np.clip(level, 0.0, 1.0)[..., None]
+    return (np.clip(level * 3 - np.array([0.0, 1.0, 2.0]), 0.0, 1.0) * 255).astype(np.uint8)
+
+# --- Parallel collection (worker processes) ---
+def _load_levels():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import starwhals
+    return starwhals
+
+def find_level(name):
+    # Built-in arena level by name, ignoring case, spaces and dashes
+    starwhals = _load_levels()
+    key = name.lower().replace("-", " ")
+    for level in starwhals.levels:
+        if level.name.lower() == key and level.world_size is not None:
+            return level
+    raise ValueError(f"unknown level {name!r}")
+
+def simulate_matches(level_name, seeds, ticks=MATCH_TICKS, cell_size=HEATMAP_CELL):
+    # Headless matches on fresh layouts, merged into one heatmap. Every narwhal
+    # is steered by a bot that only reacts (no budget for lookahead), so the
+    # matches do not depend on machine speed.
+    starwhals = _load_levels()
+    from ai_opponent import BotController
+    level = find_level(level_name)
+    heatmap = ArenaHeatmap(level.world_size, cell_size)
+    for seed in seeds:
+        random.seed(seed)
+        spawn_points = level.spawn_points()
+        obstacles = level.generate_obstacles(spawn_points)
+        players = starwhals.create_players(spawn_points)
+        for player in players:
+            player.controls = None
+        bots = [BotController(player, starwhals.step_players, budget_us=0) for player in players]
+        heatmap.start_match(players, level.world_size, obstacles)
+        for _ in range(ticks):
+            for bot in bots:
+                bot.update(players, obstacles, level.world_size)
+            starwhals.step_players(players, obstacles, level.world_size, telemetry=heatmap)
+            heatmap.record_tick(players)
+            if sum(player.health > 0 for player in players) <= 1:
+                break
+    heatmap.flush()
+    return heatmap
+
+def digest_telemetry(level_name, paths, cell_size=HEATMAP_CELL):
+    level = find_level(level_name)
+    heatmap = ArenaHeatmap(level.world_size, cell_size)
+    for path in paths:
+        heatmap.add_telemetry(read_telemetry(path))
+    return heatmap
+
+def collect(function, level_name, items, processes, **kwargs):
+    # Split the items across worker processes; every worker merges its own share
+    # and the parent only adds up one heatmap per worker
+    processes = max(1, min(processes, len(items)))
+    shares = [items[index::processes] for index in range(processes)]
+    work = functools.partial(function, level_name, **kwargs)
+    if processes == 1:
+        results = [work(shares[0])]
+    else:
+        # Spawned workers: forking a process that has already started SDL can deadlock.
+        # They are closed and joined rather than terminated, as SDL swallows SIGTERM.
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            results = pool.map(work, shares)
+            pool.close()
+            pool.join()
+    total = results[0]
+    for heatmap in results[1:]:
+        total += heatmap
+    return total
+
+def level_slug(name):
+    return name.lower().replace(" ", "-")
+
+def main():
+    parser = argparse.ArgumentParser(description="Heatmaps of where Starwhals matches are played")
+    parser.add_argument("--levels", nargs="*", help="Levels to simulate (default: every built-in arena)")
+    parser.add_argument("--matches", type=int, default=16, help="Headless matches per level")
+    parser.add_argument("--ticks", type=int, default=MATCH_TICKS, help="Longest headless match in ticks")
+    parser.add_argument("--telemetry", nargs="*", default=[],
+                        help="Telemetry files to digest instead of simulating (grouped by level name)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--cell-size", type=float, default=HEATMAP_CELL, help="World units per heatmap cell")
+    parser.add_argument("--seed", type=int, default=0, help="First match seed")
+    parser.add_argument("--output", default="heatmaps", help="Directory for the PNGs")
+    args = parser.parse_args()
+
+    starwhals = _load_levels()
+    arenas = [level for level in starwhals.levels if level.world_size is not None and level.arena is None]
+    if args.levels:
+        arenas = [find_level(name) for name in args.levels]
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = []
+    if args.telemetry:
+        for level in arenas:
+            paths = [path for path in args.telemetry if os.path.basename(path).endswith(f"-{level_slug(level.name)}.swt")]
+            if paths:
+                jobs.append((level, digest_telemetry, paths))
+    else:
+        seeds = list(range(args.seed, args.seed + args.matches))
+        jobs = [(level, simulate_matches, seeds) for level in arenas]
+
+    for level, function, items in jobs:
+        extra = {"ticks": args.ticks} if function is simulate_matches else {}
+        heatmap = collect(function, level.name, items, args.processes, cell_size=args.cell_size, **extra)
+        totals = {layer: int(heatmap.grids[layer].sum()) for layer in HEATMAP_LAYERS}
+        print(f"{level.name}: {heatmap.matches} matches, {heatmap.ticks} ticks, "
+              + ", ".join(f"{count} {layer}" for layer, count in totals.items()))
+        for layer in HEATMAP_LAYERS:
+            path = os.path.join(args.output, f"{level_slug(level.name)}-{layer}.png")
+            heatmap.render(layer, level.background_color, level.obstacle_color, path,
+                           f"{level.name} - {layer} ({totals[layer]} samples, {heatmap.matches} matches)")
+            print(f"  wrote {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# Arena validity: can every narwhal get everywhere, and through room to swim?
+#
+# generate_obstacles places obstacles clear of the spawn points but does not
+# check them against each other, so two or three can seal a pocket of sea, pin a
+# spawn point or leave a gap a narwhal can only wedge itself into. check_arena
+# rasterizes a layout with NavGrid (the cells a narwhal's centre can be in) and
+# flood-fills from the spawn points. A fill is a few whole-grid sweeps: each
+# sweep labels the runs of free cells along every row (or column) with one
+# cumulative sum and marks every run a reached cell lies on, so it takes as many
+# sweeps as the longest way has bends, not as many steps as it has cells.
+#
+# Two fills are run:
+#   reach   Cells the centre can be in. Free cells the spawn points' fill misses
+#           are sealed off, and a spawn point outside another's fill is cut off.
+#   room    The same, held a further half narwhal width (CHOKE_WIDTH / 2) off
+#           every obstacle and wall. Sea that is reachable but only through a
+#           gap that leaves the centre less than a narwhal's width of room is
+#           behind a choke point.
+# repair_arena drops the obstacles bordering the trouble, one at a time.
+import math
+
+import numpy as np
+
+from nav_field import NAV_CELL, NavGrid, nav_grid
+from obstacle_store import ObstacleStore
+
+CHOKE_WIDTH = 50     # Narrowest room for a narwhal's centre that is not a choke point (its width)
+POCKET_CELLS = 12    # Problem areas smaller than this many grid cells (about a narwhal's collision circle) are ignored
+MAX_REPAIRS = 4      # Obstacles repair_arena may drop before giving the layout up
+
+def _runs(free):
+    # Label each run of free cells along the rows 1, 2, ... (blocked cells 0)
+    starts = free.copy()
+    starts[:, 1:] &= ~free[:, :-1]
+    runs = np.cumsum(starts, axis=None).reshape(free.shape)
+    runs[~free] = 0
+    return runs
+
+def flood_fill(free, seeds):
+    # Free cells connected to the seed cells (4-connected): alternately mark every
+    # row run and every column run that holds a reached cell, until nothing changes
+    sweeps = (_runs(free), _runs(free.T).T)
+    reached = seeds & free
+    count = -1
+    while count != (count := int(reached.sum())):
+        for runs in sweeps:
+            hit = np.zeros(runs.max() + 1, dtype=bool)
+            hit[runs[reached]] = True
+            hit[0] = False
+            reached = hit[runs]
+    return reached
+
+def _grow(mask, rings):
+    # Mask grown by rings cells in all 8 directions
+    for _ in range(rings):
+        grown = mask.copy()
+        grown[1:] |= mask[:-1]
+        grown[:-1] |= mask[1:]
+        mask = grown.copy()
+        mask[:, 1:] |= grown[:, :-1]
+        mask[:, :-1] |= grown[:, 1:]
+    return mask
+
+def check_arena(obstacles, world_size, spawn_points, radius, wall_margin):
+    # Returns (problems, trouble): descriptions of what is wrong (none when the layout
+    # is fine) and a mask of the grid cells where it is wrong
+    reach = nav_grid(obstacles, world_size, radius, wall_margin)  # The one the computer player will use
+    room = NavGrid(obstacles, world_size, radius + CHOKE_WIDTH / 2, wall_margin + CHOKE_WIDTH / 2)
+    problems = []
+    trouble = np.zeros(reach.shape, dtype=bool)
+
+    # Fill from the first spawn point: every other one must be in the fill
+    spawns = [reach.cell_of(x, y) for x, y in spawn_points]
+    for index, cell in enumerate(spawns):
+        if not room.free[cell]:
+            problems.append(f"spawn point {index + 1} is pinned")
+            trouble[cell] = True
+    if problems:
+        return problems, trouble
+    seed = np.zeros(reach.shape, dtype=bool)
+    seed[spawns[0]] = True
+    reached = flood_fill(reach.free, seed)
+    for index, cell in enumerate(spawns[1:], 2):
+        if not reached[cell]:
+            problems.append(f"spawn point {index} is cut off from spawn point 1")
+    sealed = reach.free & ~reached
+    if problems or sealed.sum() >= POCKET_CELLS:
+        problems.append(f"{int(sealed.sum())} cells of sea are sealed off")
+        trouble |= sealed
+
+    # Room to swim: what the roomy fill covers, grown back out by the room it held off
+    roomy = flood_fill(room.free, seed)
+    covered = _grow(roomy, math.ceil(CHOKE_WIDTH / 2 / reach.cell)) & reach.free
+    choked = reached & ~covered
+    for index, cell in enumerate(spawns[1:], 2):
+        if reached[cell] and not covered[cell]:
+            problems.append(f"spawn point {index} is only reached through a choke point")
+    if choked.sum() >= POCKET_CELLS:
+        problems.append(f"{int(choked.sum())} cells of sea lie behind choke points")
+        trouble |= choked
+    return problems, trouble
+
+def repair_arena(obstacles, world_size, spawn_points, radius, wall_margin):
+    # Drop the obstacle hemming in most of the trouble until the layout checks out.
+    # Returns (obstacles, problems found at first, obstacles dropped, problems left);
+    # the layout is beyond repair when problems are left.
+    found = None
+    dropped = 0
+    while True:
+        problems, trouble = check_arena(obstacles, world_size, spawn_points, radius, wall_margin)
+        if found is None:
+            found = problems
+        if not problems or dropped == MAX_REPAIRS or len(obstacles) == 0:
+            return obstacles, found, dropped, problems
+        # Trouble cells within reach of each obstacle's box (ties go to the one placed last)
+        rows, cols = np.nonzero(trouble)
+        cell = NAV_CELL
+        reach = radius + CHOKE_WIDTH / 2 + cell
+        xs, ys = (cols + 0.5) * cell, (rows + 0.5) * cell
+        rects = obstacles.rects()
+        near = ((xs > rects[:, :1] - reach) & (xs < rects[:, :1] + rects[:, 2:3] + reach) &
+                (ys > rects[:, 1:2] - reach) & (ys < rects[:, 1:2] + rects[:, 3:4] + reach)).sum(axis=1)
+        culprit = len(near) - 1 - int(np.argmax(near[::-1]))
+        # Generated layouts are all rectangles
+        keep = np.arange(len(obstacles)) != culprit
+        repaired = ObstacleStore(max(int(keep.sum()), 1))
+        repaired.extend(obstacles.records[keep])
+        obstacles = repaired
+        dropped += 1
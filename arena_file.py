@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# Memory-mapped arena files for huge custom maps
+#
+# Layout (little-endian, every section starts on a 4 KiB page boundary):
+#   header        fixed struct: sizes, spawn points, colours, names, section offsets
+#   bounds table  float32 (pages, 4): union box of the records on each 4 KiB page
+#                 of the obstacle array
+#   obstacles     OBSTACLE_DTYPE records sorted by grid cell (row-major)
+#   vertex offsets / vertices   polygon data, only present if any polygons exist
+#   index pages   optional int64 (rows * cols, 2): start and count of each cell's
+#                 records; a query only reads the rows of cells it overlaps
+#
+# Opening an arena reads the header only. Obstacle pages are faulted in by the OS
+# when a query near the camera or the players touches them.
+import argparse
+import mmap
+import random
+import struct
+
+import numpy as np
+
+from obstacle_store import OBSTACLE_DTYPE, ObstacleStore
+
+ARENA_MAGIC = b"STARWHAL"
+ARENA_VERSION = 1
+FLAG_INDEX = 1  # Index pages are present
+PAGE_SIZE = 4096
+DEFAULT_CELL_SIZE = 1024
+
+ARENA_HEADER = struct.Struct(
+    "<8sHH"      # magic, version, flags
+    "IQ"         # obstacle count, vertex count
+    "ff"         # world width, height
+    "ffff"       # spawn points (x1, y1, x2, y2)
+    "ffII"       # max obstacle extent, cell size, grid columns, grid rows
+    "II"         # records per bounds page, bounds page count
+    "QQQQQ"      # offsets: bounds, records, vertex offsets, vertices, index
+    "3B3B2x"     # background colour, obstacle colour
+    "64s128s"    # name, description
+)
+
+def _align(offset):
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+def write_arena(path, obstacles, size, spawn_points, name="Custom Arena", description="",
+                background_color=(200, 230, 255), obstacle_color=(100, 100, 100),
+                cell_size=DEFAULT_CELL_SIZE, index=True):
+    records = obstacles.records
+    width, height = size
+    cols = max(1, int(np.ceil(width / cell_size)))
+    rows = max(1, int(np.ceil(height / cell_size)))
+
+    # Sort spatially by the grid cell of each obstacle's centre
+    centre_x = records['x'] + records['w'] / 2
+    centre_y = records['y'] + records['h'] / 2
+    cell_col = np.clip((centre_x // cell_size).astype(np.int64), 0, cols - 1)
+    cell_row = np.clip((centre_y // cell_size).astype(np.int64), 0, rows - 1)
+    cells = cell_row * cols + cell_col
+    order = np.argsort(cells, kind='stable')
+    sorted_records = records[order]
+    cells = cells[order]
+
+    # Polygon vertices follow the new record order
+    lengths = np.diff(obstacles.offsets)[order]
+    vertex_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=vertex_offsets[1:])
+    if len(obstacles.vertices):
+        vertices = np.concatenate([obstacles.polygon(i) for i in order]).astype(np.float32)
+    else:
+        vertices = np.zeros((0, 2), dtype=np.float32)
+
+    # Bounds table: union box of each 4 KiB page of records
+    page_records = max(1, PAGE_SIZE // OBSTACLE_DTYPE.itemsize)
+    page_count = -(-len(records) // page_records)
+    bounds = np.zeros((page_count, 4), dtype=np.float32)
+    if page_count:
+        starts = np.arange(page_count) * page_records
+        bounds[:, 0] = np.minimum.reduceat(sorted_records['x'], starts)
+        bounds[:, 1] = np.minimum.reduceat(sorted_records['y'], starts)
+        bounds[:, 2] = np.maximum.reduceat(sorted_records['x'] + sorted_records['w'], starts)
+        bounds[:, 3] = np.maximum.reduceat(sorted_records['y'] + sorted_records['h'], starts)
+
+    # Index pages: each cell's contiguous run of records
+    cell_index = np.zeros((rows * cols, 2), dtype=np.int64)
+    cell_index[:, 0] = np.searchsorted(cells, np.arange(rows * cols), side='left')
+    cell_index[:, 1] = np.searchsorted(cells, np.arange(rows * cols), side='right') - cell_index[:, 0]
+
+    max_extent = float(max(records['w'].max(), records['h'].max())) if len(records) else 0.0
+
+    # Section offsets
+    offset = _align(ARENA_HEADER.size)
+    bounds_offset, offset = offset, _align(offset + bounds.nbytes)
+    records_offset, offset = offset, _align(offset + sorted_records.nbytes)
+    vertex_offsets_offset = vertices_offset = 0
+    if len(vertices):
+        vertex_offsets_offset, offset = offset, _align(offset + vertex_offsets.nbytes)
+        vertices_offset, offset = offset, _align(offset + vertices.nbytes)
+    index_offset = 0
+    if index:
+        index_offset, offset = offset, offset + cell_index.nbytes
+
+    (x1, y1), (x2, y2) = spawn_points
+    header = ARENA_HEADER.pack(
+        ARENA_MAGIC, ARENA_VERSION, FLAG_INDEX if index else 0,
+        len(records), len(vertices),
+        width, height, x1, y1, x2, y2,
+        max_extent, cell_size, cols, rows,
+        page_records, page_count,
+        bounds_offset, records_offset, vertex_offsets_offset, vertices_offset, index_offset,
+        *background_color, *obstacle_color,
+        name.encode('utf-8')[:64], description.encode('utf-8')[:128])
+
+    with open(path, 'wb') as f:
+        sections = [(0, header), (bounds_offset, bounds.tobytes()),
+                    (records_offset, sorted_records.tobytes())]
+        if len(vertices):
+            sections += [(vertex_offsets_offset, vertex_offsets.tobytes()),
+                         (vertices_offset, vertices.tobytes())]
+        if index:
+            sections.append((index_offset, cell_index.tobytes()))
+        for start, data in sections:
+            f.seek(start)
+            f.write(data)
+        # An empty last section writes nothing, but reopening maps it at its offset
+        f.truncate(max(start + len(data) for start, data in sections))
+
+class ArenaFile:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = ARENA_HEADER.unpack_from(self._map, 0)
+        if fields[0] != ARENA_MAGIC:
+            raise ValueError(f"{path} is not a Starwhals arena file")
+        if fields[1] != ARENA_VERSION:
+            raise ValueError(f"{path} has unsupported arena version {fields[1]}")
+        (_, _, self.flags, self.obstacle_count, self.vertex_count,
+         width, height, x1, y1, x2, y2,
+         self.max_extent, self.cell_size, self.cols, self.rows,
+         self.page_records, self.page_count,
+         bounds_offset, records_offset, vertex_offsets_offset, vertices_offset, index_offset,
+         *colors, name, description) = fields
+        self.size = (width, height)
+        self.spawn_points = [(x1, y1), (x2, y2)]
+        self.background_color = tuple(colors[:3])
+        self.obstacle_color = tuple(colors[3:])
+        self.name = name.rstrip(b'\0').decode('utf-8')
+        self.description = description.rstrip(b'\0').decode('utf-8')
+
+        # Zero-copy views; nothing below is read until a query touches it
+        self.bounds = np.frombuffer(self._map, np.float32, self.page_count * 4, bounds_offset).reshape(-1, 4)
+        self.records = np.frombuffer(self._map, OBSTACLE_DTYPE, self.obstacle_count, records_offset)
+        self.vertex_offsets = self.vertices = None
+        if self.vertex_count:
+            self.vertex_offsets = np.frombuffer(self._map, np.int64, self.obstacle_count + 1, vertex_offsets_offset)
+            self.vertices = np.frombuffer(self._map, np.float32, self.vertex_count * 2, vertices_offset).reshape(-1, 2)
+        self.index = None
+        if self.flags & FLAG_INDEX:
+            self.index = np.frombuffer(self._map, np.int64, self.rows * self.cols * 2, index_offset).reshape(-1, 2)
+        self._last_ranges = None
+        self._last_store = None
+
+    def close(self):
+        # Drop the views before unmapping so no exported buffers remain
+        self.bounds = self.records = self.vertex_offsets = self.vertices = self.index = None
+        self._last_store = None
+        self._map.close()
+        self._file.close()
+
+    def _ranges(self, left, top, right, bottom):
+        # Contiguous [start, stop) record ranges that may overlap the box
+        if self.index is not None:
+            # Records are keyed by their centre, so widen the box by half the largest obstacle
+            margin = self.max_extent / 2
+            col0 = int(np.clip((left - margin) // self.cell_size, 0, self.cols - 1))
+            col1 = int(np.clip((right + margin) // self.cell_size, 0, self.cols - 1))
+            row0 = int(np.clip((top - margin) // self.cell_size, 0, self.rows - 1))
+            row1 = int(np.clip((bottom + margin) // self.cell_size, 0, self.rows - 1))
+            ranges = []
+            for row in range(row0, row1 + 1):
+                # Cells of a row are adjacent in the sorted array
+                first = self.index[row * self.cols + col0]
+                last = self.index[row * self.cols + col1]
+                if last[0] + last[1] > first[0]:
+                    ranges.append((int(first[0]), int(last[0] + last[1])))
+            return ranges
+        # No index pages: cull whole 4 KiB record pages on the bounds table
+        pages = np.flatnonzero((self.bounds[:, 0] <= right) & (self.bounds[:, 2] >= left) &
+                               (self.bounds[:, 1] <= bottom) & (self.bounds[:, 3] >= top))
+        return [(int(page) * self.page_records,
+                 min((int(page) + 1) * self.page_records, self.obstacle_count)) for page in pages]
+
+    def gather(self, boxes):
+        # Resident obstacles for the given (left, top, right, bottom) boxes,
+        # reused as long as the same record ranges are needed
+        ranges = sorted(set(r for box in boxes for r in self._ranges(*box)))
+        if ranges == self._last_ranges:
+            return self._last_store
+        if ranges:
+            indices = np.unique(np.concatenate([np.arange(start, stop) for start, stop in ranges]))
+        else:
+            indices = np.zeros(0, dtype=np.int64)
+        store = ObstacleStore(max(1, len(indices)))
+        if self.vertices is None:
+            store.extend(self.records[indices])
+        else:
+            for i in indices:
+                record = self.records[i]
+                points = self.vertices[self.vertex_offsets[i]:self.vertex_offsets[i + 1]]
+                if len(points):
+                    store.add_polygon(points, record['color'],
+                                      (record['x'], record['y'], record['w'], record['h']))
+                else:
+                    store.add_rect(record['x'], record['y'], record['w'], record['h'], record['color'])
+        self._last_ranges = ranges
+        self._last_store = store
+        return store
+
+def convert_level(level, path, tiles=1, seed=None, cell_size=DEFAULT_CELL_SIZE, index=True):
+    # Write a built-in Level as an arena file. With tiles > 1 the level's layout is
+    # generated tiles x tiles times side by side, which makes very large test maps.
+    if seed is not None:
+        random.seed(seed)
+    tile_width, tile_height = level.width, level.height
+    spawn_points = [(tile_width / 4, tile_height / 2), (3 * tile_width / 4, tile_height / 2)]
+    obstacles = ObstacleStore()
+    for row in range(tiles):
+        for col in range(tiles):
+            tile = level.generate_obstacles(spawn_points)
+            rects = tile.rects()
+            for (x, y, w, h), color in zip(rects, tile.records['color']):
+                obstacles.add_rect(x + col * tile_width, y + row * tile_height, w, h, color)
+    write_arena(path, obstacles, (tile_width * tiles, tile_height * tiles), spawn_points,
+                name=level.name, description=level.description,
+                background_color=level.background_color, obstacle_color=level.obstacle_color,
+                cell_size=cell_size, index=index)
+    return len(obstacles)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a built-in Starwhals level into an arena file")
+    parser.add_argument("level", help="Level name, e.g. \"Deep Sea\"")
+    parser.add_argument("output", help="Arena file to write")
+    parser.add_argument("--tiles", type=int, default=1, help="Repeat the level layout tiles x tiles times")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for obstacle generation")
+    parser.add_argument("--cell-size", type=float, default=DEFAULT_CELL_SIZE, help="Index cell size in world units")
+    parser.add_argument("--no-index", action="store_true", help="Leave out the spatial index pages")
+    args = parser.parse_args()
+
+    import starwhals
+    # Endless worlds have no size, so there is no layout to write
+    convertible = [level for level in starwhals.levels if level.world_size is not None]
+    matches = [level for level in starwhals.levels if level.name.lower() == args.level.lower()]
+    if not matches:
+        parser.error(f"unknown level {args.level!r}; choose from: " +
+                     ", ".join(level.name for level in convertible))
+    if matches[0].world_size is None:
+        parser.error(f"{matches[0].name} is an endless world with no fixed layout; choose from: " +
+                     ", ".join(level.name for level in convertible))
+    count = convert_level(matches[0], args.output, args.tiles, args.seed, args.cell_size, not args.no_index)
+    print(f"Wrote {count} obstacles to {args.output}")
+
+if __name__ == "__main__":
+    main()
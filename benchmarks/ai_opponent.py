@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Computer player: decision time against its per-tick budget, how often
+# lookahead plans are followed, and hits against a reactive-only bot
+# Run from the repository root: python benchmarks/ai_opponent.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from ai_opponent import BOT_CHUNK, BotController
+
+MATCH_TICKS = 3600
+BUDGETS_US = (250, 1000, 2000, 4000)
+
+def match(level, budget_us):
+    # Player 2 searches within budget_us; player 1 only ever steers reactively
+    random.seed(8)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for player in players:
+        player.controls = None
+        player.health = 1000  # Play the whole minute
+    reactive = BotController(players[0], starwhals.step_players, budget_us=0)
+    searching = BotController(players[1], starwhals.step_players, budget_us=budget_us)
+    searching.prepare(obstacles, level.world_size)
+    times, planned, scored, taken = [], 0, 0, 0
+    for _ in range(MATCH_TICKS):
+        reactive.update(players, obstacles, level.world_size)
+        searching.update(players, obstacles, level.world_size)
+        times.append(searching.decision_time)
+        planned += searching.mode == "plan"
+        for attacker, victim in starwhals.step_players(players, obstacles, level.world_size):
+            scored += attacker is players[1]
+            taken += victim is players[1]
+    return np.array(times) * 1e6, planned / MATCH_TICKS, scored, taken
+
+def candidates_aligned(level):
+    # Whether every lookahead candidate starts from the match as it was when the search
+    # began, however many of the others have stepped before it
+    random.seed(8)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for player in players:
+        player.controls = None
+    for _ in range(60):
+        starwhals.step_players(players, obstacles, level.world_size)
+    start = [(player.pos.tobytes(), player.vel.tobytes(), player.angle) for player in players]
+    bot = BotController(players[1], starwhals.step_players)
+    bot.start_search(players, obstacles, level.world_size, 0)
+    for turn, branch, _ in bot.search:
+        if [(player.pos.tobytes(), player.vel.tobytes(), player.angle) for player in branch.players] != start:
+            return False
+        branch.step([None, turn], BOT_CHUNK)
+    return True
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    aligned = all(candidates_aligned(level) for level in starwhals.levels[:4])
+    print(f"Lookahead candidates start from the same position: {'yes' if aligned else 'NO'}\n")
+    print(f"{MATCH_TICKS}-tick matches, searching bot against a reactive bot")
+    print(f"{'level':>16} {'budget us':>9} {'mean us':>8} {'p99 us':>7} {'max us':>7} {'over':>6} "
+          f"{'planned':>8} {'scored':>7} {'taken':>6}")
+    for level in starwhals.levels[:4]:
+        for budget in BUDGETS_US:
+            start = time.perf_counter()
+            times, planned, scored, taken = match(level, budget)
+            over = np.mean(times > budget)
+            print(f"{level.name:>16} {budget:>9} {times.mean():>8.0f} {np.percentile(times, 99):>7.0f} "
+                  f"{times.max():>7.0f} {over:>6.1%} {planned:>8.0%} {scored:>7} {taken:>6}")
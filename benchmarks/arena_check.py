@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Arena validity checks: how long checking (and repairing) a generated layout
+# takes per built-in level, next to generating it, and how often layouts seal
+# off sea or leave choke points
+# Run from the repository root: python benchmarks/arena_check.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from arena_check import check_arena
+
+LAYOUTS = 200
+
+def measure(level):
+    radius, margin = starwhals.Player.width * 0.6, starwhals.Player.length / 2
+    generate, checks, repairs, dropped, kinds = [], [], [], [], {}
+    for seed in range(LAYOUTS):
+        random.seed(seed)
+        spawn_points = level.spawn_points()
+        start = time.perf_counter()
+        obstacles = level.generate_obstacles(spawn_points)
+        generate.append(time.perf_counter() - start)
+        found, count, seconds = level.layout_check
+        repairs.append(seconds)
+        if found:
+            dropped.append(count)
+            for problem in found:
+                kind = problem.split(" ", 1)[1] if problem[0].isdigit() else problem
+                kinds[kind] = kinds.get(kind, 0) + 1
+        start = time.perf_counter()
+        problems, _ = check_arena(obstacles, level.world_size, spawn_points, radius, margin)
+        checks.append(time.perf_counter() - start)
+        assert not problems, problems
+    return (np.array(generate) * 1e3, np.array(checks) * 1e3, np.array(repairs) * 1e3,
+            np.array(dropped), kinds)
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    print(f"{LAYOUTS} generated layouts per level (check = one pass on a valid layout, "
+          f"repair = everything generate_obstacles spends checking and repairing)")
+    print(f"{'level':>16} {'generate ms':>12} {'check ms':>9} {'p99':>6} {'repair ms':>10} {'p99':>6} "
+          f"{'repaired':>9} {'dropped':>8}")
+    problems = {}
+    # Endless worlds and arena files are not generated by generate_obstacles
+    for level in starwhals.levels[:4]:
+        generate, checks, repairs, dropped, kinds = measure(level)
+        print(f"{level.name:>16} {generate.mean():>12.2f} {checks.mean():>9.2f} {np.percentile(checks, 99):>6.2f} "
+              f"{repairs.mean():>10.2f} {np.percentile(repairs, 99):>6.2f} {len(dropped) / LAYOUTS:>9.0%} "
+              f"{dropped.mean() if len(dropped) else 0:>8.2f}")
+        for kind, count in kinds.items():
+            problems[kind] = problems.get(kind, 0) + count
+    print("\nProblems found: " + (", ".join(f"{kind} ({count})" for kind, count in problems.items()) or "none"))
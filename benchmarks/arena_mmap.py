@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Arena file open and query cost as the arena grows
+# Run from the repository root: python benchmarks/arena_mmap.py
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from arena_file import ArenaFile, write_arena
+from obstacle_store import OBSTACLE_DTYPE, ObstacleStore
+
+SIZES = (10_000, 100_000, 1_000_000)
+DENSITY = 1 / 250_000  # Obstacles per square world unit, roughly Deep Sea's
+
+def random_arena(count, rng):
+    side = float(np.sqrt(count / DENSITY))
+    records = np.zeros(count, dtype=OBSTACLE_DTYPE)
+    records['x'] = rng.uniform(0, side - 200, count)
+    records['y'] = rng.uniform(0, side - 200, count)
+    records['w'] = rng.integers(60, 200, count)
+    records['h'] = rng.integers(60, 200, count)
+    store = ObstacleStore(count)
+    store.extend(records)
+    return store, side
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    view = (2000.0, 1500.0)
+    print(f"{'obstacles':>10} {'file MB':>8} {'open ms':>8} {'1st query ms':>13} {'query ms':>9} {'full read ms':>13}")
+    with tempfile.TemporaryDirectory() as folder:
+        for count in SIZES:
+            store, side = random_arena(count, rng)
+            path = os.path.join(folder, f"arena_{count}.arena")
+            write_arena(path, store, (side, side), [(side / 4, side / 2), (3 * side / 4, side / 2)])
+
+            open_time = best_of(lambda: ArenaFile(path).close())
+            arena = ArenaFile(path)
+            x, y = arena.spawn_points[0]
+            box = (x - view[0] / 2, y - view[1] / 2, x + view[0] / 2, y + view[1] / 2)
+            start = time.perf_counter()
+            arena.gather([box])
+            first_query = time.perf_counter() - start
+
+            # Moving camera: a new box every frame so the cache never hits
+            boxes = [(box[0] + i * 37, box[1] + i * 11, box[2] + i * 37, box[3] + i * 11) for i in range(200)]
+            start = time.perf_counter()
+            for moving_box in boxes:
+                arena.gather([moving_box])
+            query = (time.perf_counter() - start) / len(boxes)
+            arena.close()
+
+            full_read = best_of(lambda: np.fromfile(path, dtype=np.uint8), repeat=3)
+            print(f"{count:>10} {os.path.getsize(path) / 1e6:>8.1f} {open_time * 1e3:>8.3f} "
+                  f"{first_query * 1e3:>13.3f} {query * 1e3:>9.3f} {full_read * 1e3:>13.2f}")
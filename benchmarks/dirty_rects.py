@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Pixel area pushed to the display per frame: flipping the whole window every
+# frame against dirty-rectangle updates, for the menu and for matches
+# Run from the repository root: python benchmarks/dirty_rects.py
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from render_target import RenderTarget
+from screen_updates import ScreenUpdates
+
+MENU_FRAMES = 300
+MATCH_FRAMES = 600
+
+class LimitedUpdates(ScreenUpdates):
+    # Ends the match (as if the window was closed) after a number of frames
+    def __init__(self, screen, frames):
+        super().__init__(screen)
+        self.limit = frames
+
+    def present(self):
+        super().present()
+        if self.frames == self.limit:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+def menu(screen, hover):
+    # The menu loop, with the mouse sweeping up and down over the buttons when hover is set
+    buttons = starwhals.create_level_buttons()
+    updates = ScreenUpdates(screen)
+    for frame in range(MENU_FRAMES):
+        if hover:
+            y = 200 + abs(frame * 7 % 1200 - 600)
+            event = pygame.event.Event(pygame.MOUSEMOTION, pos=(starwhals.SCREEN_WIDTH // 2, y))
+            for button in buttons:
+                button.handle_event(event)
+        starwhals.draw_home_screen(screen, buttons, updates)
+        updates.present()
+    return updates
+
+def match(screen, level, players, still_camera):
+    random.seed(1)
+    camera_update = starwhals.Camera.update
+    if still_camera:
+        # Frame the spawn points once and never move again
+        def update(camera, positions):
+            if not getattr(camera, "placed", False):
+                camera.zoom = camera.target_zoom = starwhals.MIN_ZOOM
+                camera_update(camera, positions)
+                camera.zoom = starwhals.MIN_ZOOM
+                camera.placed = True
+        starwhals.Camera.update = update
+    updates = LimitedUpdates(screen, MATCH_FRAMES)
+    try:
+        starwhals.run_game(level, players, RenderTarget(screen), updates)
+    finally:
+        starwhals.Camera.update = camera_update
+    return updates
+
+if __name__ == "__main__":
+    screen = pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    starwhals.screen = screen
+    window = starwhals.SCREEN_WIDTH * starwhals.SCREEN_HEIGHT
+    print(f"{starwhals.SCREEN_WIDTH}x{starwhals.SCREEN_HEIGHT} window: a flip pushes {window} pixels every frame")
+    print(f"{'scene':<34} {'pixels/frame':>13} {'of flip':>8} {'full flips':>11}")
+    scenes = [
+        ("menu, idle", lambda: menu(screen, False)),
+        ("menu, mouse over buttons", lambda: menu(screen, True)),
+        ("match, 2 players", lambda: match(screen, starwhals.levels[1], 2, False)),
+        ("match, 8 players", lambda: match(screen, starwhals.levels[1], 8, False)),
+        ("match, 2 players, camera held", lambda: match(screen, starwhals.levels[1], 2, True)),
+        ("match, 8 players, camera held", lambda: match(screen, starwhals.levels[1], 8, True)),
+    ]
+    for name, run in scenes:
+        updates = run()
+        average = updates.average_pixels()
+        print(f"{name:<34} {average:>13.0f} {average / window:>8.1%} {updates.full_frames:>5}/{updates.frames:<5}")
+    pygame.quit()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Endless arena chunk generation latency and resident memory while flying through the world
+# Run from the repository root: python benchmarks/endless_chunks.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from endless_arena import CHUNK_SIZE, MEMORY_BUDGET, EndlessArena
+
+FPS = 60
+FRAMES = 900
+SPEED = 40           # World units per frame; about three times a narwhal's top speed
+VIEW = (5000, 3700)  # World area seen at minimum zoom on a 2K screen
+DENSITY = 35 / (3840 * 2100)  # Deep Sea's obstacles per square unit at the default arena size
+
+def percentile(values, q):
+    return np.percentile(values, q) * 1e3 if values else float('nan')
+
+def fly(memory_budget):
+    arena = EndlessArena(seed=7, obstacle_density=DENSITY, obstacle_size_range=(60, 200),
+                         spawn_points=[(0, 0), (1920, 0)], memory_budget=memory_budget)
+    # The game builds the chunks around the spawn points before the first frame
+    arena.request([(-VIEW[0], -VIEW[1], VIEW[0], VIEW[1])], blocking=True)
+    stalls = 0
+    gather_times = []
+    resident = []
+    for frame in range(FRAMES):
+        frame_start = time.perf_counter()
+        # Two players swimming diagonally, the camera framing both
+        p1 = np.array([frame * SPEED, frame * SPEED * 0.4])
+        p2 = p1 + (1500, 300 * np.sin(frame / 40))
+        centre = (p1 + p2) / 2
+        view = (centre[0] - VIEW[0] / 2, centre[1] - VIEW[1] / 2, centre[0] + VIEW[0] / 2, centre[1] + VIEW[1] / 2)
+        boxes = [view] + [(p[0] - 400, p[1] - 400, p[0] + 400, p[1] + 400) for p in (p1, p2)]
+        start = time.perf_counter()
+        arena.gather(boxes)
+        gather_times.append(time.perf_counter() - start)
+        # A stall is a frame where a chunk under a player is not resident yet
+        needed = set().union(*(arena.chunks_for(box) for box in boxes[1:]))
+        if any(key not in arena._chunks for key in needed):
+            stalls += 1
+        resident.append(arena.resident_bytes)
+        time.sleep(max(0.0, 1 / FPS - (time.perf_counter() - frame_start)))
+    arena.close()
+
+    print(f"memory budget {memory_budget / 1024:.0f} KiB")
+    print(f"chunk size {CHUNK_SIZE}, {arena.generated} chunks generated, {arena.evictions} evicted")
+    print(f"generation per chunk: median {percentile(arena.generation_times, 50):.2f} ms, "
+          f"p95 {percentile(arena.generation_times, 95):.2f} ms, max {percentile(arena.generation_times, 100):.2f} ms")
+    print(f"request to resident:  median {percentile(arena.ready_latencies, 50):.2f} ms, "
+          f"p95 {percentile(arena.ready_latencies, 95):.2f} ms")
+    print(f"gather per frame:     median {percentile(gather_times, 50):.3f} ms, p95 {percentile(gather_times, 95):.3f} ms")
+    print(f"resident memory:      mean {np.mean(resident) / 1024:.1f} KiB, peak {max(resident) / 1024:.1f} KiB "
+          f"(budget {arena.memory_budget / 1024:.0f} KiB)")
+    print(f"frames with a missing chunk under a player: {stalls} of {FRAMES}")
+
+if __name__ == "__main__":
+    fly(MEMORY_BUDGET)
+    print()
+    fly(16 << 10)  # Tight budget to exercise eviction
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Memory and attribute access for 10k narwhals: slotted players with shared class
+# constants against the old layout (every attribute in a per-instance __dict__)
+# Run from the repository root: python benchmarks/entity_memory.py
+import os
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENTITIES = 10_000
+
+def load_variant(filename):
+    # narwhal_game.py and new_starwhals.py start their game at import, so only
+    # run the definitions above the window setup
+    with open(os.path.join(ROOT, filename), encoding="utf-8") as source_file:
+        source = source_file.read()
+    source = source[:source.index("screen = pygame.display.set_mode")]
+    namespace = {"__name__": filename}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace
+
+class Unslotted:
+    # Stand-in for the old Player layout
+    pass
+
+def constants(cls):
+    return {name: value for name, value in vars(cls).items() if isinstance(value, (int, float))}
+
+def make(cls, args, slotted):
+    if slotted:
+        return cls(*args)
+    entity = Unslotted()
+    cls.__init__(entity, *args)
+    entity.__dict__.update(constants(cls))
+    return entity
+
+def measure(cls, args, slotted):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [make(cls, args, slotted) for _ in range(ENTITIES)]
+    total = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # State and shared constants, the mix the physics and drawing code reads
+    access = min(timeit.repeat(
+        "for p in entities: p.angle + p.health + p.length + p.width + p.thrust",
+        globals={"entities": entities}, number=20, repeat=5)) / 20
+    own = sys.getsizeof(entities[0]) + (0 if slotted else sys.getsizeof(entities[0].__dict__))
+    return total / ENTITIES, own, access / ENTITIES
+
+if __name__ == "__main__":
+    pygame.init()
+    import starwhals
+    variants = (
+        ("starwhals.py", starwhals.Player, (100, 100, (0, 100, 255), None)),
+        ("narwhal_game.py", load_variant("narwhal_game.py")["Player"], (100, 100, (0, 100, 255), None)),
+        ("new_starwhals.py", load_variant("new_starwhals.py")["Player"], ((100, 100), 0, (0, 100, 255), None)),
+    )
+    print(f"{ENTITIES} entities per variant")
+    print(f"{'variant':<18} {'layout':<8} {'B/entity':>9} {'object B':>9} {'access ns':>10}")
+    for name, cls, args in variants:
+        for slotted in (False, True):
+            total, own, access = measure(cls, args, slotted)
+            print(f"{name:<18} {'slots' if slotted else 'dict':<8} {total:>9.0f} {own:>9} {access * 1e9:>10.1f}")
+    pygame.quit()
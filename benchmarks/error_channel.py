@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Cost of a recurring drawing error: two narwhals with a NaN position drawn for
+# ten seconds of frames, printing every error against the rate-limited channel
+# Run from the repository root: python benchmarks/error_channel.py
+import contextlib
+import os
+import sys
+import time
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import error_channel
+import starwhals
+from starwhals import Camera, Player
+
+FRAMES = 600  # Ten seconds at 60 FPS
+
+def broken_frames(limit):
+    # Returns seconds per frame and the number of lines logged
+    clock = {"now": 0.0}
+    lines = []
+    channel = error_channel.ErrorChannel(limit=limit, log=lambda line: (lines.append(line), print(line)),
+                                         clock=lambda: clock["now"])
+    starwhals.errors = channel
+    screen = pygame.display.get_surface()
+    camera = Camera((5000, 5000))
+    players = [Player(100, 100, starwhals.BLUE, None), Player(300, 100, starwhals.PINK, None)]
+    for player in players:
+        player.pos[:] = np.nan
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            for player in players:
+                player.draw(screen, camera)
+            channel.tick()
+            clock["now"] += 1 / starwhals.FPS
+        elapsed = time.perf_counter() - start
+        channel.summarize()
+    return elapsed / FRAMES, len(lines)
+
+LOOP_SETUP = "import math\nnum_points = 32"
+TRY_INSIDE = """
+for i in range(num_points):
+    try:
+        t = i / (num_points - 1) * 2 * math.pi
+        x = math.cos(t) * 100.0
+    except Exception:
+        continue
+"""
+TRY_OUTSIDE = """
+try:
+    for i in range(num_points):
+        t = i / (num_points - 1) * 2 * math.pi
+        x = math.cos(t) * 100.0
+except Exception:
+    pass
+"""
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    print(f"2 broken narwhals, {FRAMES} frames (output to {os.devnull}; a terminal is much slower)")
+    print(f"{'reporting':<22} {'ms/frame':>9} {'lines':>7}")
+    for name, limit in (("print every error", float("inf")), ("rate-limited channel", error_channel.ERROR_LOG_LIMIT)):
+        seconds, lines = broken_frames(limit)
+        print(f"{name:<22} {seconds * 1e3:>9.3f} {lines:>7}")
+    inside = min(timeit.repeat(TRY_INSIDE, LOOP_SETUP, number=20_000, repeat=5)) / 20_000
+    outside = min(timeit.repeat(TRY_OUTSIDE, LOOP_SETUP, number=20_000, repeat=5)) / 20_000
+    print(f"32-point body loop: try per point {inside * 1e6:.2f} us, one try around the loop {outside * 1e6:.2f} us")
+    pygame.quit()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Free-for-all simulation tick time as the player count grows
+# Run from the repository root: python benchmarks/ffa_tick.py
+import math
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from starwhals import HORN_HIT_RADIUS, HORN_KNOCKBACK, create_players, step_players
+
+PLAYER_COUNTS = (2, 8, 16, 32, 64)
+TICKS = 300
+
+def naive_step(players, obstacles, world_size):
+    # Reference tick: every living pair is tested for bodies and horns
+    living = [player for player in players if player.health > 0]
+    for player in living:
+        player.move(obstacles, [other for other in living if other is not player], world_size)
+    for attacker in living:
+        tip = attacker.get_horn_tip()
+        for victim in living:
+            if victim is not attacker and math.dist(tip, victim.pos) < HORN_HIT_RADIUS:
+                victim.health -= 1
+                direction = (victim.pos - attacker.pos) / np.linalg.norm(victim.pos - attacker.pos)
+                attacker.vel -= direction * HORN_KNOCKBACK
+                victim.vel += direction * HORN_KNOCKBACK
+
+def run(step, count):
+    random.seed(count)
+    level = starwhals.levels[1]
+    spawn_points = level.spawn_points(count)
+    obstacles = level.generate_obstacles(spawn_points)
+    players = create_players(spawn_points)
+    for player in players:
+        player.health = 10 ** 6  # Keep everyone swimming for the whole run
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        step(players, obstacles, level.world_size)
+    return (time.perf_counter() - start) / TICKS
+
+if __name__ == "__main__":
+    print(f"{'players':>8} {'sweep ms':>9} {'naive ms':>9} {'speedup':>8}")
+    for count in PLAYER_COUNTS:
+        sweep = run(step_players, count)
+        naive = run(naive_step, count)
+        print(f"{count:>8} {sweep * 1e3:>9.3f} {naive * 1e3:>9.3f} {naive / sweep:>7.1f}x")
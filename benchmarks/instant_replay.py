@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Instant replay buffer: recording cost per tick, fixed memory, and a check
+# that recording allocates nothing once the buffer exists
+# Run from the repository root: python benchmarks/instant_replay.py
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from instant_replay import REPLAY_SECONDS, InstantReplay
+
+TICKS = 20_000
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    level = starwhals.levels[0]
+    print(f"{REPLAY_SECONDS} s at {starwhals.FPS} ticks per second")
+    print(f"{'players':>7} {'record us':>10} {'buffer KB':>10} {'allocated bytes':>16}")
+    for player_count in (2, 8, 16):
+        players = starwhals.create_players(level.spawn_points(player_count))
+        camera = starwhals.Camera(level.world_size)
+        replay = InstantReplay(players, camera, fps=starwhals.FPS)
+        start = time.perf_counter()
+        for _ in range(TICKS):
+            replay.record(players, camera)
+        per_tick = (time.perf_counter() - start) / TICKS
+        # Traced blocks still alive after another full lap of the ring
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(replay.capacity):
+            replay.record(players, camera)
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print(f"{player_count:>7} {per_tick * 1e6:>10.2f} {replay.nbytes / 1000:>10.1f} {allocated:>16}")
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Lookahead branches: cost of forking a match compared with deep-copying it,
+# and how many branches a bot can evaluate in one 16 ms frame
+# Run from the repository root: python benchmarks/match_fork.py
+import copy
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from match_state import MatchBranch
+
+FRAME_BUDGET = 0.016
+SEGMENT_TICKS = 30          # Ticks each turn is held for
+HORIZONS = (60, 120, 300)   # Ticks looked ahead
+TURNS = (-1, 0, 1)
+REPEATS = 2000
+
+def live_match(level, player_count):
+    # A match a few seconds in
+    random.seed(3)
+    spawn_points = level.spawn_points(player_count)
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for index, player in enumerate(players):
+        player.controls = None
+        player.angle = 30 + index * 140
+    for _ in range(180):
+        starwhals.step_players(players, obstacles, level.world_size)
+    return players, obstacles
+
+def fork_costs(level, player_count):
+    # Microseconds to deep-copy the narwhals and obstacles, to fork, and to fork and step once
+    players, obstacles = live_match(level, player_count)
+    root = MatchBranch(players, obstacles, level.world_size, starwhals.step_players)
+    straight = [0] * player_count
+    start = time.perf_counter()
+    for _ in range(REPEATS // 10):
+        copy.deepcopy((players, obstacles))
+    deep = (time.perf_counter() - start) / (REPEATS // 10)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        root.fork()
+    fork = (time.perf_counter() - start) / REPEATS
+    branches = [root.fork() for _ in range(REPEATS)]
+    start = time.perf_counter()
+    for branch in branches:
+        branch.step(straight)
+    stepped = (time.perf_counter() - start) / REPEATS
+    return deep * 1e6, fork * 1e6, (fork + stepped) * 1e6
+
+def flat_rollouts(root, horizon):
+    # Independent branches from the root, the bot's turn redrawn every segment
+    choices = random.Random(1)
+    count = 0
+    deadline = time.perf_counter() + FRAME_BUDGET
+    while time.perf_counter() < deadline:
+        branch = root.fork()
+        for _ in range(horizon // SEGMENT_TICKS):
+            branch.step((0, choices.choice(TURNS)), SEGMENT_TICKS)
+        count += 1
+    return count
+
+def state(players):
+    return [(player.pos.tobytes(), player.vel.tobytes(), player.angle) for player in players]
+
+def nested_untouched(root, depth):
+    # Whether stepping a branch's children leaves the branch itself alone, at every depth
+    branch = root
+    for _ in range(depth):
+        before = state(branch.players)
+        children = [branch.fork() for _ in TURNS]
+        for turn, child in zip(TURNS, children):
+            child.step((0, turn), SEGMENT_TICKS)
+        if state(branch.players) != before:
+            return False
+        branch = children[0]
+    return True
+
+def tree_leaves(root, horizon):
+    # Every turn sequence depth-first; siblings share the ticks before they part
+    depth = horizon // SEGMENT_TICKS
+    stack = [(root, 0)]
+    leaves = 0
+    deadline = time.perf_counter() + FRAME_BUDGET
+    while stack and time.perf_counter() < deadline:
+        branch, level = stack.pop()
+        if level == depth:
+            leaves += 1
+            continue
+        for turn in TURNS:
+            child = branch.fork()
+            child.step((0, turn), SEGMENT_TICKS)
+            stack.append((child, level + 1))
+    return leaves
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    level = starwhals.levels[2]
+    print(f"{level.name}: fork cost in microseconds")
+    print(f"{'players':>7} {'deepcopy':>9} {'fork':>6} {'fork + step':>12}")
+    for player_count in (2, 16):
+        deep, fork, stepped = fork_costs(level, player_count)
+        print(f"{player_count:>7} {deep:>9.1f} {fork:>6.2f} {stepped:>12.1f}")
+
+    players, obstacles = live_match(level, 2)
+    before = state(players)
+    random_before = random.getstate()
+    root = MatchBranch(players, obstacles, level.world_size, starwhals.step_players)
+    print(f"\nBranches per {FRAME_BUDGET * 1e3:.0f} ms frame, turns held for {SEGMENT_TICKS} ticks")
+    print(f"{'horizon ticks':>13} {'rollouts':>9} {'tree leaves':>12} {'tree size':>10}")
+    for horizon in HORIZONS:
+        print(f"{horizon:>13} {flat_rollouts(root, horizon):>9} {tree_leaves(root, horizon):>12} "
+              f"{len(TURNS) ** (horizon // SEGMENT_TICKS):>10}")
+    untouched = before == state(players) and random.getstate() == random_before
+    print(f"\nLive match and random state untouched by the search: {'yes' if untouched else 'NO'}")
+    nested = nested_untouched(root, max(HORIZONS) // SEGMENT_TICKS)
+    print(f"Branches untouched by stepping their children: {'yes' if nested else 'NO'}")
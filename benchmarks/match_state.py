@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Match snapshots: size and save/restore time, and a check that a restored
+# match continues exactly like the one that was saved (on the end screen too,
+# rematch arena included)
+# Run from the repository root: python benchmarks/match_state.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from match_state import restore_match, save_match
+
+SAVE_TICK = 300       # Ticks played before the snapshot
+CONTINUE_TICKS = 900  # Ticks compared after it
+COUNTDOWN_TICKS = 60  # End screen ticks before and after an end screen snapshot
+REPEATS = 2000
+
+# The tail sway follows pygame's clock; run it from the tick count so both runs see the same times
+ticks = [0]
+pygame.time.get_ticks = lambda: ticks[0] * 1000 // starwhals.FPS
+
+def start_match(level, player_count):
+    random.seed(11)
+    spawn_points = level.spawn_points(player_count)
+    obstacles = level.generate_obstacles(spawn_points)
+    level.obstacles = obstacles  # What obstacles_near hands out, as in run_game
+    players = starwhals.create_players(spawn_points)
+    for index, player in enumerate(players):
+        player.controls = None
+        player.angle = 30 + index * 140
+        player.health = 100  # Keep everyone swimming through the whole comparison
+    return obstacles, players, starwhals.Camera(level.world_size)
+
+def play(level, obstacles, players, camera, count):
+    # The game loop's simulation steps; returns every tick's state as one array
+    history = []
+    for _ in range(count):
+        ticks[0] += 1
+        obstacles = level.obstacles_near(starwhals.nearby_boxes(camera, players))
+        starwhals.step_players(players, obstacles, level.world_size)
+        camera.update([player.pos for player in players])
+        history.append([value for player in players for value in
+                        (*player.pos, *player.vel, player.angle, player.tail_angle, player.health)]
+                       + [camera.x, camera.y, camera.zoom])
+    return obstacles, np.array(history)
+
+def round_trip(level, player_count):
+    # Play on from a snapshot twice: in the saved match, and restored into fresh objects
+    ticks[0] = 0
+    obstacles, players, camera = start_match(level, player_count)
+    obstacles, _ = play(level, obstacles, players, camera, SAVE_TICK)
+    state = save_match(level, obstacles, players, camera)
+    _, expected = play(level, obstacles, players, camera, CONTINUE_TICKS)
+
+    ticks[0] = SAVE_TICK
+    fresh, fresh_camera = starwhals.create_players(level.spawn_points(player_count)), starwhals.Camera(level.world_size)
+    restored, _, _, _ = restore_match(state, level, fresh, fresh_camera)
+    _, actual = play(level, restored, fresh, fresh_camera, CONTINUE_TICKS)
+    identical = actual.tobytes() == expected.tobytes()
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        save_match(level, obstacles, players, camera)
+    saved = time.perf_counter()
+    for _ in range(REPEATS):
+        restore_match(state, level, fresh, fresh_camera)
+    restore_time = (time.perf_counter() - saved) / REPEATS
+    return len(state), (saved - start) / REPEATS, restore_time, identical
+
+def end_screen_trip(level):
+    # Snapshot during the end screen countdown while the rematch arena is generated,
+    # as F6 takes it; the saved and the restored match must rematch on the same
+    # layout and carry on with the same random stream
+    ticks[0] = 0
+    obstacles, players, camera = start_match(level, 2)
+    obstacles, _ = play(level, obstacles, players, camera, SAVE_TICK)
+    next_arena = starwhals.pregenerate_arena(level, level.spawn_points())
+    obstacles, _ = play(level, obstacles, players, camera, COUNTDOWN_TICKS)
+    state = save_match(level, obstacles, players, camera, "round_over", 1000, next_arena.result())
+    _, expected = play(level, obstacles, players, camera, COUNTDOWN_TICKS)
+    expected = (expected.tobytes(), next_arena.result().records.tobytes(), random.random())
+
+    ticks[0] = SAVE_TICK + COUNTDOWN_TICKS
+    fresh, fresh_camera = starwhals.create_players(level.spawn_points()), starwhals.Camera(level.world_size)
+    restored, round_state, _, next_obstacles = restore_match(state, level, fresh, fresh_camera)
+    _, actual = play(level, restored, fresh, fresh_camera, COUNTDOWN_TICKS)
+    actual = (actual.tobytes(), next_obstacles.records.tobytes(), random.random())
+    return round_state == "round_over" and actual == expected
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    print(f"Snapshot after {SAVE_TICK} ticks, {CONTINUE_TICKS} ticks compared after it")
+    print(f"{'level':>16} {'players':>7} {'bytes':>6} {'save us':>8} {'restore us':>11} {'bit-identical':>14}")
+    # Endless worlds stream chunks in on a worker thread, so their layouts depend on timing
+    for level in starwhals.levels[:4]:
+        for player_count in (2, 16):
+            size, save_time, restore_time, identical = round_trip(level, player_count)
+            print(f"{level.name:>16} {player_count:>7} {size:>6} {save_time * 1e6:>8.1f} "
+                  f"{restore_time * 1e6:>11.1f} {'yes' if identical else 'NO':>14}")
+    same = all(end_screen_trip(level) for level in starwhals.levels[:4])
+    print(f"\nEnd screen snapshots rematch on the same arena with the same random stream: {'yes' if same else 'NO'}")
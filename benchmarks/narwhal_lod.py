@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Narwhal draw cost per frame at several zooms, with level of detail against always-full detail
+# Run from the repository root: python benchmarks/narwhal_lod.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from starwhals import LOD_FULL, LOD_NAMES, Camera, Player, lod_tier, player_outlines
+
+ZOOMS = (0.4, 0.6, 0.8, 1.0, 1.2)
+PLAYERS = 64
+FRAMES = 120
+
+def scene(zoom):
+    # A grid of narwhals filling the view at this zoom
+    camera = Camera(None)
+    camera.zoom = zoom
+    view_width, view_height = starwhals.SCREEN_WIDTH / zoom, starwhals.SCREEN_HEIGHT / zoom
+    columns = 8
+    players = []
+    for index in range(PLAYERS):
+        x = (index % columns + 0.5) / columns * view_width
+        y = (index // columns + 0.5) / (PLAYERS / columns) * view_height
+        player = Player(x, y, starwhals.player_color(index), None)
+        player.angle = index * 37.0
+        player.tail_angle = (index % 7 - 3) * 10.0
+        players.append(player)
+    return camera, players
+
+def frame_time(screen, camera, players, tier):
+    times = []
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        for player, outline in zip(players, player_outlines(players, camera)):
+            player.draw(screen, camera, outline, tier)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e3
+
+if __name__ == "__main__":
+    pygame.init()
+    screen = pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    print(f"{PLAYERS} narwhals on a {starwhals.SCREEN_WIDTH}x{starwhals.SCREEN_HEIGHT} screen, "
+          f"thresholds {starwhals.LOD_THRESHOLDS}")
+    print(f"{'zoom':>5} {'length px':>10} {'tier':>8} {'full ms':>8} {'lod ms':>7}")
+    for zoom in ZOOMS:
+        camera, players = scene(zoom)
+        projected = Player.length * zoom
+        tier = lod_tier(projected)
+        full = frame_time(screen, camera, players, LOD_FULL)
+        lod = frame_time(screen, camera, players, tier)
+        print(f"{zoom:>5.1f} {projected:>10.0f} {LOD_NAMES[tier]:>8} {full:>8.2f} {lod:>7.2f}")
+    pygame.quit()
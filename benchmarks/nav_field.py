@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Navigation distance fields: grid and field build times per built-in level,
+# the cost of a cached lookup and of path and flow queries, and how many bot
+# ticks a new goal cell's field takes when it only gets the time left over
+# Run from the repository root: python benchmarks/nav_field.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from nav_field import NavField, NavGrid, nav_grid
+
+QUERIES = 20000
+TICK_WINDOW = 0.0015  # Seconds a bot tick leaves for fields at the default budget
+
+def layout(level):
+    random.seed(5)
+    spawn_points = level.spawn_points()
+    return spawn_points, level.generate_obstacles(spawn_points)
+
+def measure(level):
+    spawn_points, obstacles = layout(level)
+    radius, margin = starwhals.Player.width * 0.6, starwhals.Player.length / 2
+    grid = NavGrid(obstacles, level.world_size, radius, margin)
+    nav_grid(obstacles, level.world_size, radius, margin)
+    start = time.perf_counter()
+    for _ in range(1000):
+        nav_grid(obstacles, level.world_size, radius, margin)
+    cached = (time.perf_counter() - start) / 1000
+
+    # Every goal cell a narwhal can be in, each built in one go and in tick-sized windows
+    goals = sorted({grid.goal_of(col * grid.cell, row * grid.cell) for row, col in np.argwhere(grid.free)})
+    builds, ticks = [], []
+    for goal in goals:
+        field = NavField(grid, goal)
+        field.advance()
+        builds.append(field.build_time)
+        field = NavField(grid, goal)
+        count = 1
+        while not field.advance(time.perf_counter() + TICK_WINDOW):
+            count += 1
+        ticks.append(count)
+
+    # Queries from random free cells toward the far spawn point
+    field = grid.field(grid.goal_of(*spawn_points[1]))
+    field.advance()
+    cells = np.argwhere(grid.free)[np.random.default_rng(0).integers(0, int(grid.free.sum()), QUERIES)]
+    points = [((col + 0.5) * grid.cell, (row + 0.5) * grid.cell) for row, col in cells.tolist()]
+    start = time.perf_counter()
+    for x, y in points:
+        field.path_length(x, y)
+    path_time = (time.perf_counter() - start) / QUERIES
+    start = time.perf_counter()
+    for x, y in points:
+        field.flow(x, y)
+    flow_time = (time.perf_counter() - start) / QUERIES
+    return grid, cached, len(goals), np.array(builds), np.array(ticks), path_time, flow_time
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    print(f"Fields toward every reachable goal cell; {TICK_WINDOW * 1e3:.1f} ms of each bot tick for building")
+    print(f"{'level':>16} {'grid':>9} {'free':>5} {'grid ms':>8} {'cached us':>10} {'goals':>6} "
+          f"{'field ms':>9} {'max ms':>7} {'ticks':>6} {'path us':>8} {'flow us':>8}")
+    # Endless worlds have no walls and no whole layout to rasterize
+    for level in starwhals.levels[:4]:
+        grid, cached, goals, builds, ticks, path_time, flow_time = measure(level)
+        print(f"{level.name:>16} {grid.shape[1]:>4}x{grid.shape[0]:<4} {grid.free.mean():>5.0%} "
+              f"{grid.build_time * 1e3:>8.2f} {cached * 1e6:>10.1f} {goals:>6} {builds.mean() * 1e3:>9.2f} "
+              f"{builds.max() * 1e3:>7.2f} {ticks.mean():>6.1f} {path_time * 1e6:>8.2f} {flow_time * 1e6:>8.2f}")
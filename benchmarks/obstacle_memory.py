@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Memory per obstacle at 100k obstacles: ObstacleStore vs one Python object each
+# Run from the repository root: python benchmarks/obstacle_memory.py
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from obstacle_store import ObstacleStore
+
+COUNT = 100_000
+
+# The per-object layouts the store replaced
+class RectObstacle:
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+
+class PolygonObstacle:
+    def __init__(self, pos, radius, points):
+        self.pos = np.array(pos, dtype=float)
+        self.radius = radius
+        self.points = points
+
+def polygon_points(pos, radius, rng):
+    num_points = rng.randint(7, 12)
+    return [[pos[0] + math.cos(i / num_points * 2 * math.pi) * radius * rng.uniform(0.8, 1.1),
+             pos[1] + math.sin(i / num_points * 2 * math.pi) * radius * rng.uniform(0.8, 1.1)]
+            for i in range(num_points)]
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+def build_rect_objects():
+    rng = random.Random(1)
+    return [RectObstacle(rng.randint(0, 50000), rng.randint(0, 50000), rng.randint(40, 200), rng.randint(40, 200))
+            for _ in range(COUNT)]
+
+def build_rect_store():
+    rng = random.Random(1)
+    store = ObstacleStore(COUNT)
+    for _ in range(COUNT):
+        store.add_rect(rng.randint(0, 50000), rng.randint(0, 50000), rng.randint(40, 200), rng.randint(40, 200))
+    return store
+
+def build_polygon_objects():
+    rng = random.Random(2)
+    obstacles = []
+    for _ in range(COUNT):
+        pos, radius = (rng.uniform(0, 50000), rng.uniform(0, 50000)), rng.uniform(40, 100)
+        obstacles.append(PolygonObstacle(pos, radius, polygon_points(pos, radius, rng)))
+    return obstacles
+
+def build_polygon_store():
+    rng = random.Random(2)
+    store = ObstacleStore(COUNT)
+    for _ in range(COUNT):
+        pos, radius = (rng.uniform(0, 50000), rng.uniform(0, 50000)), rng.uniform(40, 100)
+        store.add_polygon(polygon_points(pos, radius, rng),
+                          bounds=(pos[0] - radius, pos[1] - radius, 2 * radius, 2 * radius))
+    return store
+
+def time_near_query(rect_objects, store, queries=200):
+    rng = random.Random(3)
+    points = [(rng.uniform(0, 50000), rng.uniform(0, 50000)) for _ in range(queries)]
+    start = time.perf_counter()
+    for x, y in points:
+        [o for o in rect_objects
+         if math.dist((x, y), (max(o.rect.left, min(x, o.rect.right)), max(o.rect.top, min(y, o.rect.bottom)))) < 30]
+    per_object = (time.perf_counter() - start) / queries
+    start = time.perf_counter()
+    for x, y in points:
+        store.near(x, y, 30)
+    per_store = (time.perf_counter() - start) / queries
+    return per_object, per_store
+
+if __name__ == "__main__":
+    rect_objects, rect_objects_bytes, _ = measure(build_rect_objects)
+    rect_store, rect_store_bytes, _ = measure(build_rect_store)
+    _, polygon_objects_bytes, _ = measure(build_polygon_objects)
+    polygon_store, polygon_store_bytes, _ = measure(build_polygon_store)
+
+    print(f"{COUNT} obstacles, bytes per obstacle (tracemalloc, includes container overhead)")
+    print(f"  rect, object + pygame.Rect : {rect_objects_bytes / COUNT:8.1f}")
+    print(f"  rect, ObstacleStore        : {rect_store_bytes / COUNT:8.1f}  (records only: {rect_store.nbytes / COUNT:.1f})")
+    print(f"  polygon, object + lists    : {polygon_objects_bytes / COUNT:8.1f}")
+    print(f"  polygon, ObstacleStore     : {polygon_store_bytes / COUNT:8.1f}  (used: {polygon_store.nbytes / COUNT:.1f})")
+
+    per_object, per_store = time_near_query(rect_objects, rect_store)
+    print(f"collision query over all {COUNT} rects: objects {per_object * 1e3:.2f} ms, store {per_store * 1e3:.2f} ms")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Particle pool frame cost with 50k live particles, against one Python object per particle
+# Run from the repository root: python benchmarks/particle_pool.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from particles import PARTICLE_COLORS, PARTICLE_DRAG, PARTICLE_LIFETIME, ParticlePool
+
+SCREEN_SIZE = (1920, 1080)
+LIVE = 50_000
+FRAMES = 120
+FRAME_BUDGET = 1000 / 60  # ms
+
+class ObjectParticle:
+    # The straightforward design the pool replaces
+    def __init__(self, x, y, vx, vy, kind):
+        self.x, self.y, self.vx, self.vy, self.kind = x, y, vx, vy, kind
+        self.life = PARTICLE_LIFETIME[kind]
+
+def keep_topped_up(pool, rng, target):
+    # Emitter bursts spread over the screen until the pool holds the target count
+    while pool.count < target:
+        x, y = rng.uniform(0, SCREEN_SIZE[0]), rng.uniform(0, SCREEN_SIZE[1])
+        pool.emit(x, y, min(500, target - pool.count), rng.integers(0, 3), speed=4.0)
+
+def pool_frames(screen, live):
+    rng = np.random.default_rng(0)
+    pool = ParticlePool(capacity=live, seed=0)
+    updates, draws = [], []
+    for _ in range(FRAMES):
+        keep_topped_up(pool, rng, live)
+        start = time.perf_counter()
+        pool.update()
+        middle = time.perf_counter()
+        pool.draw(screen)
+        updates.append(middle - start)
+        draws.append(time.perf_counter() - middle)
+    return np.median(updates) * 1e3, np.median(draws) * 1e3
+
+def object_frames(screen, live):
+    rng = np.random.default_rng(0)
+    particles = []
+    updates, draws = [], []
+    for _ in range(FRAMES // 4):
+        while len(particles) < live:
+            angle = rng.uniform(0, 2 * np.pi)
+            particles.append(ObjectParticle(rng.uniform(0, SCREEN_SIZE[0]), rng.uniform(0, SCREEN_SIZE[1]),
+                                            np.cos(angle) * 4, np.sin(angle) * 4, int(rng.integers(0, 3))))
+        start = time.perf_counter()
+        for particle in particles:
+            particle.vx *= PARTICLE_DRAG[particle.kind]
+            particle.vy *= PARTICLE_DRAG[particle.kind]
+            particle.x += particle.vx
+            particle.y += particle.vy
+            particle.life -= 1
+        particles = [particle for particle in particles if particle.life > 0]
+        middle = time.perf_counter()
+        for particle in particles:
+            pygame.draw.circle(screen, PARTICLE_COLORS[particle.kind], (int(particle.x), int(particle.y)), 3)
+        updates.append(middle - start)
+        draws.append(time.perf_counter() - middle)
+    return np.median(updates) * 1e3, np.median(draws) * 1e3
+
+if __name__ == "__main__":
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    print(f"{'design':<18} {'live':>7} {'update ms':>10} {'draw ms':>8} {'total ms':>9}  (budget {FRAME_BUDGET:.1f} ms)")
+    for name, run in (("pooled arrays", pool_frames), ("object/particle", object_frames)):
+        for live in (5_000, LIVE):
+            update, draw = run(screen, live)
+            print(f"{name:<18} {live:>7} {update:>10.2f} {draw:>8.2f} {update + draw:>9.2f}")
+    pygame.quit()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Quality governor under load: a match with both narwhals close together at
+# MAX_ZOOM in the densest arena, with extra busy work per frame standing in for
+# a slower machine. Prints every quality change and each phase's frame times.
+# Run from the repository root: python benchmarks/quality_governor.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from quality import QualityGovernor
+from render_target import RenderTarget
+from screen_updates import ScreenUpdates
+
+# (frames, extra milliseconds of work per frame)
+PHASES = ((300, 20.0), (300, 9.0), (600, 0.0))
+
+class LoadedUpdates(ScreenUpdates):
+    # Adds the phase's busy work to every frame and ends the match after the last phase
+    def __init__(self, screen):
+        super().__init__(screen)
+        self.work = []  # Frame work time as measured by the governor
+        self.levels = []
+
+    def present(self):
+        end = 0
+        for frames, load in PHASES:
+            end += frames
+            if self.frames < end:
+                deadline = time.perf_counter() + load / 1e3
+                while time.perf_counter() < deadline:
+                    pass
+                break
+        super().present()
+        if self.frames == sum(frames for frames, _ in PHASES):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+class RecordingGovernor(QualityGovernor):
+    def __init__(self, updates, *args, **kwargs):
+        self.updates = updates
+        super().__init__(*args, **kwargs, log=lambda line: print(f"frame {updates.frames:5}: {line}"))
+
+    def frame_done(self, seconds):
+        self.updates.work.append(seconds)
+        self.updates.levels.append(self.level)
+        super().frame_done(seconds)
+
+def close_quarters(camera, positions):
+    # Both narwhals side by side and the camera fully zoomed in on them
+    camera.zoom = camera.target_zoom = starwhals.MAX_ZOOM
+    centre = np.mean(positions, axis=0)
+    camera.x = centre[0] - starwhals.SCREEN_WIDTH / (2 * camera.zoom)
+    camera.y = centre[1] - starwhals.SCREEN_HEIGHT / (2 * camera.zoom)
+
+if __name__ == "__main__":
+    screen = pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    starwhals.screen = screen
+    starwhals.Camera.update = close_quarters
+    random.seed(1)
+    render_target = RenderTarget(screen)
+    updates = LoadedUpdates(screen)
+    governor = RecordingGovernor(updates, starwhals.FPS, render_target, starwhals.LOD_THRESHOLDS)
+    starwhals.run_game(starwhals.levels[2], 2, render_target, updates, governor)
+    print(f"{governor.changes} quality changes")
+    print(f"{'phase':>5} {'load ms':>8} {'frames':>7} {'work ms':>8} {'late':>6} {'levels':>8}")
+    start = 0
+    for index, (frames, load) in enumerate(PHASES):
+        work = np.array(updates.work[start:start + frames]) * 1e3
+        levels = updates.levels[start:start + frames]
+        late = np.mean(work > 1e3 / starwhals.FPS)
+        print(f"{index:>5} {load:>8.1f} {len(work):>7} {np.mean(work):>8.2f} {late:>6.0%} "
+              f"{min(levels)}-{max(levels):<6}")
+        start += frames
+    pygame.quit()
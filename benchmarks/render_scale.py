@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Frame cost at several render scales: fill, obstacles and narwhals drawn
+# offscreen, then stretched to the window
+# Run from the repository root: python benchmarks/render_scale.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from render_target import RenderTarget
+from starwhals import Camera, Player, player_outlines
+
+WINDOW = (2560, 1440)  # A large monitor, where fill and blit cost matter
+SCALES = (1.0, 0.8, 0.7, 0.5)
+FRAMES = 60
+
+def frame_times(target, level, camera, players):
+    draw, upscale = [], []
+    for _ in range(FRAMES):
+        start = time.perf_counter()
+        canvas = target.surface
+        camera.render_scale = target.scale
+        canvas.fill(level.background_color)
+        obstacles = level.obstacles
+        visible = obstacles.in_box(*camera.world_bounds())
+        for rect in camera.apply_rects(obstacles.rects(visible)):
+            pygame.draw.rect(canvas, level.obstacle_color, rect)
+        for player, outline in zip(players, player_outlines(players, camera)):
+            player.draw(canvas, camera, outline)
+        middle = time.perf_counter()
+        target.present()
+        draw.append(middle - start)
+        upscale.append(time.perf_counter() - middle)
+    return np.median(draw) * 1e3, np.median(upscale) * 1e3
+
+if __name__ == "__main__":
+    pygame.init()
+    # The camera frames whatever starwhals thinks the screen is
+    starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT = WINDOW
+    window = pygame.display.set_mode(WINDOW)
+    level = starwhals.levels[2]
+    spawn_points = level.spawn_points(16)
+    level.obstacles = level.generate_obstacles(spawn_points)
+    players = [Player(x, y, starwhals.player_color(index), None) for index, (x, y) in enumerate(spawn_points)]
+    camera = Camera(level.world_size)
+    camera.zoom = WINDOW[0] / level.width
+    print(f"{level.name}, {len(players)} narwhals, {starwhals.SCREEN_WIDTH}x{starwhals.SCREEN_HEIGHT} window")
+    print(f"{'scale':>6} {'smooth':>7} {'draw ms':>8} {'upscale ms':>11} {'total ms':>9}")
+    for scale in SCALES:
+        for smooth in (False, True):
+            if scale == 1.0 and smooth:
+                continue
+            target = RenderTarget(window, scale, smooth=smooth)
+            draw, upscale = frame_times(target, level, camera, players)
+            print(f"{scale:>6.1f} {'yes' if smooth else 'no':>7} {draw:>8.2f} {upscale:>11.2f} {draw + upscale:>9.2f}")
+    pygame.quit()
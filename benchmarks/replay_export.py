@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Replay export: where a frame's time goes (drawing vs PNG encoding) and
+# export throughput as worker processes are added
+# Run from the repository root: python benchmarks/replay_export.py
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from replay_export import MatchReplay, ReplayState, export, save_png, view_size
+from telemetry import TelemetrySink, read_telemetry
+
+MATCH_TICKS = 3600      # One minute at 60 ticks per second
+EXPORT_TICKS = 960      # Frames per throughput run
+RESOLUTIONS = ((1280, 720), (1920, 1080))
+
+def record(path, level):
+    # A headless two-player match on a fresh layout
+    random.seed(5)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for player, angle in zip(players, (30, 170)):
+        player.controls = None
+        player.angle = angle
+        player.health = 100  # Keep both swimming for the whole match
+    sink = TelemetrySink(path, log=lambda line: None)
+    sink.start_match(players, level.world_size, obstacles)
+    for _ in range(MATCH_TICKS):
+        starwhals.step_players(players, obstacles, level.world_size, telemetry=sink)
+        sink.record_tick(players)
+    sink.close()
+
+def frame_costs(path, level, resolution, frames=60):
+    # Milliseconds per frame to advance and draw, and to encode with each PNG writer
+    replay = MatchReplay(read_telemetry(path))
+    view = view_size(replay, resolution, None)
+    state = ReplayState(starwhals, replay, view)
+    camera = state.camera
+    camera.render_scale = resolution[0] / view[0]
+    obstacles = replay.obstacles()
+    canvas = pygame.Surface(resolution)
+    output = tempfile.mkdtemp()
+    draw = pygame_png = fast_png = 0.0
+    for tick in range(frames):
+        start = time.perf_counter()
+        state.advance(tick)
+        canvas.fill(level.background_color)
+        visible = obstacles.in_box(*camera.world_bounds())
+        for screen_rect in camera.apply_rects(obstacles.rects(visible)):
+            pygame.draw.rect(canvas, level.obstacle_color, screen_rect)
+        for player, outline in zip(state.players, starwhals.player_outlines(state.players, camera)):
+            player.draw(canvas, camera, outline, starwhals.lod_tier(player.length * camera.zoom))
+        starwhals.draw_health(canvas, state.players)
+        drawn = time.perf_counter()
+        pygame.image.save(canvas, os.path.join(output, "pygame.png"))
+        saved = time.perf_counter()
+        save_png(canvas, os.path.join(output, "fast.png"))
+        draw += drawn - start
+        pygame_png += saved - drawn
+        fast_png += time.perf_counter() - saved
+    return draw / frames * 1e3, pygame_png / frames * 1e3, fast_png / frames * 1e3
+
+if __name__ == "__main__":
+    level = starwhals.levels[2]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "benchmark-deep-sea.swt")
+    record(path, level)
+    print(f"{level.name}, {MATCH_TICKS}-tick match, {os.cpu_count()} CPUs")
+
+    print(f"{'resolution':>10} {'draw ms':>8} {'pygame png ms':>14} {'save_png ms':>12}")
+    for resolution in RESOLUTIONS:
+        draw, pygame_png, fast_png = frame_costs(path, level, resolution)
+        print(f"{resolution[0]:>5}x{resolution[1]:<4} {draw:>8.2f} {pygame_png:>14.2f} {fast_png:>12.2f}")
+
+    print(f"\n{EXPORT_TICKS} frames at 1280x720")
+    print(f"{'processes':>9} {'seconds':>8} {'frames/s':>9} {'x real time':>12} {'speedup':>8} {'keyframes ms':>13}")
+    baseline = None
+    for processes in sorted({1, 2, os.cpu_count() or 1}):
+        output = tempfile.mkdtemp()
+        start = time.perf_counter()
+        frames, used, keyframe_time = export(path, output, level_index=2, resolution=(1280, 720),
+                                             first=MATCH_TICKS - EXPORT_TICKS, processes=processes)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{used:>9} {elapsed:>8.2f} {frames / elapsed:>9.1f} {frames / elapsed / starwhals.FPS:>12.2f} "
+              f"{baseline / elapsed:>8.2f} {keyframe_time * 1e3:>13.0f}")
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Match telemetry: game-thread cost per tick, file size per codec, a read-back
+# check, and a writer pushed past its limit to show dropped buffers
+# Run from the repository root: python benchmarks/telemetry_sink.py
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import starwhals
+from telemetry import EVENT_NAMES, TelemetrySink, read_telemetry
+
+TICKS = 36_000  # Ten minutes at 60 ticks per second
+
+def simulate(level, player_count, ticks, telemetry):
+    # Headless match ticks; returns seconds per tick on the game thread and the players
+    random.seed(1)
+    spawn_points = level.spawn_points(player_count)
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for player in players:
+        player.health = 100  # Keep everyone swimming
+    if telemetry is not None:
+        telemetry.start_match(players, level.world_size, obstacles)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        starwhals.step_players(players, obstacles, level.world_size, telemetry=telemetry)
+        if telemetry is not None:
+            telemetry.record_tick(players)
+    return (time.perf_counter() - start) / ticks, players
+
+def quiet(line):
+    pass
+
+if __name__ == "__main__":
+    pygame.display.set_mode((starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    level = starwhals.levels[2]
+    directory = tempfile.mkdtemp()
+    print(f"{level.name}, {TICKS} ticks per run")
+    print(f"{'players':>7} {'codec':>5} {'tick us':>8} {'+telemetry us':>14} {'close ms':>9} "
+          f"{'raw KiB':>8} {'file KiB':>9} {'ratio':>6} {'dropped':>8}")
+    for player_count in (2, 16):
+        ticks = TICKS if player_count == 2 else TICKS // 4
+        baseline, _ = simulate(level, player_count, ticks, None)
+        for codec in ("zlib", "lzma"):
+            path = os.path.join(directory, f"{player_count}-{codec}.swt")
+            sink = TelemetrySink(path, codec, log=quiet)
+            with_sink, players = simulate(level, player_count, ticks, sink)
+            start = time.perf_counter()
+            sink.close()
+            closing = time.perf_counter() - start
+            print(f"{player_count:>7} {codec:>5} {baseline * 1e6:>8.1f} {(with_sink - baseline) * 1e6:>14.1f} "
+                  f"{closing * 1e3:>9.1f} {sink.bytes_in / 1024:>8.0f} {sink.bytes_out / 1024:>9.0f} "
+                  f"{sink.bytes_in / sink.bytes_out:>6.1f} {sink.dropped_buffers:>8}")
+            # Read back: every tick present and the final states exact
+            records = read_telemetry(path)
+            states = records["state"]
+            assert len(states) == ticks * player_count
+            last = states[states["tick"] == ticks - 1]
+            assert np.array_equal(last["x"], np.float32([player.pos[0] for player in players]))
+            if player_count == 2 and codec == "zlib":
+                events = records["event"]
+    kinds = np.bincount(events["kind"], minlength=len(EVENT_NAMES))
+    print("events in the 2-player match: " + ", ".join(f"{name} {count}" for name, count in zip(EVENT_NAMES, kinds)))
+
+    # A writer that cannot keep up: tiny buffers, one spare, slow compression
+    path = os.path.join(directory, "overrun.swt")
+    lines = []
+    sink = TelemetrySink(path, "lzma", buffer_rows=64, spare_buffers=1, log=lines.append)
+    simulate(level, 64, 600, sink)
+    sink.close()
+    records = read_telemetry(path)
+    print(f"overrun: {sink.dropped_buffers} buffers dropped, {len(records['state'])} of {600 * 64} states kept, "
+          f"file records {sum(records['dropped'].values())} lost buffers; last log: {lines[-1]}")
+    pygame.quit()
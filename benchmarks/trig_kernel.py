@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Scalar math kernel: primitive timings, Player.move cost per trig resolution and
+# how far the table's trajectories stray from exact trig
+# Run from the repository root: python benchmarks/trig_kernel.py
+import copy
+import math
+import os
+import random
+import sys
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import numpy as np
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fast_math
+import starwhals
+from starwhals import create_players, step_players
+
+RESOLUTIONS = (None, 65536, 4096, 360)
+TICKS = 600  # Ten seconds of play per seed
+
+def per_call(statement, number=200_000, **names):
+    return min(timeit.repeat(statement, globals=names, number=number, repeat=5)) / number * 1e9
+
+def primitives():
+    vel = np.array([3.0, -4.0])
+    angle = 137.25
+    print("primitive                     ns/call")
+    rows = (
+        ("np.linalg.norm(vel)", per_call("np.linalg.norm(vel)", np=np, vel=vel)),
+        ("fast_math.length(vx, vy)", per_call("length(vel[0], vel[1])", length=fast_math.length, vel=vel)),
+        ("np.array([cos(rad), sin(rad)])", per_call("np.array([math.cos(math.radians(a)), math.sin(math.radians(a))])",
+                                                    np=np, math=math, a=angle)),
+        ("direction() exact", per_call("direction(a)", direction=fast_math.direction, a=angle)),
+    )
+    for name, cost in rows:
+        print(f"{name:<30}{cost:>8.0f}")
+    fast_math.set_trig_resolution(4096)
+    print(f"{'direction() 4096-step table':<30}{per_call('direction(a)', direction=fast_math.direction, a=angle):>8.0f}")
+    fast_math.set_trig_resolution(None)
+
+class Keys:
+    # Scripted key presses so every run steers the same way
+    def __init__(self):
+        self.down = set()
+    def __getitem__(self, key):
+        return key in self.down
+
+def compare(resolution, seed, level):
+    # Plays a scripted match with exact trig. Every tick is also stepped from the
+    # same state with the table, giving the one-tick error; a second copy follows
+    # the table all along to show when the two matches visibly part ways.
+    random.seed(seed)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    players = create_players(spawn_points)
+    table_players = copy.deepcopy(players)
+    keys = Keys()
+    pygame.key.get_pressed = lambda: keys
+    script = random.Random(seed)
+    choices = [players[0].controls[0], players[0].controls[1], players[1].controls[0], players[1].controls[1], None]
+    step_error = 0.0
+    diverged = None
+    for tick in range(TICKS):
+        if tick % 20 == 0:
+            keys.down = {script.choice(choices)}
+        shadow = copy.deepcopy(players)
+        for group, steps in ((shadow, resolution), (table_players, resolution), (players, None)):
+            fast_math.set_trig_resolution(steps)
+            random.seed(seed * 100_003 + tick)  # Collision jitter identical in every run
+            step_players(group, obstacles, level.world_size)
+        fast_math.set_trig_resolution(None)
+        step_error = max(step_error, max(np.abs(a.pos - b.pos).max() for a, b in zip(shadow, players)))
+        drift = max(np.abs(a.pos - b.pos).max() for a, b in zip(table_players, players))
+        if diverged is None and drift > 1.0:
+            diverged = tick
+    return step_error, TICKS if diverged is None else diverged
+
+def move_cost(resolution, level):
+    fast_math.set_trig_resolution(resolution)
+    random.seed(0)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    player, other = create_players(spawn_points)
+    cost = per_call("player.move(obstacles, (other,), world_size)", number=5_000,
+                    player=player, other=other, obstacles=obstacles, world_size=level.world_size)
+    fast_math.set_trig_resolution(None)
+    return cost / 1e3
+
+if __name__ == "__main__":
+    pygame.init()
+    primitives()
+    print()
+    level = starwhals.levels[0]
+    print(f"{'resolution':>10} {'move us':>8} {'tick error':>11} {'bound':>9} {'ticks to 1 unit':>16}")
+    failed = False
+    for resolution in RESOLUTIONS:
+        results = [compare(resolution, seed, level) for seed in range(4)]
+        step_error = max(error for error, _ in results)
+        # Thrust is the only table lookup feeding position: half a step of angle error
+        bound = 0.0 if resolution is None else create_players(level.spawn_points())[0].thrust * math.pi / resolution
+        failed |= step_error > bound * 1.01 + 1e-9
+        print(f"{str(resolution or 'exact'):>10} {move_cost(resolution, level):>8.1f} {step_error:>11.2e} "
+              f"{bound:>9.2e} {min(ticks for _, ticks in results):>16}")
+    pygame.quit()
+    sys.exit("one-tick error above bound" if failed else 0)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# Endless arena: the world is split into square chunks that are generated on demand
+#
+# Each chunk's obstacles come from an RNG seeded with (seed, chunk_x, chunk_y), so a
+# chunk always looks the same no matter when or how often it is generated. Chunks
+# are requested around the camera and players, built on a background worker thread
+# and evicted least-recently-used first once the resident set exceeds its memory
+# budget (never while they are still needed near a player or the camera).
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from obstacle_store import ObstacleStore
+
+CHUNK_SIZE = 2048          # World units per chunk side
+PREFETCH_CHUNKS = 1        # Extra ring of chunks requested around each box
+MEMORY_BUDGET = 1 << 20    # Bytes of resident chunk data before eviction starts
+SPAWN_CLEARANCE = 400      # Keep obstacles this far from the spawn points
+SAFE_MARGIN = 160          # Half-size of the clear box around each obstacle (as in is_position_clear)
+TIMING_SAMPLES = 1024      # Most recent chunk builds kept for the timing measurements
+
+class EndlessArena:
+    def __init__(self, seed, obstacle_density, obstacle_size_range, spawn_points,
+                 chunk_size=CHUNK_SIZE, memory_budget=MEMORY_BUDGET):
+        self.seed = seed
+        self.obstacle_density = obstacle_density  # Obstacles per square world unit
+        self.obstacle_size_range = obstacle_size_range
+        self.spawn_points = np.array(spawn_points, dtype=float)
+        self.chunk_size = chunk_size
+        self.memory_budget = memory_budget
+
+        self._chunks = OrderedDict()  # (chunk_x, chunk_y) -> ObstacleStore, in LRU order
+        self._pending = {}            # (chunk_x, chunk_y) -> time requested
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = None
+        self._last_key = None
+        self._last_store = None
+
+        # Measurements
+        self.generation_times = deque(maxlen=TIMING_SAMPLES)  # Seconds spent generating each chunk
+        self.ready_latencies = deque(maxlen=TIMING_SAMPLES)   # Seconds from request to resident
+        self.generated = 0
+        self.evictions = 0
+
+    # --- Generation ---
+    def generate_chunk(self, chunk_x, chunk_y):
+        # Deterministic layout for one chunk; obstacles stay inside the chunk so
+        # neighbouring chunks never need to be consulted
+        rng = np.random.default_rng((self.seed & 0xFFFFFFFF, chunk_x & 0xFFFFFFFF, chunk_y & 0xFFFFFFFF))
+        size = self.chunk_size
+        target = rng.poisson(self.obstacle_density * size * size)
+        attempts = max(target * 6, 1)
+        low, high = self.obstacle_size_range
+        widths = rng.integers(low, high + 1, attempts)
+        heights = rng.integers(low, high + 1, attempts)
+        xs = chunk_x * size + rng.uniform(0, 1, attempts) * (size - widths)
+        ys = chunk_y * size + rng.uniform(0, 1, attempts) * (size - heights)
+
+        # Drop candidates near a spawn point in one vectorized step
+        distances = np.hypot(xs[:, None] - self.spawn_points[:, 0], ys[:, None] - self.spawn_points[:, 1])
+        candidates = np.flatnonzero((distances >= SPAWN_CLEARANCE).all(axis=1))
+
+        store = ObstacleStore(max(target, 1))
+        for i in candidates:
+            if len(store) >= target:
+                break
+            if not store.overlapping(xs[i] - SAFE_MARGIN, ys[i] - SAFE_MARGIN, 2 * SAFE_MARGIN, 2 * SAFE_MARGIN).any():
+                store.add_rect(xs[i], ys[i], widths[i], heights[i])
+        return store
+
+    def _build(self, key):
+        start = time.perf_counter()
+        store = self.generate_chunk(*key)
+        finished = time.perf_counter()
+        with self._lock:
+            requested = self._pending.pop(key, start)
+            self._chunks[key] = store
+            self.generation_times.append(finished - start)
+            self.ready_latencies.append(finished - requested)
+            self.generated += 1
+
+    def _run_worker(self):
+        while True:
+            key = self._requests.get()
+            if key is None:
+                return
+            with self._lock:
+                done = key in self._chunks
+            if not done:
+                self._build(key)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run_worker, daemon=True)
+            self._worker.start()
+
+    def close(self):
+        if self._worker is not None:
+            self._requests.put(None)
+            self._worker.join()
+            self._worker = None
+
+    # --- Residency ---
+    def chunks_for(self, box, ring=0):
+        left, top, right, bottom = box
+        col0 = int(left // self.chunk_size) - ring
+        col1 = int(right // self.chunk_size) + ring
+        row0 = int(top // self.chunk_size) - ring
+        row1 = int(bottom // self.chunk_size) + ring
+        return {(x, y) for y in range(row0, row1 + 1) for x in range(col0, col1 + 1)}
+
+    def request(self, boxes, blocking=False):
+        # Ask for every chunk near the boxes; blocking builds the missing ones right away
+        wanted = set()
+        for box in boxes:
+            wanted |= self.chunks_for(box, PREFETCH_CHUNKS)
+        now = time.perf_counter()
+        missing = []
+        with self._lock:
+            for key in wanted:
+                if key in self._chunks:
+                    self._chunks.move_to_end(key)
+                elif key not in self._pending:
+                    self._pending[key] = now
+                    missing.append(key)
+        if blocking:
+            for key in missing:
+                self._build(key)
+        else:
+            self._ensure_worker()
+            # Nearest chunks first
+            centre = np.mean([((box[0] + box[2]) / 2, (box[1] + box[3]) / 2) for box in boxes], axis=0)
+            missing.sort(key=lambda key: ((key[0] + 0.5) * self.chunk_size - centre[0]) ** 2 +
+                                         ((key[1] + 0.5) * self.chunk_size - centre[1]) ** 2)
+            for key in missing:
+                self._requests.put(key)
+        self._evict(wanted)
+
+    def _evict(self, keep):
+        with self._lock:
+            total = sum(store.nbytes for store in self._chunks.values())
+            for key in list(self._chunks):
+                if total <= self.memory_budget:
+                    break
+                if key in keep:
+                    continue
+                total -= self._chunks.pop(key).nbytes
+                self.evictions += 1
+
+    def gather(self, boxes):
+        # Obstacles of the resident chunks touching the boxes (missing chunks are requested)
+        self.request(boxes)
+        needed = set()
+        for box in boxes:
+            needed |= self.chunks_for(box)
+        with self._lock:
+            resident = tuple(sorted(key for key in needed if key in self._chunks))
+            if resident == self._last_key:
+                return self._last_store
+            stores = [self._chunks[key] for key in resident]
+        combined = ObstacleStore(max(1, sum(len(store) for store in stores)))
+        for store in stores:
+            combined.extend(store.records)
+        self._last_key = resident
+        self._last_store = combined
+        return combined
+
+    @property
+    def resident_chunks(self):
+        return len(self._chunks)
+
+    @property
+    def resident_bytes(self):
+        with self._lock:
+            return sum(store.nbytes for store in self._chunks.values())
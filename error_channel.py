@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Rate-limited error reporting for code that runs every tick or frame
+#
+# Errors are counted per site (e.g. "Player.draw eyes"). The first few from a
+# site in each summary interval are printed as they happen; the rest are only
+# counted and show up in the summary printed when the interval ends, so one
+# recurring problem costs a few lines every interval instead of one per frame.
+import collections
+import time
+
+ERROR_LOG_LIMIT = 3             # Errors printed per site in each interval
+ERROR_SUMMARY_INTERVAL = 10.0   # Seconds between summaries
+
+class ErrorChannel:
+    def __init__(self, limit=ERROR_LOG_LIMIT, interval=ERROR_SUMMARY_INTERVAL, log=print, clock=time.monotonic):
+        self.limit = limit
+        self.interval = interval
+        self.log = log
+        self.clock = clock
+        self.counts = collections.Counter()  # Errors per site since start
+        self.window = collections.Counter()  # Errors per site in the current interval
+        self.last_message = {}
+        self.window_start = clock()
+
+    def report(self, site, error):
+        self.counts[site] += 1
+        self.window[site] += 1
+        message = f"{type(error).__name__}: {error}"
+        self.last_message[site] = message
+        seen = self.window[site]
+        if seen < self.limit:
+            self.log(f"[error] {site}: {message}")
+        elif seen == self.limit:
+            self.log(f"[error] {site}: {message} (counting further errors here until the next summary)")
+
+    def tick(self):
+        # Call once per frame; prints the summary once the interval is over
+        if self.clock() - self.window_start >= self.interval:
+            self.summarize()
+
+    def summarize(self):
+        # Print the errors of the current interval (if any) and start a new one
+        now = self.clock()
+        if self.window:
+            sites = ", ".join(f"{site} x{count} (last: {self.last_message[site]})"
+                              for site, count in self.window.most_common())
+            self.log(f"[error] {sum(self.window.values())} errors in the last {now - self.window_start:.0f}s: {sites}")
+        self.window.clear()
+        self.window_start = now
+
+# Shared channel for the game modules
+errors = ErrorChannel()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Scalar math kernel for the per-tick narwhal updates
+#
+# The physics works on one 2D vector at a time, where NumPy's per-call overhead
+# dwarfs the arithmetic. These helpers take and return plain floats. Sine and
+# cosine come from the math module by default; set_trig_resolution() swaps in a
+# lookup table with that many steps per full turn.
+import math
+
+TRIG_RESOLUTION = None  # Steps per turn for the lookup table (None = exact math)
+trig_generation = 0     # Bumped by set_trig_resolution, so directions cached elsewhere can tell they are stale
+
+_steps_per_degree = None
+_cos_table = None
+_sin_table = None
+
+def set_trig_resolution(steps):
+    # Python lists index faster than NumPy arrays for single lookups
+    global TRIG_RESOLUTION, trig_generation, _steps_per_degree, _cos_table, _sin_table
+    TRIG_RESOLUTION = steps
+    trig_generation += 1
+    if steps is None:
+        _steps_per_degree = _cos_table = _sin_table = None
+        return
+    _steps_per_degree = steps / 360
+    _cos_table = [math.cos(2 * math.pi * i / steps) for i in range(steps)]
+    _sin_table = [math.sin(2 * math.pi * i / steps) for i in range(steps)]
+
+def direction(degrees):
+    # Unit vector (cos, sin) for an angle in degrees
+    if _cos_table is None:
+        radians = math.radians(degrees)
+        return math.cos(radians), math.sin(radians)
+    index = math.floor(degrees * _steps_per_degree + 0.5) % TRIG_RESOLUTION
+    return _cos_table[index], _sin_table[index]
+
+def heading(x, y):
+    # Angle of a vector in degrees
+    return math.degrees(math.atan2(y, x))
+
+def wrap_degrees(angle):
+    # Signed angle in (-180, 180]
+    angle %= 360
+    return angle - 360 if angle > 180 else angle
+
+def length(x, y):
+    # Same rounding as np.linalg.norm on a 2-vector, without the call overhead
+    return math.sqrt(x * x + y * y)
+
+def clamp(value, low, high):
+    return low if value < low else high if value > high else value
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Save, restore and fork a running match
+#
+# A snapshot holds everything the next tick depends on: the level's parameters,
+# the obstacles loaded around the players, every narwhal's physics and tail
+# state, the camera, the round state with the time left on the end screen, and
+# the state of the random module (obstacle generation and collision jitter use
+# it), and on the end screen the arena already generated for the rematch.
+# Restoring a snapshot and stepping on gives exactly the ticks the saved match
+# would have had. Particles are cosmetic and start empty again.
+#
+# Snapshots are a few kilobytes of fixed structs and raw NumPy buffers, so both
+# directions take tens of microseconds: cheap enough for quicksaves, rollback
+# and bots trying moves ahead.
+#
+# Layout (little-endian):
+#   header     magic, version, round state, whether the next arena is held, ms
+#              left on the end screen, player, obstacle and polygon vertex
+#              counts, and the next arena's obstacle and vertex counts
+#   level      name, world size (0 when endless), obstacle count and sizes,
+#              colours, endless seed
+#   camera     x, y, zoom, target zoom, zoom speed
+#   random     Mersenne Twister words and position, cached gauss value
+#   players    one PLAYER_DTYPE record each
+#   obstacles  records, vertex offsets and polygon vertices
+#   next arena the same three sections for the rematch layout (end screen only)
+#
+# Bots plan on MatchBranch forks instead: a fork shares the obstacle layout
+# with the match and its parent, and shares the narwhals until either side
+# steps (copy on write), so forking is O(players) at most and O(1) for a branch
+# that is only looked at. Each branch carries its own random state, so
+# simulating it never disturbs the match or its siblings.
+import random
+import struct
+
+import numpy as np
+
+from obstacle_store import OBSTACLE_DTYPE, ObstacleStore
+
+STATE_MAGIC = b"SWSTATE\0"
+STATE_VERSION = 2
+STATE_HEADER = struct.Struct("<8sHB?IIIIII")  # magic, version, round state, has next arena, ms left, players,
+                                              # obstacles, vertices, next arena obstacles and vertices
+LEVEL_HEADER = struct.Struct("<64sddIII3s3sxxQ")  # name, width, height, count, min/max size, colours, seed
+CAMERA_STATE = struct.Struct("<5d")          # x, y, zoom, target zoom, zoom speed
+RANDOM_STATE = struct.Struct("<625I?7xd")    # state words and position, has gauss, gauss
+
+ROUND_STATES = ("playing", "round_over")
+NO_CONTROL = -1
+
+PLAYER_DTYPE = np.dtype([
+    ('pos', '<f8', 2), ('vel', '<f8', 2),
+    ('angle', '<f8'), ('tail_angle', '<f8'), ('target_tail_angle', '<f8'), ('speed', '<f8'),
+    ('controls', '<i4', 2), ('health', '<i2'), ('color', 'u1', 3), ('belly_color', 'u1', 3),
+])
+
+def _level_header(level):
+    # Levels are rebuilt from code or arena files, so a snapshot only identifies its level
+    width, height = level.world_size or (0, 0)
+    seed = level.endless.seed if level.endless is not None else 0
+    return LEVEL_HEADER.pack(level.name.encode("utf-8")[:64], width, height, level.obstacle_count,
+                             level.obstacle_size_range[0], level.obstacle_size_range[1],
+                             bytes(level.background_color[:3]), bytes(level.obstacle_color[:3]), seed)
+
+def _obstacle_sections(obstacles):
+    return obstacles.records.tobytes() + obstacles.offsets.tobytes() + obstacles.vertices.tobytes()
+
+def _read_obstacles(data, offset, obstacle_count, vertex_count):
+    # ObstacleStore over the three sections at offset, and the offset after them
+    records = np.frombuffer(data, dtype=OBSTACLE_DTYPE, count=obstacle_count, offset=offset)
+    offset += obstacle_count * OBSTACLE_DTYPE.itemsize
+    offsets = np.frombuffer(data, dtype='<i8', count=obstacle_count + 1, offset=offset)
+    offset += (obstacle_count + 1) * 8
+    vertices = np.frombuffer(data, dtype='<f4', count=vertex_count * 2, offset=offset)
+    return ObstacleStore.from_arrays(records, offsets, vertices), offset + vertex_count * 8
+
+def save_match(level, obstacles, players, camera, round_state="playing", round_left=0, next_obstacles=None):
+    # Snapshot as bytes; round_left is the end screen's milliseconds left and
+    # next_obstacles the layout generated for the rematch
+    states = np.array([(player.pos, player.vel, player.angle, player.tail_angle, player.target_tail_angle,
+                        player.speed, player.controls or (NO_CONTROL, NO_CONTROL), player.health,
+                        player.color[:3], player.belly_color[:3]) for player in players], dtype=PLAYER_DTYPE)
+    _, words, gauss = random.getstate()
+    held = next_obstacles is not None
+    return b"".join((
+        STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, ROUND_STATES.index(round_state), held,
+                          max(0, round(round_left)), len(players), len(obstacles), len(obstacles.vertices),
+                          len(next_obstacles) if held else 0, len(next_obstacles.vertices) if held else 0),
+        _level_header(level),
+        CAMERA_STATE.pack(camera.x, camera.y, camera.zoom, camera.target_zoom, camera.zoom_speed),
+        RANDOM_STATE.pack(*words, gauss is not None, gauss or 0.0),
+        states.tobytes(),
+        _obstacle_sections(obstacles),
+        _obstacle_sections(next_obstacles) if held else b"",
+    ))
+
+def restore_match(data, level, players, camera):
+    # Put a snapshot back into the level, players and camera it was taken from (or
+    # fresh ones for the same level and player count). Returns the restored
+    # obstacles, round state, milliseconds left on the end screen and the rematch
+    # layout (None unless the snapshot was taken on the end screen).
+    if len(data) < STATE_HEADER.size:
+        raise ValueError("not a Starwhals match state")
+    magic, version, round_state, held, round_left, player_count, obstacle_count, vertex_count, \
+        next_count, next_vertex_count = STATE_HEADER.unpack_from(data)
+    if magic != STATE_MAGIC:
+        raise ValueError("not a Starwhals match state")
+    if version != STATE_VERSION:
+        raise ValueError(f"unsupported match state version {version}")
+    offset = STATE_HEADER.size
+    saved_level = bytes(data[offset:offset + LEVEL_HEADER.size])
+    if saved_level != _level_header(level):
+        name = LEVEL_HEADER.unpack(saved_level)[0].rstrip(b"\0").decode("utf-8", "replace")
+        raise ValueError(f"match state is for {name}, not {level.name}")
+    if player_count != len(players):
+        raise ValueError(f"match state has {player_count} players, not {len(players)}")
+    sizes = (CAMERA_STATE.size, RANDOM_STATE.size, player_count * PLAYER_DTYPE.itemsize,
+             obstacle_count * OBSTACLE_DTYPE.itemsize, (obstacle_count + 1) * 8, vertex_count * 8,
+             (next_count * OBSTACLE_DTYPE.itemsize + (next_count + 1) * 8 + next_vertex_count * 8) if held else 0)
+    if len(data) != offset + LEVEL_HEADER.size + sum(sizes):
+        raise ValueError("match state is truncated")
+    offset += LEVEL_HEADER.size
+
+    camera.x, camera.y, camera.zoom, camera.target_zoom, camera.zoom_speed = CAMERA_STATE.unpack_from(data, offset)
+    offset += CAMERA_STATE.size
+    fields = RANDOM_STATE.unpack_from(data, offset)
+    random.setstate((3, fields[:625], fields[626] if fields[625] else None))
+    offset += RANDOM_STATE.size
+
+    states = np.frombuffer(data, dtype=PLAYER_DTYPE, count=player_count, offset=offset)
+    for player, state in zip(players, states.tolist()):
+        pos, vel, player.angle, player.tail_angle, player.target_tail_angle, player.speed, controls, \
+            player.health, color, belly = state
+        player.pos = np.array(pos)
+        player.vel = np.array(vel)
+        player.controls = None if controls[0] == NO_CONTROL else list(controls)
+        player.color = tuple(color)
+        player.belly_color = tuple(belly)
+        player._facing_angle = None  # The facing cache is rebuilt from the angle
+    offset += sizes[2]
+
+    level.obstacles, offset = _read_obstacles(data, offset, obstacle_count, vertex_count)
+    next_obstacles = _read_obstacles(data, offset, next_count, next_vertex_count)[0] if held else None
+    return level.obstacles, ROUND_STATES[round_state], round_left, next_obstacles
+
+class MatchBranch:
+    # Headless lookahead copy of a match. step is starwhals.step_players; the
+    # obstacles are never written, so every branch of a match shares them.
+    def __init__(self, players, obstacles, world_size, step, tick=0):
+        self.players = list(players)
+        self.obstacles = obstacles
+        self.world_size = world_size
+        self.step_players = step
+        self.random_state = random.getstate()
+        self.tick = tick
+        self.hits = []    # (tick, attacker index, victim index) since the match was forked
+        self._shared = True  # The players belong to the match (or another branch) until copied
+
+    def fork(self):
+        branch = object.__new__(MatchBranch)
+        branch.__dict__.update(self.__dict__)
+        branch.hits = list(self.hits)
+        # The two share the narwhals now, whether or not this branch had its own copy:
+        # whichever of them steps first copies them
+        branch._shared = self._shared = True
+        return branch
+
+    def step(self, turns, ticks=1):
+        # Run ticks with each narwhal holding its turn (-1, 0 or 1; None keeps the turn
+        # it had, and narwhals steered by the keyboard swim straight); returns the hits
+        if self._shared:
+            self.players = [player.clone() for player in self.players]
+            for player in self.players:
+                player.controls = None  # Branches never read the keyboard
+            self._shared = False
+        for player, turn in zip(self.players, turns):
+            if turn is not None:
+                player.turn = turn
+        match_state = random.getstate()
+        random.setstate(self.random_state)
+        first_hit = len(self.hits)
+        try:
+            for _ in range(ticks):
+                self.tick += 1
+                for attacker, victim in self.step_players(self.players, self.obstacles, self.world_size):
+                    self.hits.append((self.tick, self.players.index(attacker), self.players.index(victim)))
+        finally:
+            self.random_state = random.getstate()
+            random.setstate(match_state)
+        return self.hits[first_hit:]
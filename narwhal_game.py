@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
+import functools
 import pygame
 import math
 import numpy as np
 import random
+from error_channel import errors
 
 # Initialize Pygame
 pygame.init()
@@ -100,37 +102,48 @@ def is_position_clear(x, y, obstacles, spawn_points, min_distance=400):  # Incre
 
 # Obstacle class
 class Obstacle:
+    __slots__ = ('rect',)
+    
     def __init__(self, x, y, width, height):
         self.rect = pygame.Rect(x, y, width, height)
         
     def draw(self, screen):
         pygame.draw.rect(screen, GRAY, self.rect)
 
+@functools.lru_cache(maxsize=None)
+def belly_color(color):
+    # Lighter belly color (30% lighter for more contrast), one shared tuple per color
+    return tuple(min(c + 75, 255) for c in color)
+
 # Player class
+# Shared narwhal constants live on the class; instances keep only their state in slots
 class Player:
+    length = 240  # Slightly longer body
+    width = 60    # Slightly wider body
+    horn_length = 100  # Longer horn
+    horn_width = 10    # Slightly wider horn
+    rotation_speed = 4.5  # Reduced for smoother turning
+    thrust = 0.5    # Reduced for better control
+    rotation_momentum = 0.92  # New: maintains some rotation after key release
+    max_speed = 12  # New: maximum speed cap
+    max_health = 3
+    # Tail joint properties
+    tail_length = length * 0.7  # Longer tail
+    tail_response = 0.15  # Reduced for smoother tail movement
+    
+    __slots__ = ('pos', 'vel', 'angle', 'color', 'belly_color', 'controls', 'health',
+                 'tail_angle', 'target_tail_angle', 'angular_velocity')
+    
     def __init__(self, x, y, color, controls):
         self.pos = np.array([float(x), float(y)])
         self.vel = np.array([0.0, 0.0])
         self.angle = 0
         self.color = color
-        # Calculate lighter belly color (30% lighter for more contrast)
-        self.belly_color = tuple(min(c + 75, 255) for c in color)
+        self.belly_color = belly_color(tuple(color))
         self.controls = controls
-        self.length = 240  # Slightly longer body
-        self.width = 60    # Slightly wider body
-        self.horn_length = 100  # Longer horn
-        self.horn_width = 10    # Slightly wider horn
-        self.rotation_speed = 4.5  # Reduced for smoother turning
-        self.thrust = 0.5    # Reduced for better control
-        self.rotation_momentum = 0.92  # New: maintains some rotation after key release
-        self.max_speed = 12  # New: maximum speed cap
         self.health = 3    
-        self.max_health = 3
-        # Tail joint properties
         self.tail_angle = 0
         self.target_tail_angle = 0
-        self.tail_length = self.length * 0.7  # Longer tail
-        self.tail_response = 0.15  # Reduced for smoother tail movement
         self.angular_velocity = 0  # New: for smooth rotation
         
     def move(self, obstacles, other_player=None):
@@ -280,7 +293,7 @@ class Player:
                         # Add slight random movement to prevent getting stuck
                         self.vel += np.array([random.uniform(-0.3, 0.3), random.uniform(-0.3, 0.3)])
         except Exception as e:
-            print(f"Error in move: {e}")
+            errors.report("Player.move", e)
             # Restore previous position if there's an error
             self.pos = prev_pos
     
@@ -343,20 +356,25 @@ class Player:
             pygame.draw.polygon(screen, (100, 0, 0), outline_points, 2)  # Bottom outline
             
         except Exception as e:
-            print(f"Error drawing heart: {e}")
+            errors.report("Player.draw_heart", e)
             # Fallback to simple circle if there's an error
             try:
                 pygame.draw.circle(screen, RED, pos, size // 2)
             except:
                 pass
 
-    def draw(self, screen):
+    def draw(self, screen, scale=1.0):
         try:
+            # Drawn size (scaled by the camera zoom); the shared dimensions never change
+            length = self.length * scale
+            width = self.width * scale
+            horn_length = self.horn_length * scale
+            horn_width = self.horn_width * scale
             angle_rad = math.radians(self.angle)
             tail_angle_rad = math.radians(self.angle + self.tail_angle)
             
             # Calculate key positions and dimensions
-            total_body_length = self.length
+            total_body_length = length
             body_length = total_body_length * 0.66
             tail_length = total_body_length * 0.34
             first_tail_length = tail_length * 0.85
@@ -374,14 +392,15 @@ class Player:
             body_points_bottom = []
             num_points = 32
             
-            for i in range(num_points):
-                try:
+            # One handler around the whole loop keeps exception handling off the per-point path
+            try:
+                for i in range(num_points):
                     t = i / (num_points - 1) * 2 * math.pi
                     # Create oval shape with wider front
                     x = math.cos(t) * (body_length * 0.5)
                     # Modify width based on position (wider at front, normal at back)
                     width_factor = 1.0 + 0.15 * math.cos(t)  # 15% wider at front
-                    y = math.sin(t) * (self.width * 0.5 * width_factor)
+                    y = math.sin(t) * (width * 0.5 * width_factor)
                     
                     # Rotate the point
                     rotated_x = x * math.cos(angle_rad) - y * math.sin(angle_rad)
@@ -399,9 +418,8 @@ class Player:
                         body_points_top.append(point)
                     else:
                         body_points_bottom.append(point)
-                except Exception as e:
-                    print(f"Error calculating body point {i}: {e}")
-                    continue
+            except Exception as e:
+                errors.report("Player.draw body", e)
             
             # Draw bottom (belly) part first
             if len(body_points_bottom) >= 2:
@@ -415,8 +433,8 @@ class Player:
             
             # 2. Draw first tail triangle with thinner base and better overlap
             try:
-                tail_width_start = self.width * 0.72  # 20% thinner (0.9 * 0.8)
-                tail_width_middle = self.width * 0.24  # Keep proportional
+                tail_width_start = width * 0.72  # 20% thinner (0.9 * 0.8)
+                tail_width_middle = width * 0.24  # Keep proportional
                 
                 # Draw an overlap circle at the connection point for smoother transition
                 overlap_radius = tail_width_start * 0.6
@@ -433,11 +451,11 @@ class Player:
                 first_tail_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in first_tail_points]
                 pygame.draw.polygon(screen, self.color, first_tail_points)
             except Exception as e:
-                print(f"Error drawing first tail: {e}")
+                errors.report("Player.draw first tail", e)
             
             # 3. Draw second tail triangle with better overlap
             try:
-                tail_width_end = self.width * 1.4
+                tail_width_end = width * 1.4
                 
                 # Draw an overlap circle at the joint for smoother transition
                 overlap_radius = tail_width_middle * 0.8
@@ -454,31 +472,31 @@ class Player:
                 second_tail_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in second_tail_points]
                 pygame.draw.polygon(screen, self.color, second_tail_points)
             except Exception as e:
-                print(f"Error drawing second tail: {e}")
+                errors.report("Player.draw second tail", e)
             
             # 4. Draw straight horn
             try:
                 horn_base = body_center + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * (body_length * 0.5)
-                horn_tip = horn_base + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * self.horn_length
+                horn_tip = horn_base + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * horn_length
                 
                 horn_points = [
-                    horn_base + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * self.horn_width,
-                    horn_tip + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * (self.horn_width * 0.3),
-                    horn_tip + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * (self.horn_width * 0.3),
-                    horn_base + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * self.horn_width
+                    horn_base + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * horn_width,
+                    horn_tip + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * (horn_width * 0.3),
+                    horn_tip + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * (horn_width * 0.3),
+                    horn_base + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * horn_width
                 ]
                 # Clip points to screen
                 horn_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in horn_points]
                 pygame.draw.polygon(screen, self.color, horn_points)
             except Exception as e:
-                print(f"Error drawing horn: {e}")
+                errors.report("Player.draw horn", e)
             
             # 5. Draw angry eyes
             try:
                 # Calculate eye position
                 eye_pos = body_center + np.array([
-                    math.cos(angle_rad + math.pi/4) * self.width * 0.4,
-                    math.sin(angle_rad + math.pi/4) * self.width * 0.4
+                    math.cos(angle_rad + math.pi/4) * width * 0.4,
+                    math.sin(angle_rad + math.pi/4) * width * 0.4
                 ])
                 eye_pos = (int(np.clip(eye_pos[0], 6, WINDOW_WIDTH-6)), 
                           int(np.clip(eye_pos[1], 6, WINDOW_HEIGHT-6)))
@@ -526,7 +544,7 @@ class Player:
                     pygame.draw.lines(screen, self.color, False, eyelid_points, 2)
                 
             except Exception as e:
-                print(f"Error drawing eyes: {e}")
+                errors.report("Player.draw eyes", e)
             
             # 6. Draw heart
             try:
@@ -534,10 +552,10 @@ class Player:
                            int(np.clip(self.pos[1], 24, WINDOW_HEIGHT-24)))
                 self.draw_heart(screen, heart_pos, 28)  # Slightly larger heart
             except Exception as e:
-                print(f"Error drawing heart: {e}")
+                errors.report("Player.draw heart", e)
                 
         except Exception as e:
-            print(f"Error in draw: {e}")
+            errors.report("Player.draw", e)
             # Draw a simple rectangle as fallback
             try:
                 pygame.draw.rect(screen, self.color, (int(self.pos[0]-10), int(self.pos[1]-10), 20, 20))
@@ -637,23 +655,10 @@ while running:
         orig_pos = player.pos.copy()
         # Apply camera transform
         player.pos = camera.apply(player.pos)
-        # Scale the player size with zoom
-        orig_length = player.length
-        orig_width = player.width
-        orig_horn_length = player.horn_length
-        orig_horn_width = player.horn_width
-        player.length *= camera.zoom
-        player.width *= camera.zoom
-        player.horn_length *= camera.zoom
-        player.horn_width *= camera.zoom
-        # Draw
-        player.draw(screen)
-        # Restore original values
+        # Draw scaled with zoom
+        player.draw(screen, camera.zoom)
+        # Restore original position
         player.pos = orig_pos
-        player.length = orig_length
-        player.width = orig_width
-        player.horn_length = orig_horn_length
-        player.horn_width = orig_horn_width
     
     # Draw health bars (fixed to screen)
     for i in range(player1.max_health):
@@ -677,6 +682,8 @@ while running:
         running = False
     
     pygame.display.flip()
+    errors.tick()
     clock.tick(FPS)
 
+errors.summarize()
 pygame.quit() 
\ No newline at end of file
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Navigation distance fields for the computer player
+#
+# A NavGrid rasterizes a fixed arena into NAV_CELL-unit cells and marks the ones
+# a narwhal's centre can be in: clear of every obstacle by its collision radius
+# (width * 0.6, as in Player.move) and of the walls by half its length, where
+# move() clamps it. Polygons count as their bounding boxes.
+#
+# A NavField holds the distance in cells from every free cell to one goal cell
+# (a block of NAV_GOAL_CELLS x NAV_GOAL_CELLS cells). It is built by a vectorized
+# wavefront: each ring of the breadth-first search is the whole frontier grown by
+# one cell in the 8 directions, as array shifts. The wavefront stops at a
+# deadline and picks up where it left off on the next call, so the bot can build
+# a field over several ticks within its budget. The flow at any cell is the
+# direction of its neighbours one ring nearer the goal, read from the field.
+#
+# Grids are cached by a hash of the obstacle layout, and each grid keeps the
+# fields of the goal cells used most recently. When the opponent moves into a
+# new goal cell, only that cell's field needs building, and goal cells visited
+# before are already built.
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import fast_math
+
+NAV_CELL = 16          # World units per grid cell
+NAV_GOAL_CELLS = 4     # Grid cells per goal cell side (64 world units)
+NAV_FIELDS = 32        # Goal fields kept per grid (25 KB each), least recently used dropped first
+NAV_LAYOUTS = 8        # Grids kept, least recently used dropped first
+UNREACHED = -1
+
+# (row, column) offset of each neighbour and the unit vector (x, y) toward it
+NEIGHBOURS = tuple((row, col, col / math.hypot(row, col), row / math.hypot(row, col))
+                   for row in (-1, 0, 1) for col in (-1, 0, 1) if row or col)
+
+_grids = OrderedDict()  # (layout hash, radius, wall margin) -> NavGrid, in LRU order
+_grids_lock = threading.Lock()  # Next arenas are pregenerated on a worker thread
+
+def layout_hash(obstacles, world_size):
+    # Identifies an obstacle layout: same hash, same grid
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array(world_size, dtype=np.float64).tobytes())
+    digest.update(obstacles.records.tobytes())
+    digest.update(obstacles.offsets.tobytes())
+    digest.update(obstacles.vertices.tobytes())
+    return digest.hexdigest()
+
+def nav_grid(obstacles, world_size, radius, wall_margin):
+    # The grid for this layout, from the cache when it was built before
+    key = (layout_hash(obstacles, world_size), radius, wall_margin)
+    with _grids_lock:
+        grid = _grids.get(key)
+        if grid is not None:
+            _grids.move_to_end(key)
+            return grid
+    grid = NavGrid(obstacles, world_size, radius, wall_margin)
+    with _grids_lock:
+        grid = _grids.setdefault(key, grid)
+        while len(_grids) > NAV_LAYOUTS:
+            _grids.popitem(last=False)
+    return grid
+
+class NavGrid:
+    def __init__(self, obstacles, world_size, radius, wall_margin, cell=NAV_CELL):
+        start = time.perf_counter()
+        self.cell = cell
+        self.shape = (math.ceil(world_size[1] / cell), math.ceil(world_size[0] / cell))
+        centres_x = (np.arange(self.shape[1]) + 0.5) * cell
+        centres_y = (np.arange(self.shape[0]) + 0.5) * cell
+        # Walls: the band move() never lets the centre into
+        self.free = np.zeros(self.shape, dtype=bool)
+        self.free[(centres_y >= wall_margin) & (centres_y <= world_size[1] - wall_margin)] = True
+        self.free[:, (centres_x < wall_margin) | (centres_x > world_size[0] - wall_margin)] = False
+        # Obstacles: distance from each cell centre to each box, one axis at a time
+        records = obstacles.records
+        if len(records):
+            left = records['x'].astype(float)
+            top = records['y'].astype(float)
+            gap_x = np.maximum(np.maximum(left[:, None] - centres_x, centres_x - (left + records['w'])[:, None]), 0)
+            gap_y = np.maximum(np.maximum(top[:, None] - centres_y, centres_y - (top + records['h'])[:, None]), 0)
+            for row_gap, col_gap in zip(gap_y, gap_x):
+                # Only the rows and columns within reach of this box
+                rows = np.flatnonzero(row_gap < radius)
+                cols = np.flatnonzero(col_gap < radius)
+                if len(rows) and len(cols):
+                    block = row_gap[rows, None] ** 2 + col_gap[cols] ** 2 < radius * radius
+                    self.free[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1] &= ~block
+        self.fields = OrderedDict()  # goal cell -> NavField, in LRU order
+        self.build_time = time.perf_counter() - start
+
+    def cell_of(self, x, y):
+        # (row, column) of the cell under a world position, clamped to the grid
+        return (min(max(int(y // self.cell), 0), self.shape[0] - 1),
+                min(max(int(x // self.cell), 0), self.shape[1] - 1))
+
+    def goal_of(self, x, y):
+        row, col = self.cell_of(x, y)
+        return (row // NAV_GOAL_CELLS, col // NAV_GOAL_CELLS)
+
+    def field(self, goal):
+        # The field toward a goal cell, possibly still being built (see NavField.advance)
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+            return field
+        field = NavField(self, goal)
+        self.fields[goal] = field
+        while len(self.fields) > NAV_FIELDS:
+            self.fields.popitem(last=False)
+        return field
+
+class NavField:
+    def __init__(self, grid, goal):
+        self.grid = grid
+        self.goal = goal
+        # Distances in cells, inside a border of UNREACHED so flow() never falls off the grid
+        self._padded = np.full((grid.shape[0] + 2, grid.shape[1] + 2), UNREACHED, dtype=np.int16)
+        self.distance = self._padded[1:-1, 1:-1]
+        rows = slice(goal[0] * NAV_GOAL_CELLS, (goal[0] + 1) * NAV_GOAL_CELLS)
+        cols = slice(goal[1] * NAV_GOAL_CELLS, (goal[1] + 1) * NAV_GOAL_CELLS)
+        self.frontier = np.zeros(grid.shape, dtype=bool)
+        self.frontier[rows, cols] = grid.free[rows, cols]
+        self.distance[self.frontier] = 0
+        if not self.frontier.any():
+            self.frontier = None  # The goal cell is all obstacle: nothing can reach it
+        self.rings = 0
+        self.ring_cost = 20e-6  # Seconds per ring, refined as rings run
+        self.build_time = 0.0   # Seconds spent building so far
+
+    @property
+    def complete(self):
+        return self.frontier is None
+
+    def advance(self, deadline=math.inf):
+        # Grow the wavefront ring by ring while another ring fits before the deadline;
+        # returns whether the field is complete
+        free = self.grid.free
+        while self.frontier is not None:
+            start = time.perf_counter()
+            if start + self.ring_cost > deadline:
+                return False
+            grown = self.frontier.copy()
+            grown[1:] |= self.frontier[:-1]
+            grown[:-1] |= self.frontier[1:]
+            spread = grown.copy()
+            spread[:, 1:] |= grown[:, :-1]
+            spread[:, :-1] |= grown[:, 1:]
+            spread &= free
+            spread &= self.distance == UNREACHED
+            self.rings += 1
+            self.distance[spread] = self.rings
+            self.frontier = spread if spread.any() else None
+            measured = time.perf_counter() - start
+            self.ring_cost = self.ring_cost * 0.8 + measured * 0.2  # Rings cost about the same
+            self.build_time += measured
+        return True
+
+    # --- Queries (world positions) ---
+    def path_length(self, x, y):
+        # World units to the goal cell along the grid, None when it cannot be reached
+        steps = self.distance[self.grid.cell_of(x, y)]
+        return None if steps == UNREACHED else int(steps) * self.grid.cell
+
+    def flow(self, x, y):
+        # Heading in degrees toward the goal: the mean direction of the neighbours one
+        # ring nearer (open water has several, and picking one would zigzag). None at
+        # the goal or where there is no way.
+        row, col = self.grid.cell_of(x, y)
+        block = self._padded[row:row + 3, col:col + 3].tolist()
+        steps = block[1][1]
+        if steps <= 0:
+            return None
+        flow_x = flow_y = 0.0
+        for row_offset, col_offset, unit_x, unit_y in NEIGHBOURS:
+            if block[1 + row_offset][1 + col_offset] == steps - 1:
+                flow_x += unit_x
+                flow_y += unit_y
+        return fast_math.heading(flow_x, flow_y)
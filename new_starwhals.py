@@ -3,6 +3,10 @@ import pygame
 import math
 import numpy as np
 import random
+import time
+from obstacle_store import ObstacleStore
+from quality import QualityGovernor
+from render_target import RenderTarget
 # pip install pygame numpy # Make sure these are installed
 
 # Initialize Pygame
@@ -18,6 +22,8 @@ MIN_ZOOM = 0.35  # Allow slightly more zoom out
 MAX_ZOOM = 1.3   # Allow slightly more zoom in
 PADDING = 150    # Increased padding
 FPS = 60
+RENDER_SCALE = 1.0  # Fraction of the window resolution the world is drawn at (0.5-1.0), or "auto"
+ADAPTIVE_QUALITY = False  # Drop obstacle outlines and render scale while frames run late (use with a fixed RENDER_SCALE)
 
 # Colors
 BLACK = (0, 0, 0)
@@ -28,70 +34,75 @@ RED = (255, 0, 0)
 GRAY = (120, 120, 120) # Slightly darker gray
 LIGHT_BLUE = (180, 210, 255)  # Adjusted water color
 OBSTACLE_COLOR = (50, 70, 90) # Dark blue/gray for obstacles
+OBSTACLE_PALETTE = [OBSTACLE_COLOR] # Indexed by the obstacle records' color field
 
 # Game Settings
 NUM_OBSTACLES = 15
 MIN_OBSTACLE_RADIUS = 40
 MAX_OBSTACLE_RADIUS = 100
 
-class Obstacle:
-    def __init__(self, pos, radius):
-        self.pos = np.array(pos, dtype=float)
-        self.radius = radius
-        # Create slightly irregular shape points
-        self.points = []
-        num_points = random.randint(7, 12)
-        for i in range(num_points):
-            angle = (i / num_points) * 2 * math.pi
-            dist = random.uniform(0.8, 1.1) * self.radius
-            self.points.append([
-                self.pos[0] + math.cos(angle) * dist,
-                self.pos[1] + math.sin(angle) * dist
-            ])
-
-    def draw(self, screen, camera_pos, zoom):
-        # Calculate screen position and points
-        screen_pos = (self.pos - camera_pos) * zoom + np.array([SCREEN_WIDTH/2, SCREEN_HEIGHT/2])
-        
-        # Check if obstacle is roughly on screen before drawing detailed points
-        on_screen_radius = self.radius * zoom
-        if (screen_pos[0] + on_screen_radius < 0 or 
-            screen_pos[0] - on_screen_radius > SCREEN_WIDTH or
-            screen_pos[1] + on_screen_radius < 0 or
-            screen_pos[1] - on_screen_radius > SCREEN_HEIGHT):
-            return # Don't draw if completely off-screen
-
-        screen_points = [
-            (np.array(p) - camera_pos) * zoom + np.array([SCREEN_WIDTH/2, SCREEN_HEIGHT/2])
-            for p in self.points
-        ]
-        
+def add_obstacle(obstacles, pos, radius):
+    # Slightly irregular polygon around pos; the record box is the collision circle's box
+    num_points = random.randint(7, 12)
+    points = []
+    for i in range(num_points):
+        angle = (i / num_points) * 2 * math.pi
+        dist = random.uniform(0.8, 1.1) * radius
+        points.append([
+            pos[0] + math.cos(angle) * dist,
+            pos[1] + math.sin(angle) * dist
+        ])
+    obstacles.add_polygon(points, bounds=(pos[0] - radius, pos[1] - radius, 2 * radius, 2 * radius))
+
+def obstacle_circles(obstacles):
+    # Collision circles (centres and radii) straight from the record boxes
+    records = obstacles.records
+    radii = records['w'] / 2
+    centers = np.stack((records['x'] + radii, records['y'] + radii), axis=1)
+    return centers, radii
+
+def draw_obstacles(screen, obstacles, camera_pos, zoom, outlines=True):
+    # Cull on the record boxes, then transform only the visible polygons
+    half_w = screen.get_width() / (2 * zoom)
+    half_h = screen.get_height() / (2 * zoom)
+    visible = obstacles.in_box(camera_pos[0] - half_w, camera_pos[1] - half_h,
+                               camera_pos[0] + half_w, camera_pos[1] + half_h)
+    screen_center = np.array(screen.get_size()) / 2
+    outline_width = int(max(1, 3 * zoom))
+    for index in visible:
+        screen_points = (obstacles.polygon(index) - camera_pos) * zoom + screen_center
         # Draw the irregular polygon
-        pygame.draw.polygon(screen, OBSTACLE_COLOR, screen_points)
+        pygame.draw.polygon(screen, OBSTACLE_PALETTE[obstacles.records['color'][index]], screen_points)
         # Optional outline
-        pygame.draw.polygon(screen, GRAY, screen_points, int(max(1, 3 * zoom)))
+        if outlines:
+            pygame.draw.polygon(screen, GRAY, screen_points, outline_width)
 
 class Player:
+    # Narwhal constants shared by every instance
+    length = 250  # Slightly longer
+    width = 65    # Slightly wider
+    horn_length = 110 # Slightly longer horn
+    horn_width = 12   # Slightly wider horn
+    rotation_speed = 4.8 # Slightly increased rotation
+    thrust = 0.6    # Increased thrust slightly
+    rotation_momentum = 0.92
+    max_speed = 14  # Increased max speed
+    max_health = 3
+    tail_length = length * 0.75 # Longer tail
+    tail_response = 0.15
+
+    __slots__ = ('pos', 'vel', 'angle', 'color', 'controls', 'health',
+                 'tail_angle', 'target_tail_angle', 'angular_velocity', 'collision_timer')
+
     def __init__(self, pos, angle, color, controls):
         self.pos = np.array(pos, dtype=float)
         self.vel = np.array([0.0, 0.0])
         self.angle = angle
         self.color = color
         self.controls = controls
-        self.length = 250  # Slightly longer
-        self.width = 65    # Slightly wider
-        self.horn_length = 110 # Slightly longer horn
-        self.horn_width = 12   # Slightly wider horn
-        self.rotation_speed = 4.8 # Slightly increased rotation
-        self.thrust = 0.6    # Increased thrust slightly
-        self.rotation_momentum = 0.92
-        self.max_speed = 14  # Increased max speed
         self.health = 3
-        self.max_health = 3
         self.tail_angle = 0
         self.target_tail_angle = 0
-        self.tail_length = self.length * 0.75 # Longer tail
-        self.tail_response = 0.15
         self.angular_velocity = 0
         self.collision_timer = 0 # Timer to prevent rapid health loss
 
@@ -154,10 +165,13 @@ class Player:
 
             # --- Obstacle Collision ---
             collided = False
-            for obs in obstacles:
-                dist_vec = new_pos - obs.pos
+            centers, radii = obstacle_circles(obstacles)
+            distances = np.hypot(new_pos[0] - centers[:, 0], new_pos[1] - centers[:, 1])
+            hits = np.flatnonzero(distances < radii + self.width / 3) # Approximate collision radius
+            for index in hits[:1]: # Only handle the first collision per frame
+                dist_vec = new_pos - centers[index]
                 distance = np.linalg.norm(dist_vec)
-                min_dist = obs.radius + self.width / 3 # Approximate collision radius
+                min_dist = radii[index] + self.width / 3
 
                 if distance < min_dist:
                     collided = True
@@ -175,7 +189,6 @@ class Player:
                     impact_angle_offset = math.degrees(math.atan2(normal[1], normal[0])) - self.angle
                     impact_angle_offset = (impact_angle_offset + 180) % 360 - 180 # Normalize to -180, 180
                     self.angular_velocity += np.sign(impact_angle_offset) * 0.1 # Small spin
-                    break # Only handle one collision per frame
             
             self.pos = new_pos
             # --- End Obstacle Collision ---
@@ -246,14 +259,14 @@ class Player:
         if self.health <= 0: return
 
         # Calculate screen position
-        screen_pos = (self.pos - camera_pos) * zoom + np.array([SCREEN_WIDTH/2, SCREEN_HEIGHT/2])
+        screen_pos = (self.pos - camera_pos) * zoom + np.array(screen.get_size()) / 2
         
         # Don't draw if completely off-screen (approximation)
         render_radius = (self.length / 2 + self.tail_length) * zoom
         if (screen_pos[0] + render_radius < 0 or 
-            screen_pos[0] - render_radius > SCREEN_WIDTH or
+            screen_pos[0] - render_radius > screen.get_width() or
             screen_pos[1] + render_radius < 0 or
-            screen_pos[1] - render_radius > SCREEN_HEIGHT):
+            screen_pos[1] - render_radius > screen.get_height()):
             return
 
         angle_rad = math.radians(self.angle)
@@ -316,7 +329,7 @@ class Player:
         # --- End Horn ---
 
         # --- Draw Heart (Polygon Shape) ---
-        heart_screen_pos = (self.get_heart_pos() - camera_pos) * zoom + np.array([SCREEN_WIDTH/2, SCREEN_HEIGHT/2])
+        heart_screen_pos = (self.get_heart_pos() - camera_pos) * zoom + np.array(screen.get_size()) / 2
         heart_size = 15 * zoom # Base size of the heart
         
         # Points for a basic heart shape relative to heart_screen_pos
@@ -376,7 +389,7 @@ player2 = Player([WINDOW_WIDTH*0.7, WINDOW_HEIGHT/2], 180, PINK, [pygame.K_LEFT,
 players = [player1, player2]
 
 # Create obstacles, ensuring they don't spawn too close to players
-obstacles = []
+obstacles = ObstacleStore(NUM_OBSTACLES)
 spawn_area_padding = 300 # Don't spawn obstacles near initial player positions
 player_positions = [p.pos for p in players]
 
@@ -395,22 +408,25 @@ while len(obstacles) < NUM_OBSTACLES:
         continue
 
     # Check distance from other obstacles
-    too_close_to_obstacle = False
-    for obs in obstacles:
-        if np.linalg.norm(np.array(pos) - obs.pos) < obs.radius + radius + 50: # Ensure spacing
-             too_close_to_obstacle = True
-             break
-    if too_close_to_obstacle:
+    centers, radii = obstacle_circles(obstacles)
+    if (np.hypot(pos[0] - centers[:, 0], pos[1] - centers[:, 1]) < radii + radius + 50).any(): # Ensure spacing
         continue
         
-    obstacles.append(Obstacle(pos, radius))
+    add_obstacle(obstacles, pos, radius)
 
 game_state = "playing" # Can be "playing", "game_over"
 winner = None
 
+# World drawn offscreen at RENDER_SCALE and stretched to the window
+render_target = RenderTarget(screen, 1.0 if RENDER_SCALE == "auto" else RENDER_SCALE, RENDER_SCALE == "auto",
+                             target_fps=FPS)
+governor = QualityGovernor(FPS, render_target) if ADAPTIVE_QUALITY else None
+
 # --- Game Loop ---
 running = True
 while running:
+    frame_start = time.perf_counter()
+    
     # Handle events
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -472,15 +488,18 @@ while running:
         zoom = MIN_ZOOM # Zoom out
 
     # --- Drawing ---
-    screen.fill(LIGHT_BLUE) # Clear screen with water color
+    canvas = render_target.surface
+    canvas.fill(LIGHT_BLUE) # Clear screen with water color
     
     # Draw obstacles first (behind players)
-    for obs in obstacles:
-        obs.draw(screen, camera_pos, zoom)
+    draw_obstacles(canvas, obstacles, camera_pos, zoom * render_target.scale,
+                   governor is None or governor.obstacle_outlines)
         
     # Draw players
     for player in players:
-        player.draw(screen, camera_pos, zoom)
+        player.draw(canvas, camera_pos, zoom * render_target.scale)
+    
+    render_target.present()
 
     # Draw Game Over message
     if game_state == "game_over":
@@ -498,6 +517,10 @@ while running:
         
     # Update display
     pygame.display.flip()
+    frame_time = time.perf_counter() - frame_start
+    render_target.frame_done(frame_time)
+    if governor is not None:
+        governor.frame_done(frame_time)
     clock.tick(FPS)
 
 # Quit game
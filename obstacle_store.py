@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+
+# Obstacle kinds
+OBSTACLE_RECT = 0
+OBSTACLE_POLYGON = 1
+
+# One packed record per obstacle: bounding box, kind and palette index
+OBSTACLE_DTYPE = np.dtype([
+    ('x', np.float32),
+    ('y', np.float32),
+    ('w', np.float32),
+    ('h', np.float32),
+    ('kind', np.uint8),
+    ('color', np.uint8),
+])
+
+NEAR_CELL = 256.0  # Grid cell of the near() index in world units (a few narwhal widths)
+
+# Structure-of-arrays obstacle storage
+# Obstacles live in one structured array instead of one Python object each.
+# Polygon vertices share a single float32 buffer; obstacle i owns
+# vertices[offsets[i]:offsets[i + 1]] (rectangles own none).
+# near() answers from a uniform grid built on first use after a change, so
+# lookahead branches sharing a store also share its index.
+class ObstacleStore:
+    def __init__(self, capacity=64):
+        self._records = np.zeros(capacity, dtype=OBSTACLE_DTYPE)
+        self._vertices = np.zeros((0, 2), dtype=np.float32)  # Grown on the first polygon
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.count = 0
+        self._grid = None  # near() buckets; dropped on every change
+
+    @classmethod
+    def from_arrays(cls, records, offsets, vertices):
+        # Store owning copies of another store's records, offsets and vertices
+        store = cls(max(len(records), 1))
+        store._records[:len(records)] = records
+        store._offsets[:len(offsets)] = offsets
+        store._vertices = np.array(vertices, dtype=np.float32).reshape(-1, 2)
+        store.count = len(records)
+        return store
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def records(self):
+        return self._records[:self.count]
+
+    @property
+    def offsets(self):
+        return self._offsets[:self.count + 1]
+
+    @property
+    def vertices(self):
+        return self._vertices[:self._offsets[self.count]]
+
+    @property
+    def nbytes(self):
+        # Bytes actually used by the stored obstacles
+        return self.records.nbytes + self.offsets.nbytes + self.vertices.nbytes
+
+    def _reserve(self, records, vertices):
+        # Grow the buffers geometrically so appends stay amortised O(1)
+        needed = self.count + records
+        if needed > len(self._records):
+            capacity = max(needed, len(self._records) * 2)
+            self._records = np.resize(self._records, capacity)
+            self._offsets = np.resize(self._offsets, capacity + 1)
+        needed = self._offsets[self.count] + vertices
+        if needed > len(self._vertices):
+            capacity = max(needed, len(self._vertices) * 2)
+            grown = np.zeros((capacity, 2), dtype=np.float32)
+            grown[:len(self._vertices)] = self._vertices
+            self._vertices = grown
+
+    def _append(self, x, y, width, height, kind, color, points):
+        self._reserve(1, len(points))
+        start = self._offsets[self.count]
+        self._records[self.count] = (x, y, width, height, kind, color)
+        self._vertices[start:start + len(points)] = points
+        self._offsets[self.count + 1] = start + len(points)
+        self.count += 1
+        self._grid = None
+        return self.count - 1
+
+    def add_rect(self, x, y, width, height, color=0):
+        return self._append(x, y, width, height, OBSTACLE_RECT, color, np.empty((0, 2)))
+
+    def add_polygon(self, points, color=0, bounds=None):
+        # Polygons keep a box in the record for culling and broad tests: the
+        # vertices' bounding box unless explicit (x, y, width, height) bounds are given
+        points = np.asarray(points, dtype=np.float32)
+        if bounds is None:
+            low = points.min(axis=0)
+            high = points.max(axis=0)
+            bounds = (low[0], low[1], high[0] - low[0], high[1] - low[1])
+        return self._append(*bounds, OBSTACLE_POLYGON, color, points)
+
+    def extend(self, records):
+        # Bulk-append rectangle records (OBSTACLE_DTYPE) in one copy
+        self._reserve(len(records), 0)
+        self._records[self.count:self.count + len(records)] = records
+        self._offsets[self.count + 1:self.count + len(records) + 1] = self._offsets[self.count]
+        self.count += len(records)
+        self._grid = None
+
+    def polygon(self, index):
+        return self._vertices[self._offsets[index]:self._offsets[index + 1]]
+
+    def rects(self, indices=None):
+        # (N, 4) array of x, y, width, height
+        records = self.records if indices is None else self.records[indices]
+        return np.stack((records['x'], records['y'], records['w'], records['h']), axis=1)
+
+    def overlapping(self, x, y, width, height):
+        # Mask of obstacles whose box strictly overlaps the given box (pygame colliderect rules)
+        records = self.records
+        return ((records['x'] < x + width) & (records['x'] + records['w'] > x) &
+                (records['y'] < y + height) & (records['y'] + records['h'] > y))
+
+    def in_box(self, left, top, right, bottom):
+        # Indices of obstacles touching a box, used for view culling
+        records = self.records
+        return np.flatnonzero((records['x'] <= right) & (records['x'] + records['w'] >= left) &
+                              (records['y'] <= bottom) & (records['y'] + records['h'] >= top))
+
+    def _near_grid(self):
+        # Each box (right and bottom edges rounded to float32 like the records) in every cell it touches
+        records = self.records
+        boxes = zip(records['x'].tolist(), records['y'].tolist(),
+                    (records['x'] + records['w']).tolist(), (records['y'] + records['h']).tolist())
+        grid = {}
+        for index, (left, top, right, bottom) in enumerate(boxes):
+            for cell_x in range(math.floor(left / NEAR_CELL), math.floor(right / NEAR_CELL) + 1):
+                for cell_y in range(math.floor(top / NEAR_CELL), math.floor(bottom / NEAR_CELL) + 1):
+                    grid.setdefault((cell_x, cell_y), []).append((index, left, top, right, bottom))
+        return grid
+
+    def near(self, x, y, radius):
+        # Ascending indices of obstacles whose box is closer than radius to the point
+        if self._grid is None:
+            self._grid = self._near_grid()
+        first_x, last_x = math.floor((x - radius) / NEAR_CELL), math.floor((x + radius) / NEAR_CELL)
+        first_y, last_y = math.floor((y - radius) / NEAR_CELL), math.floor((y + radius) / NEAR_CELL)
+        if first_x == last_x and first_y == last_y:
+            candidates = self._grid.get((first_x, first_y), ())
+        else:
+            candidates = sorted({box for cell_x in range(first_x, last_x + 1) for cell_y in range(first_y, last_y + 1)
+                                 for box in self._grid.get((cell_x, cell_y), ())})
+        limit = radius * radius
+        found = []
+        for index, left, top, right, bottom in candidates:
+            dx = x - min(max(x, left), right)
+            dy = y - min(max(y, top), bottom)
+            if dx * dx + dy * dy < limit:
+                found.append(index)
+        return found
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# Pooled particle system for impacts, bubbles and wakes
+#
+# Every particle lives in a slot of fixed-size NumPy arrays. Live particles are
+# kept packed at the front of the pool: the update integrates them all in a few
+# vectorized steps and then compacts the survivors in place, so dead slots are
+# reused by the next emit without ever allocating. Drawing stamps the opaque
+# pixels of pre-rendered sprite sheet frames straight into 32-bit surfaces with
+# a few NumPy scatters, and falls back to a single batched blit for other depths.
+import operator
+
+import numpy as np
+import pygame
+
+PARTICLE_CAPACITY = 50_000
+
+# Particle kinds (sprite sheet rows)
+PARTICLE_BUBBLE = 0  # Tail wake
+PARTICLE_SPARK = 1   # Horn hits
+PARTICLE_DEBRIS = 2  # Obstacle bounces
+
+# Per-kind look and behaviour, indexed by kind
+PARTICLE_COLORS = ((255, 255, 255), (255, 170, 40), (150, 140, 120))
+PARTICLE_RIMS = ((70, 130, 190), None, None)  # Outline so bubbles show on light and dark water
+PARTICLE_RADII = (3, 3, 2)
+PARTICLE_DRAG = np.array([0.96, 0.90, 0.92], dtype=np.float32)      # Velocity kept per tick
+PARTICLE_BUOYANCY = np.array([-0.05, 0.0, 0.02], dtype=np.float32)  # Added to y velocity per tick (negative rises)
+PARTICLE_LIFETIME = np.array([45, 30, 35], dtype=np.float32)        # Ticks
+
+FADE_FRAMES = 4   # Sprite sheet columns, from smallest (about to die) to full size
+SPRITE_SIZE = 8   # Pixels per sprite sheet cell
+SHEET_COLORKEY = (255, 0, 255)
+STAMP_SKIP = 1 << 30  # Flat offset of unused stamp slots, past the end of any surface
+
+def build_sprite_sheet():
+    # One row per kind, one column per fade step. Particles fade out by shrinking:
+    # colorkeyed sprites blit several times faster than per-pixel alpha ones.
+    sheet = pygame.Surface((SPRITE_SIZE * FADE_FRAMES, SPRITE_SIZE * len(PARTICLE_COLORS)))
+    sheet.fill(SHEET_COLORKEY)
+    for kind, (color, rim, radius) in enumerate(zip(PARTICLE_COLORS, PARTICLE_RIMS, PARTICLE_RADII)):
+        for frame in range(FADE_FRAMES):
+            centre = (frame * SPRITE_SIZE + SPRITE_SIZE // 2, kind * SPRITE_SIZE + SPRITE_SIZE // 2)
+            size = max(1, round(radius * (frame + 1) / FADE_FRAMES))
+            if rim is not None:
+                pygame.draw.circle(sheet, rim, centre, size)
+                size -= 1
+            if size > 0:
+                pygame.draw.circle(sheet, color, centre, size)
+    return sheet
+
+def cut_sprite_sheet(sheet):
+    # Separate run-length encoded copies of every cell, in kind * FADE_FRAMES + frame order
+    frames = []
+    for kind in range(len(PARTICLE_COLORS)):
+        for frame in range(FADE_FRAMES):
+            sprite = sheet.subsurface((frame * SPRITE_SIZE, kind * SPRITE_SIZE, SPRITE_SIZE, SPRITE_SIZE)).copy()
+            sprite.set_colorkey(SHEET_COLORKEY, pygame.RLEACCEL)
+            frames.append(sprite)
+    return frames
+
+def build_stamps(frames, surface):
+    # Every frame's opaque pixels as flat offsets into the surface (rows of
+    # pitch / 4 pixels), their x offsets for clipping at the side edges and
+    # their colours in the surface's pixel format. Frames are padded to the
+    # largest one with STAMP_SKIP slots, and sizes holds their real lengths.
+    stride = surface.get_pitch() // 4
+    opaque = []
+    for sprite in frames:
+        pixels = pygame.surfarray.array2d(sprite)
+        xs, ys = np.nonzero(pixels != sprite.map_rgb(sprite.get_colorkey()))
+        colors = [surface.map_rgb(sprite.unmap_rgb(int(pixel))) for pixel in pixels[xs, ys]]
+        opaque.append((xs, ys, colors))
+    slots = max(len(xs) for xs, _, _ in opaque)
+    offsets = np.full((len(frames), slots), STAMP_SKIP, dtype=np.int32)
+    columns = np.zeros((len(frames), slots), dtype=np.int32)
+    colors = np.zeros((len(frames), slots), dtype=np.uint32)
+    for frame, (xs, ys, frame_colors) in enumerate(opaque):
+        offsets[frame, :len(xs)] = ys * stride + xs
+        columns[frame, :len(xs)] = xs
+        colors[frame, :len(xs)] = frame_colors
+    return offsets, columns, colors, [len(xs) for xs, _, _ in opaque]
+
+class ParticlePool:
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)  # Ticks left
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0
+        self.dropped = 0  # Particles not emitted because the pool was full
+        self.budget = 1.0  # Fraction of every requested burst that is emitted
+        # Own generator so effects never disturb the game's random stream
+        self.rng = np.random.default_rng(seed)
+        self._frames = None
+        self._stamps = {}  # (pixel format, pitch) -> build_stamps tables
+        self.drawn_rect = None  # Screen area covered by the last draw, for dirty-rect updates
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.life)
+
+    def emit(self, x, y, count, kind, speed=2.0, direction=None, spread=np.pi, velocity=(0.0, 0.0)):
+        # Burst of particles from one point. direction (radians) and spread set the
+        # cone; velocity is added to every particle (e.g. the emitter's own motion).
+        requested = int(count)
+        if self.budget < 1.0:
+            # Round randomly so small bursts like wakes still thin out evenly
+            requested = int(requested * self.budget + self.rng.random())
+        count = min(requested, self.capacity - self.count)
+        self.dropped += requested - count
+        if count <= 0:
+            return
+        start, end = self.count, self.count + count
+        angles = self.rng.uniform(-spread, spread, count) + (0.0 if direction is None else direction)
+        speeds = self.rng.uniform(0.3, 1.0, count) * speed
+        self.pos[start:end] = (x, y)
+        self.pos[start:end] += self.rng.uniform(-2.0, 2.0, (count, 2))
+        self.vel[start:end, 0] = np.cos(angles) * speeds + velocity[0]
+        self.vel[start:end, 1] = np.sin(angles) * speeds + velocity[1]
+        self.life[start:end] = PARTICLE_LIFETIME[kind] * self.rng.uniform(0.6, 1.0, count)
+        self.kind[start:end] = kind
+        self.count = end
+
+    def update(self):
+        count = self.count
+        if count == 0:
+            return
+        kinds = self.kind[:count]
+        vel = self.vel[:count]
+        vel *= PARTICLE_DRAG[kinds][:, None]
+        vel[:, 1] += PARTICLE_BUOYANCY[kinds]
+        self.pos[:count] += vel
+        life = self.life[:count]
+        life -= 1
+        # Recycle dead slots by moving survivors from the tail into them, so only
+        # as many particles move as died this tick
+        dead = np.flatnonzero(life <= 0)
+        if len(dead):
+            survivors = count - len(dead)
+            holes = dead[dead < survivors]
+            movers = survivors + np.flatnonzero(life[survivors:] > 0)
+            for array in (self.pos, self.vel, self.life, self.kind):
+                array[holes] = array[movers]
+            self.count = survivors
+
+    def clear(self):
+        self.count = 0
+
+    def draw(self, screen, camera=None):
+        self.drawn_rect = None
+        count = self.count
+        if count == 0:
+            return
+        if self._frames is None:
+            # Cut the sheet once the display exists (convert needs it)
+            self._frames = cut_sprite_sheet(build_sprite_sheet().convert())
+        points = self.pos[:count] if camera is None else camera.apply_points(self.pos[:count])
+        corners = points - SPRITE_SIZE / 2
+        width, height = screen.get_size()
+        visible = np.flatnonzero((corners[:, 0] > -SPRITE_SIZE) & (corners[:, 0] < width) &
+                                 (corners[:, 1] > -SPRITE_SIZE) & (corners[:, 1] < height))
+        if len(visible) == 0:
+            return
+        kinds = self.kind[visible]
+        fade = np.minimum(self.life[visible] * FADE_FRAMES / PARTICLE_LIFETIME[kinds], FADE_FRAMES - 1)
+        frames = kinds.astype(np.intp) * FADE_FRAMES + fade.astype(np.intp)
+        # Column by column: gathers and reductions along an (n, 2) array are far slower
+        xs, ys = corners[visible, 0].astype(np.int32), corners[visible, 1].astype(np.int32)
+        left, top = int(xs.min()), int(ys.min())
+        self.drawn_rect = pygame.Rect(left, top, int(xs.max()) - left + SPRITE_SIZE, int(ys.max()) - top + SPRITE_SIZE)
+        if screen.get_bytesize() == 4:
+            self._stamp(screen, frames, xs, ys)
+            return
+        # Flat lists and C-level gathers keep the per-particle Python work tiny
+        sprites = operator.itemgetter(*frames.tolist())(self._frames) if len(frames) > 1 else [self._frames[frames[0]]]
+        screen.blits(zip(sprites, zip(xs.tolist(), ys.tolist())), doreturn=False)
+
+    def _stamp(self, screen, frames, xs, ys):
+        # Writes the pixels of the colorkeyed frames straight into the buffer
+        # instead of 50k separate blits. Particles clear of the edges go frame by
+        # frame, so overlaps stack by frame rather than emit order; the rest
+        # follow in emit order.
+        key = (screen.get_bitsize(), screen.get_masks(), screen.get_pitch())
+        if key not in self._stamps:
+            self._stamps[key] = build_stamps(self._frames, screen)
+        offsets, columns, colors, sizes = self._stamps[key]
+        width, height = screen.get_size()
+        stride = screen.get_pitch() // 4
+        inside = (xs >= 0) & (xs <= width - SPRITE_SIZE) & (ys >= 0) & (ys <= height - SPRITE_SIZE)
+        groups = np.where(inside, frames, len(sizes)).astype(np.int8)
+        order = np.argsort(groups, kind="stable")  # Radix sort on int8 keys
+        ends = np.bincount(groups, minlength=len(sizes) + 1).cumsum().tolist()
+        starts = (ys * stride + xs)[order]
+        pixels = np.frombuffer(screen.get_buffer(), dtype=np.uint32)
+        begin = 0
+        for frame, size in enumerate(sizes):
+            if ends[frame] > begin:
+                pixels[starts[begin:ends[frame], None] + offsets[frame, :size]] = colors[frame, :size]
+            begin = ends[frame]
+        if ends[-1] > begin:
+            # Rows above and below the surface fall outside the buffer, but pixels
+            # past the left or right edge would wrap onto the neighbouring row
+            edges = order[begin:]
+            targets = starts[begin:, None] + offsets[frames[edges]]
+            pixel_xs = xs[edges, None] + columns[frames[edges]]
+            targets[(pixel_xs < 0) | (pixel_xs >= width)] = STAMP_SKIP
+            # Negative offsets turn huge as unsigned, so one compare keeps the buffer
+            kept = targets.view(np.uint32) < stride * height
+            pixels[targets[kept]] = colors[frames[edges]][kept]
+        del pixels  # Unlocks the surface
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+# Physics parameter sweeps: headless matches for every setting of the movement
+# constants, tabulated side by side
+#
+# Settings come from a grid (every combination of the listed values) or from a
+# random search (uniform samples between bounds); parameters left out keep their
+# values in the game. Every (setting, level, seed) match is played in a worker
+# process, by reactive bots or by narwhals following a seeded script of turns.
+# With no timing-dependent lookahead a match depends only on its inputs, so each
+# result is appended to a cache file and reruns only play what is missing. Cached
+# results are tied to a hash of the game's sources and are not reused once the
+# game code changes.
+#
+# Usage: python physics_sweep.py --grid thrust=0.5,0.6,0.7 knockback=30,45,60 --matches 4
+#        python physics_sweep.py --random resistance=0.97:0.995 bounce_factor=0.5:1 --samples 24
+import argparse
+import hashlib
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from telemetry import EVENT_HIT, EVENT_OBSTACLE
+
+PARAMETERS = ("thrust", "rotation_speed", "resistance", "bounce_factor", "knockback")
+MATCH_TICKS = 3600       # Longest match (a minute at 60 ticks per second)
+SCRIPT_HOLD = 40         # Ticks a scripted narwhal holds each turn
+SCRIPT_TURNS = (-1, 0, 0, 1)
+SWEEP_CACHE = "physics_sweep.cache"
+SWEEP_MAGIC = b"SWSWEEP\0"
+
+# One cached match: its inputs, then what happened (first_hit is -1 when nobody was hit)
+SWEEP_DTYPE = np.dtype([
+    ('code', 'S32'), ('level', 'S32'), ('driver', 'S8'), ('seed', '<i8'), ('ticks', '<i4'),
+    *((name, '<f8') for name in PARAMETERS),
+    ('first_hit', '<i4'), ('length', '<i4'), ('hits', '<i4'),
+    ('wall_bounces', '<i4'), ('obstacle_bounces', '<i4'), ('narwhals', '<i4'),
+])
+
+def _load_game():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import starwhals
+    return starwhals
+
+def sweep_sources():
+    # Every module of the repository a match runs: the game and everything it imports,
+    # and this file (which does the counting)
+    _load_game()
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = {os.path.abspath(module.__file__) for module in list(sys.modules.values())
+             if getattr(module, "__file__", None)}
+    return sorted(path for path in paths | {os.path.abspath(__file__)}
+                  if os.path.dirname(path) == root and path.endswith(".py"))
+
+def source_hash():
+    # Cached results are keyed by this, so any change to the code behind a match retires them
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sweep_sources():
+        digest.update(os.path.basename(path).encode() + b"\0")
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest().encode()
+
+def defaults():
+    starwhals = _load_game()
+    player = starwhals.Player
+    return {"thrust": player.thrust, "rotation_speed": player.rotation_speed, "resistance": player.resistance,
+            "bounce_factor": player.bounce_factor, "knockback": starwhals.HORN_KNOCKBACK}
+
+def apply_setting(setting):
+    starwhals = _load_game()
+    starwhals.Player.thrust = setting["thrust"]
+    starwhals.Player.rotation_speed = setting["rotation_speed"]
+    starwhals.Player.resistance = setting["resistance"]
+    starwhals.Player.bounce_factor = setting["bounce_factor"]
+    starwhals.HORN_KNOCKBACK = setting["knockback"]
+
+# --- Settings ---
+def parse_assignments(items, parse):
+    # "name=value" arguments into {name: parse(value)}
+    chosen = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in PARAMETERS:
+            raise ValueError(f"unknown parameter {name!r} (choose from {', '.join(PARAMETERS)})")
+        chosen[name] = parse(value)
+    return chosen
+
+def grid_settings(grid, base):
+    # Every combination of the listed values
+    names = list(grid)
+    return [{**base, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+
+def random_settings(ranges, base, samples, seed):
+    # Uniform samples between each parameter's bounds
+    rng = random.Random(seed)
+    return [{**base, **{name: rng.uniform(low, high) for name, (low, high) in ranges.items()}}
+            for _ in range(samples)]
+
+# --- Matches (worker processes) ---
+class MatchCounter:
+    # Takes the telemetry calls step_players makes and counts hits and obstacle bounces
+    def __init__(self):
+        self.hits = 0
+        self.obstacle_bounces = 0
+
+    def event(self, kind, player, other, x, y, strength=0.0):
+        if kind == EVENT_HIT:
+            self.hits += 1
+        elif kind == EVENT_OBSTACLE:
+            self.obstacle_bounces += 1
+
+def play_match(job):
+    # One headless match with the movement constants of a setting; returns its cache record
+    code, level_name, driver, seed, ticks, setting = job
+    starwhals = _load_game()
+    from ai_opponent import BotController
+    apply_setting(setting)
+    level = next(level for level in starwhals.levels if level.name == level_name)
+
+    random.seed(seed)
+    spawn_points = level.spawn_points()
+    obstacles = level.generate_obstacles(spawn_points)
+    players = starwhals.create_players(spawn_points)
+    for player in players:
+        player.controls = None
+    if driver == "bot":
+        # Reactive only (no budget for lookahead), so the match does not depend on machine speed
+        bots = [BotController(player, starwhals.step_players, budget_us=0) for player in players]
+    else:
+        scripts = [random.Random(f"{seed}-{index}") for index in range(len(players))]
+
+    counter = MatchCounter()
+    width, height = level.world_size
+    first_hit = -1
+    wall_bounces = 0
+    at_wall = [False] * len(players)
+    tick = 0
+    while tick < ticks and sum(player.health > 0 for player in players) > 1:
+        if driver == "bot":
+            for bot in bots:
+                bot.update(players, obstacles, level.world_size)
+        elif tick % SCRIPT_HOLD == 0:
+            for player, script in zip(players, scripts):
+                player.turn = script.choice(SCRIPT_TURNS)
+        hits = starwhals.step_players(players, obstacles, level.world_size, telemetry=counter)
+        tick += 1
+        if hits and first_hit < 0:
+            first_hit = tick
+        # A narwhal touching a wall is left exactly on the line move() clamps it to. One
+        # pushing into the wall stays on it tick after tick, so only the first tick counts.
+        for index, player in enumerate(players):
+            half = player.length / 2
+            touching = player.health > 0 and (player.pos[0] in (half, width - half)
+                                              or player.pos[1] in (half, height - half))
+            wall_bounces += touching and not at_wall[index]
+            at_wall[index] = touching
+    return (code, level_name.encode(), driver.encode(), seed, ticks,
+            *(setting[name] for name in PARAMETERS),
+            first_hit, tick, counter.hits, wall_bounces, counter.obstacle_bounces, len(players))
+
+# --- Cache ---
+def read_cache(path):
+    # Every record of a cache file (a partly written last record is ignored)
+    try:
+        with open(path, "rb") as cache:
+            data = cache.read()
+    except FileNotFoundError:
+        return np.zeros(0, dtype=SWEEP_DTYPE)
+    if data[:len(SWEEP_MAGIC)] != SWEEP_MAGIC:
+        raise ValueError(f"{path} is not a physics sweep cache")
+    body = data[len(SWEEP_MAGIC):]
+    return np.frombuffer(body[:len(body) - len(body) % SWEEP_DTYPE.itemsize], dtype=SWEEP_DTYPE)
+
+def append_cache(path, records):
+    # Records are appended as they come in, so an interrupted sweep keeps what it finished
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    partial = (size - len(SWEEP_MAGIC)) % SWEEP_DTYPE.itemsize if size > len(SWEEP_MAGIC) else 0
+    if partial:
+        os.truncate(path, size - partial)  # Drop a record cut short by an interrupted run
+    with open(path, "ab") as cache:
+        if size == 0:
+            cache.write(SWEEP_MAGIC)
+        cache.write(np.array(records, dtype=SWEEP_DTYPE).tobytes())
+
+def record_key(code, level_name, driver, seed, ticks, setting):
+    return (code, level_name, driver, int(seed), int(ticks), *(float(setting[name]) for name in PARAMETERS))
+
+def run_sweep(settings, level_names, seeds, driver="bot", ticks=MATCH_TICKS, processes=1,
+              cache_path=SWEEP_CACHE, log=print):
+    # Results for every (setting, level, seed), playing only what the cache does not hold
+    code = source_hash()
+    cached = {}
+    if cache_path:
+        for record in read_cache(cache_path):
+            key = (record['code'], record['level'].decode(), record['driver'].decode(), int(record['seed']),
+                   int(record['ticks']), *(float(record[name]) for name in PARAMETERS))
+            cached[key] = record
+    jobs = []
+    for setting in settings:
+        for level_name in level_names:
+            for seed in seeds:
+                if record_key(code, level_name, driver, seed, ticks, setting) not in cached:
+                    jobs.append((code, level_name, driver, seed, ticks, setting))
+    total = len(settings) * len(level_names) * len(seeds)
+    log(f"[sweep] {total - len(jobs)} of {total} matches cached, playing {len(jobs)} "
+        f"on {max(1, min(processes, len(jobs)))} process(es)")
+
+    start = time.perf_counter()
+    fresh = []
+    if processes <= 1 or len(jobs) <= 1:
+        # In this process: put the game's own constants back afterwards
+        base = defaults()
+        for job in jobs:
+            fresh.append(play_match(job))
+            if cache_path:
+                append_cache(cache_path, fresh[-1:])
+        apply_setting(base)
+    elif jobs:
+        # Spawned workers: forking a process that has already started SDL can deadlock.
+        # They are closed and joined rather than terminated, as SDL swallows SIGTERM.
+        with multiprocessing.get_context("spawn").Pool(min(processes, len(jobs))) as pool:
+            for record in pool.imap_unordered(play_match, jobs, chunksize=max(1, len(jobs) // (processes * 8))):
+                fresh.append(record)
+                if cache_path:
+                    append_cache(cache_path, [record])
+            pool.close()
+            pool.join()
+    if jobs:
+        log(f"[sweep] played {len(jobs)} matches in {time.perf_counter() - start:.1f} s")
+    for record in np.array(fresh, dtype=SWEEP_DTYPE):
+        key = (record['code'], record['level'].decode(), record['driver'].decode(), int(record['seed']),
+               int(record['ticks']), *(float(record[name]) for name in PARAMETERS))
+        cached[key] = record
+    return [[cached[record_key(code, level_name, driver, seed, ticks, setting)]
+             for level_name in level_names for seed in seeds] for setting in settings]
+
+# --- Report ---
+def summarize(records, fps):
+    # Per-setting metrics over its matches
+    records = np.array(records, dtype=SWEEP_DTYPE)
+    hit = records['first_hit'] >= 0
+    minutes = records['length'].astype(float) * records['narwhals'] / (fps * 60)
+    return {
+        "first hit s": records['first_hit'][hit].mean() / fps if hit.any() else float("nan"),
+        "hit %": hit.mean() * 100,
+        "walls/min": records['wall_bounces'].sum() / minutes.sum(),
+        "obstacles/min": records['obstacle_bounces'].sum() / minutes.sum(),
+        "hits/min": records['hits'].sum() / minutes.sum(),
+        "length s": records['length'].mean() / fps,
+        "decided %": (records['length'] < records['ticks']).mean() * 100,
+    }
+
+def print_table(settings, results, fps, varied):
+    # One row per setting: the parameters that vary, then the metrics
+    rows = [summarize(records, fps) for records in results]
+    metrics = list(rows[0]) if rows else []
+    print(" ".join(f"{name:>14}" for name in varied) + " " + " ".join(f"{metric:>13}" for metric in metrics))
+    for setting, row in zip(settings, rows):
+        print(" ".join(f"{setting[name]:>14.4g}" for name in varied) + " "
+              + " ".join(f"{row[metric]:>13.2f}" for metric in metrics))
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Starwhals movement constants over headless matches")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=V1,V2,...",
+                        help=f"Values to try in every combination ({', '.join(PARAMETERS)})")
+    parser.add_argument("--random", nargs="*", default=[], metavar="NAME=LOW:HIGH",
+                        help="Bounds to sample uniformly (with --samples settings)")
+    parser.add_argument("--samples", type=int, default=16, help="Settings drawn for --random")
+    parser.add_argument("--levels", nargs="*", help="Levels to play (default: every generated arena)")
+    parser.add_argument("--matches", type=int, default=4, help="Matches per setting and level")
+    parser.add_argument("--ticks", type=int, default=MATCH_TICKS, help="Longest match in ticks")
+    parser.add_argument("--driver", choices=("bot", "scripted"), default="bot",
+                        help="Reactive computer players, or narwhals holding seeded random turns")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="First match seed (and the random search seed)")
+    parser.add_argument("--cache", default=SWEEP_CACHE, help="Results cache file ('' to play everything)")
+    args = parser.parse_args()
+
+    try:
+        grid = parse_assignments(args.grid, lambda value: [float(part) for part in value.split(",")])
+        ranges = parse_assignments(args.random, lambda value: tuple(float(part) for part in value.split(":")))
+    except ValueError as e:
+        parser.error(str(e))
+    if any(len(bounds) != 2 for bounds in ranges.values()):
+        parser.error("--random bounds are written LOW:HIGH")
+    if set(grid) & set(ranges):
+        parser.error("a parameter cannot be both on the grid and sampled")
+
+    starwhals = _load_game()
+    arenas = [level.name for level in starwhals.levels if level.world_size is not None and level.arena is None]
+    if args.levels:
+        known = {name.lower(): name for name in arenas}
+        unknown = [name for name in args.levels if name.lower().replace("-", " ") not in known]
+        if unknown:
+            parser.error(f"unknown level(s): {', '.join(unknown)}")
+        arenas = [known[name.lower().replace("-", " ")] for name in args.levels]
+
+    base = defaults()
+    settings = grid_settings(grid, base)
+    if ranges:
+        settings = [sampled for setting in settings
+                    for sampled in random_settings(ranges, setting, args.samples, args.seed)]
+    varied = [name for name in PARAMETERS if name in grid or name in ranges] or list(PARAMETERS)
+    seeds = list(range(args.seed, args.seed + args.matches))
+
+    results = run_sweep(settings, arenas, seeds, args.driver, args.ticks, args.processes, args.cache)
+    print(f"\n{len(settings)} setting(s) x {len(arenas)} level(s) x {len(seeds)} match(es), "
+          f"{args.driver} driven, at most {args.ticks / starwhals.FPS:.0f} s each")
+    print_table(settings, results, starwhals.FPS, varied)
+
+if __name__ == "__main__":
+    main()
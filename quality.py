@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Adaptive quality governor
+#
+# Watches the rolling frame work time against the FPS budget and walks a ladder
+# of quality levels: down one rung while frames run late, back up one rung
+# after several windows in a row with clear headroom. The gap between the two
+# thresholds and the longer wait to recover keep it from flip-flopping. Every
+# change is printed with the frame times that caused it, after a one-off line
+# describing the machine, so reports from players can be compared.
+import collections
+import os
+import platform
+import time
+
+import pygame
+
+# Rungs from best to cheapest:
+# (name, LOD threshold factor, particle budget, render scale, obstacle outlines)
+QUALITY_LEVELS = (
+    ("full", 1.0, 1.0, 1.0, True),
+    ("simpler narwhals", 1.5, 1.0, 1.0, True),
+    ("fewer particles", 1.5, 0.5, 1.0, False),
+    ("render scale 0.8", 1.5, 0.5, 0.8, False),
+    ("minimal narwhals", 3.0, 0.25, 0.8, False),
+    ("render scale 0.6", 3.0, 0.25, 0.6, False),
+    ("lowest", 3.0, 0.0, 0.5, False),
+)
+QUALITY_WINDOW = 30   # Frames averaged before each decision
+QUALITY_SLOW = 0.9    # Step down above this fraction of the frame budget...
+QUALITY_FAST = 0.6    # ...and count a window as fast below this one
+QUALITY_RECOVER = 4   # Fast windows in a row before stepping back up
+
+def cpu_name():
+    # platform.processor() is empty on most Linux systems
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown CPU"
+
+def hardware_summary():
+    # One line that identifies the machine a quality log came from
+    width, height = pygame.display.get_surface().get_size() if pygame.display.get_surface() else (0, 0)
+    return (f"{platform.system()} {platform.release()}, {platform.machine()} "
+            f"{cpu_name()} x{os.cpu_count()}, Python {platform.python_version()}, "
+            f"SDL {'.'.join(map(str, pygame.get_sdl_version()))} ({pygame.display.get_driver()}), "
+            f"window {width}x{height}")
+
+class QualityGovernor:
+    def __init__(self, target_fps=60, render_target=None, lod_thresholds=None, log=print):
+        self.budget = 1.0 / target_fps
+        self.render_target = render_target
+        # The user's settings are the best quality the governor will go back up to
+        self.base_scale = render_target.scale if render_target is not None else 1.0
+        self.lod_thresholds = lod_thresholds  # List updated in place
+        self.base_thresholds = list(lod_thresholds) if lod_thresholds is not None else None
+        self.particles = None
+        self.log = log
+        self.level = 0
+        self.changes = 0
+        self.fast_windows = 0
+        self.frame_times = collections.deque(maxlen=QUALITY_WINDOW)
+        self.started = time.perf_counter()
+        self.log(f"[quality] {hardware_summary()}, budget {self.budget * 1e3:.1f} ms")
+        self.apply()
+
+    @property
+    def name(self):
+        return QUALITY_LEVELS[self.level][0]
+
+    @property
+    def particle_budget(self):
+        return QUALITY_LEVELS[self.level][2]
+
+    @property
+    def obstacle_outlines(self):
+        return QUALITY_LEVELS[self.level][4]
+
+    def track(self, particles):
+        # Particle pool whose emit budget follows the quality level
+        self.particles = particles
+        self.apply()
+
+    def apply(self):
+        _, lod_factor, particle_budget, render_scale, _ = QUALITY_LEVELS[self.level]
+        if self.render_target is not None:
+            self.render_target.set_scale(min(render_scale, self.base_scale))
+        if self.lod_thresholds is not None:
+            self.lod_thresholds[:] = [threshold * lod_factor for threshold in self.base_thresholds]
+        if self.particles is not None:
+            self.particles.budget = particle_budget
+
+    def set_level(self, level, average):
+        self.log(f"[quality] {time.perf_counter() - self.started:7.1f}s level {self.level} -> {level} "
+                 f"({QUALITY_LEVELS[level][0]}): {average * 1e3:.1f} ms average frame, "
+                 f"budget {self.budget * 1e3:.1f} ms")
+        self.level = level
+        self.changes += 1
+        self.apply()
+
+    def frame_done(self, seconds):
+        # Report the frame's work time (excluding the wait for the next tick)
+        self.frame_times.append(seconds)
+        if len(self.frame_times) < QUALITY_WINDOW:
+            return
+        average = sum(self.frame_times) / len(self.frame_times)
+        self.frame_times.clear()
+        if average > self.budget * QUALITY_SLOW:
+            self.fast_windows = 0
+            if self.level < len(QUALITY_LEVELS) - 1:
+                self.set_level(self.level + 1, average)
+        elif average < self.budget * QUALITY_FAST:
+            self.fast_windows += 1
+            if self.fast_windows >= QUALITY_RECOVER and self.level > 0:
+                self.fast_windows = 0
+                self.set_level(self.level - 1, average)
+        else:
+            self.fast_windows = 0
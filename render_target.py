@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Offscreen rendering at a fraction of the window resolution
+#
+# The world is drawn into a surface render_scale times the window size and
+# stretched to the window in one blit, so fill cost no longer grows with the
+# monitor. In auto mode the scale steps down while frames take longer than the
+# FPS budget and back up once there is clear headroom again.
+import collections
+
+import pygame
+
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_MAX = 1.0
+RENDER_SCALE_STEP = 0.1
+AUTO_WINDOW = 30            # Frames averaged before each auto decision
+AUTO_SLOW = 0.9             # Step down above this fraction of the frame budget...
+AUTO_FAST = 0.6             # ...and up below this one (the gap stops flip-flopping)
+
+class RenderTarget:
+    def __init__(self, window, scale=1.0, auto=False, smooth=False, target_fps=60):
+        self.window = window
+        self.auto = auto
+        self.smooth = smooth
+        self.budget = 1.0 / target_fps
+        self.frame_times = collections.deque(maxlen=AUTO_WINDOW)
+        self.scale = None
+        self.offscreen = None
+        self.set_scale(RENDER_SCALE_MAX if auto else scale)
+
+    def set_scale(self, scale):
+        scale = round(min(max(scale, RENDER_SCALE_MIN), RENDER_SCALE_MAX), 2)
+        if scale == self.scale:
+            return
+        self.scale = scale
+        if scale < 1.0:
+            width, height = self.window.get_size()
+            self.offscreen = pygame.Surface((max(1, round(width * scale)), max(1, round(height * scale))))
+        else:
+            self.offscreen = None  # Full scale draws straight into the window
+        self.frame_times.clear()
+
+    @property
+    def surface(self):
+        # Where the world should be drawn this frame
+        return self.window if self.offscreen is None else self.offscreen
+
+    def present(self):
+        # Stretch the offscreen frame over the window (HUD is drawn on the window afterwards)
+        if self.offscreen is None:
+            return
+        if self.smooth:
+            pygame.transform.smoothscale(self.offscreen, self.window.get_size(), self.window)
+        else:
+            pygame.transform.scale(self.offscreen, self.window.get_size(), self.window)
+
+    def to_window(self, rect):
+        # Window area covering a render surface rect once stretched (with a margin for filtering)
+        if self.offscreen is None:
+            return pygame.Rect(rect)
+        rect = pygame.Rect(rect)
+        margin = int(2 / self.scale) + 2
+        return pygame.Rect(int(rect.x / self.scale) - margin, int(rect.y / self.scale) - margin,
+                           int(rect.w / self.scale) + 2 * margin + 1, int(rect.h / self.scale) + 2 * margin + 1)
+
+    def frame_done(self, seconds):
+        # Report the frame's work time (excluding the wait for the next tick)
+        if not self.auto:
+            return
+        self.frame_times.append(seconds)
+        if len(self.frame_times) < AUTO_WINDOW:
+            return
+        average = sum(self.frame_times) / len(self.frame_times)
+        if average > self.budget * AUTO_SLOW and self.scale > RENDER_SCALE_MIN:
+            self.set_scale(self.scale - RENDER_SCALE_STEP)
+        elif average < self.budget * AUTO_FAST and self.scale < RENDER_SCALE_MAX:
+            self.set_scale(self.scale + RENDER_SCALE_STEP)
+        else:
+            self.frame_times.clear()
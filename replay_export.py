@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+# Render recorded matches to numbered PNG frames, much faster than real time
+#
+# A telemetry file holds every narwhal's position, velocity, angle and health on
+# every tick and the obstacle layout at each match start. Beyond that a frame
+# only needs the camera zoom and the tail angles, which ease towards values
+# derived from the ticks before it. One cheap pass over the match stores them
+# every KEYFRAME_INTERVAL ticks; the frames are then split into runs that
+# worker processes render offscreen under SDL's dummy driver, each starting
+# from the keyframe at or before its run.
+#
+# Usage: python replay_export.py matches/20250101-120000-deep-sea.swt --output frames
+#        ffmpeg -framerate 60 -i frames/frame_%06d.png highlight.mp4
+import argparse
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from obstacle_store import OBSTACLE_DTYPE, ObstacleStore
+from telemetry import EVENT_MATCH_START, read_telemetry
+
+KEYFRAME_INTERVAL = 120          # Ticks between stored camera zooms and tail angles
+RUN_TICKS = 240                  # Frames per work item (several per worker balances the load)
+EXPORT_RESOLUTION = (1920, 1080)
+PNG_COMPRESSION = 1              # zlib level: over twice as fast as pygame's PNG writer, for larger files
+
+def _load_game():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import starwhals
+    return starwhals
+
+class MatchReplay:
+    # One match of a telemetry file as per-tick arrays indexed [tick, player]
+    def __init__(self, records, match=0):
+        events = records["event"]
+        starts = events[events["kind"] == EVENT_MATCH_START]
+        if not 0 <= match < len(starts):
+            raise ValueError(f"match {match} requested, the file has {len(starts)}")
+        states = records["state"]
+        self.first_tick = int(starts["tick"][match])
+        end = int(starts["tick"][match + 1]) if match + 1 < len(starts) else int(states["tick"].max()) + 1
+        self.ticks = end - self.first_tick
+        self.player_count = int(starts["player"][match])
+        self.world_size = (float(starts["x"][match]), float(starts["y"][match])) if starts["x"][match] > 0 else None
+
+        rows = states[(states["tick"] >= self.first_tick) & (states["tick"] < end)]
+        ticks, players = rows["tick"] - self.first_tick, rows["player"]
+        self.pos = np.zeros((self.ticks, self.player_count, 2))
+        self.vel = np.zeros((self.ticks, self.player_count, 2))
+        self.angle = np.zeros((self.ticks, self.player_count))
+        self.health = np.zeros((self.ticks, self.player_count), dtype=int)
+        self.pos[ticks, players] = np.column_stack((rows["x"], rows["y"]))
+        self.vel[ticks, players] = np.column_stack((rows["vx"], rows["vy"]))
+        self.angle[ticks, players] = rows["angle"]
+        self.health[ticks, players] = rows["health"]
+        # Ticks lost with dropped buffers repeat the last tick before them
+        recorded = np.zeros(self.ticks, dtype=bool)
+        recorded[ticks] = True
+        source = np.maximum.accumulate(np.where(recorded, np.arange(self.ticks), 0))
+        for array in (self.pos, self.vel, self.angle, self.health):
+            array[:] = array[source]
+
+        layout = records["layout"]
+        self.layout = layout[layout["tick"] == self.first_tick]
+
+    def obstacles(self):
+        records = np.zeros(len(self.layout), dtype=OBSTACLE_DTYPE)
+        for name in ("x", "y", "w", "h", "color"):
+            records[name] = self.layout[name]
+        store = ObstacleStore(max(len(records), 1))
+        store.extend(records)
+        return store
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def save_png(surface, path, level=PNG_COMPRESSION):
+    # Unfiltered 8-bit RGB PNG; encoding is most of a frame's cost
+    import pygame
+    width, height = surface.get_size()
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Filter byte 0 (none) before each row
+    rows[:, 1:] = np.frombuffer(pygame.image.tobytes(surface, "RGB"), dtype=np.uint8).reshape(height, width * 3)
+    with open(path, "wb") as png:
+        png.write(b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                  + _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), level)) + _png_chunk(b"IEND", b""))
+
+def view_size(replay, resolution, default):
+    # The recording window's width (standard arenas are twice the window in each
+    # direction), with the height following the export's aspect ratio
+    width = replay.world_size[0] / 2 if replay.world_size is not None else default[0]
+    return (width, width * resolution[1] / resolution[0])
+
+class ReplayState:
+    # Narwhals and camera as they were on a tick of the replay
+    def __init__(self, starwhals, replay, view):
+        self.starwhals = starwhals
+        self.replay = replay
+        self.camera = starwhals.Camera(replay.world_size, view)
+        self.players = [starwhals.Player(0, 0, starwhals.player_color(index), None)
+                        for index in range(replay.player_count)]
+
+    def keyframe(self):
+        # Everything not recorded that carries over from tick to tick
+        return self.camera.zoom, [player.tail_angle for player in self.players]
+
+    def restore(self, keyframe):
+        self.camera.zoom, tails = keyframe
+        for player, tail_angle in zip(self.players, tails):
+            player.tail_angle = tail_angle
+
+    def advance(self, tick):
+        # Apply recorded tick (ticks must be applied in order from the restored keyframe)
+        replay = self.replay
+        previous = max(tick - 1, 0)
+        time_ms = (replay.first_tick + tick) * 1000 / self.starwhals.FPS
+        for index, player in enumerate(self.players):
+            # The tail reacts to the turn and to the velocity at the start of the tick
+            player.angle = float(replay.angle[tick, index])
+            player.vel = replay.vel[previous, index].copy()
+            speed = float(np.hypot(*player.vel))
+            player.swing_tail(player.angle - replay.angle[previous, index], speed, time_ms)
+            player.pos = replay.pos[tick, index].copy()
+            player.vel = replay.vel[tick, index].copy()
+            player.health = int(replay.health[tick, index])
+        living = [player.pos for player in self.players if player.health > 0]
+        self.camera.update(living or [player.pos for player in self.players])
+
+def keyframes(replay, view, end):
+    # State before every KEYFRAME_INTERVAL-th tick up to end
+    state = ReplayState(_load_game(), replay, view)
+    frames = {}
+    for tick in range(end):
+        if tick % KEYFRAME_INTERVAL == 0:
+            frames[tick] = state.keyframe()
+        state.advance(tick)
+    return frames
+
+def render_run(path, match, level_index, arena_path, resolution, view, keyframe_tick, keyframe, first, last,
+               export_start, output):
+    # Worker: frames for ticks first..last-1, starting from the keyframe before keyframe_tick
+    starwhals = _load_game()
+    import pygame
+    replay = MatchReplay(read_telemetry(path), match)
+    level = starwhals.Level.from_arena(arena_path) if arena_path else starwhals.levels[level_index]
+    obstacles = replay.obstacles()
+    state = ReplayState(starwhals, replay, view)
+    state.restore(keyframe)
+    camera = state.camera
+    camera.render_scale = resolution[0] / view[0]
+    canvas = pygame.Surface(resolution)
+    for tick in range(keyframe_tick, last):
+        state.advance(tick)
+        if tick < first:
+            continue
+        canvas.fill(level.background_color)
+        if level.arena is not None:
+            obstacles = level.obstacles_near([camera.world_bounds()])
+        visible = obstacles.in_box(*camera.world_bounds())
+        colors = obstacles.records['color'][visible]
+        for screen_rect, color in zip(camera.apply_rects(obstacles.rects(visible)), colors):
+            pygame.draw.rect(canvas, level.obstacle_palette[color], screen_rect)
+        for player, outline in zip(state.players, starwhals.player_outlines(state.players, camera)):
+            player.draw(canvas, camera, outline, starwhals.lod_tier(player.length * camera.zoom))
+        starwhals.draw_health(canvas, state.players)
+        save_png(canvas, os.path.join(output, f"frame_{tick - export_start:06d}.png"))
+    return last - first
+
+def find_level(starwhals, path, name=None):
+    # Index of the built-in level by name, or of the one at the end of the telemetry file name
+    for index, level in enumerate(starwhals.levels):
+        if name is not None:
+            if name.lower().replace("-", " ") == level.name.lower():
+                return index
+        elif os.path.basename(path).endswith(f"-{level.name.lower().replace(' ', '-')}.swt"):
+            return index
+    return None
+
+def export(path, output, match=0, level_index=None, arena_path=None, resolution=EXPORT_RESOLUTION,
+           first=0, last=None, processes=1):
+    # Frames for ticks first..last-1 of the match; returns (frames, processes used, keyframe seconds)
+    starwhals = _load_game()
+    replay = MatchReplay(read_telemetry(path), match)
+    view = view_size(replay, resolution, (starwhals.SCREEN_WIDTH, starwhals.SCREEN_HEIGHT))
+    last = replay.ticks if last is None else min(last, replay.ticks)
+    os.makedirs(output, exist_ok=True)
+
+    start = time.perf_counter()
+    stored = keyframes(replay, view, last)
+    keyframe_time = time.perf_counter() - start
+    jobs = []
+    for run_start in range(first, last, RUN_TICKS):
+        keyframe_tick = run_start - run_start % KEYFRAME_INTERVAL
+        jobs.append((path, match, level_index, arena_path, resolution, view, keyframe_tick, stored[keyframe_tick],
+                     run_start, min(run_start + RUN_TICKS, last), first, output))
+    processes = max(1, min(processes, len(jobs)))
+    if processes == 1:
+        frames = sum(render_run(*job) for job in jobs)
+    else:
+        # Spawned workers: forking a process that has already started SDL can deadlock.
+        # They are closed and joined rather than terminated, as SDL swallows SIGTERM.
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            frames = sum(pool.starmap(render_run, jobs, chunksize=1))
+            pool.close()
+            pool.join()
+    return frames, processes, keyframe_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded Starwhals match to numbered PNG frames")
+    parser.add_argument("telemetry", help="Telemetry file (.swt) recorded with --telemetry")
+    parser.add_argument("--match", type=int, default=0, help="Match in the file (rematches follow the first)")
+    parser.add_argument("--level", help="Built-in level the match was played on (default: from the file name)")
+    parser.add_argument("--arena", help="Arena file the match was played on")
+    parser.add_argument("--resolution", default=f"{EXPORT_RESOLUTION[0]}x{EXPORT_RESOLUTION[1]}",
+                        help="Frame size as WIDTHxHEIGHT")
+    parser.add_argument("--start", type=float, default=0.0, help="First second of the match to export")
+    parser.add_argument("--end", type=float, help="Last second of the match to export (default: its end)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output", default="frames", help="Directory for the PNGs")
+    args = parser.parse_args()
+    try:
+        resolution = tuple(int(size) for size in args.resolution.lower().split("x"))
+    except ValueError:
+        resolution = ()
+    if len(resolution) != 2 or min(resolution) <= 0:
+        parser.error(f"--resolution must look like 1920x1080, not {args.resolution!r}")
+
+    starwhals = _load_game()
+    level_index = None if args.arena else find_level(starwhals, args.telemetry, args.level)
+    if level_index is None and not args.arena:
+        parser.error("could not tell the level from the file name; pass --level or --arena")
+    first = max(0, round(args.start * starwhals.FPS))
+    last = None if args.end is None else max(first, round(args.end * starwhals.FPS))
+    start = time.perf_counter()
+    frames, processes, keyframe_time = export(args.telemetry, args.output, args.match, level_index, args.arena,
+                                              resolution, first, last, args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames at {resolution[0]}x{resolution[1]} in {elapsed:.1f}s "
+          f"({frames / elapsed:.1f} frames/s, {frames / elapsed / starwhals.FPS:.2f}x real time, "
+          f"{processes} processes, keyframes {keyframe_time * 1e3:.0f} ms) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
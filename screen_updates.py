@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Dirty-rectangle display updates
+#
+# Drawing code still renders the whole frame, but only the regions marked as
+# changed are pushed to the display with pygame.display.update(rects). Rects
+# marked in the previous frame are pushed again, so whatever moved away from a
+# region (or was erased from it) is cleared on screen as well. A frame that
+# changes everywhere, such as a moving camera, falls back to a full flip.
+import pygame
+
+FULL_UPDATE_FRACTION = 0.5  # Flip instead once the dirty area covers this much of the window
+
+class ScreenUpdates:
+    def __init__(self, screen):
+        self.screen = screen
+        self.dirty = []
+        self.previous = []
+        self.full = True  # Nothing has been shown yet
+        # Pushed pixel area, for comparing against flipping every frame
+        self.frames = 0
+        self.full_frames = 0
+        self.pixels = 0
+        self.last_pixels = 0
+
+    def mark(self, *rects):
+        # Regions of the window drawn differently this frame
+        self.dirty.extend(rects)
+
+    def mark_all(self):
+        self.full = True
+
+    def present(self):
+        bounds = self.screen.get_rect()
+        current = [clipped for clipped in (bounds.clip(rect) for rect in self.dirty) if clipped]
+        rects = current + self.previous
+        area = sum(rect.w * rect.h for rect in rects)
+        if self.full or area > bounds.w * bounds.h * FULL_UPDATE_FRACTION:
+            pygame.display.flip()
+            area = bounds.w * bounds.h
+            self.full_frames += 1
+        elif rects:
+            pygame.display.update(rects)
+        self.previous = current
+        self.dirty = []
+        self.full = False
+        self.frames += 1
+        self.pixels += area
+        self.last_pixels = area
+
+    def average_pixels(self):
+        return self.pixels / self.frames if self.frames else 0.0
+
+    def reset_stats(self):
+        self.frames = self.full_frames = self.pixels = self.last_pixels = 0
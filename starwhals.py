@@ -1,8 +1,27 @@
 # -*- coding: utf-8 -*-
 import pygame
+import argparse
+import functools
 import math
 import numpy as np
 import random
+import threading
+import time
+from concurrent.futures import Future
+import fast_math
+from ai_opponent import BOT_BUDGET_US, BOT_HORIZON, BotController, bot_nav_grid
+from arena_check import repair_arena
+from arena_file import ArenaFile
+from error_channel import errors
+from instant_replay import REPLAY_HIT_DELAY, InstantReplay
+from match_state import restore_match, save_match
+from endless_arena import EndlessArena
+from obstacle_store import ObstacleStore
+from particles import PARTICLE_BUBBLE, PARTICLE_DEBRIS, PARTICLE_SPARK, ParticlePool
+from quality import QualityGovernor
+from render_target import RenderTarget
+from screen_updates import ScreenUpdates
+from telemetry import EVENT_BODY, EVENT_HIT, EVENT_OBSTACLE, TelemetrySink, match_path
 
 # Initialize Pygame
 pygame.init()
@@ -17,6 +36,13 @@ MIN_ZOOM = 0.4  # Maximum zoom out (smaller number = more zoomed out)
 MAX_ZOOM = 1.2  # Maximum zoom in
 PADDING = 100   # Minimum pixels from narwhal to screen edge
 FPS = 60
+ROUND_OVER_DURATION = 3000  # Milliseconds the winner screen stays up before returning to the menu
+WAKE_RATE = 0.25       # Tail wake bubbles per tick per unit of speed
+HIT_SPARKS = 40        # Particles in a horn hit burst
+QUICKSAVE_PATH = "quicksave.sws"  # F6 saves the running match here, F9 loads it
+NOTICE_DURATION = 1500 # Milliseconds a quicksave or quickload notice stays on the HUD
+ARENA_ATTEMPTS = 5     # Layouts generated before one beyond repair is kept anyway
+MAX_PLAYERS = 64       # Most narwhals in a free-for-all
 
 # Colors
 BLACK = (0, 0, 0)
@@ -31,27 +57,36 @@ GREEN = (50, 200, 50)
 
 # Camera class to handle zooming and panning
 class Camera:
-    def __init__(self):
+    def __init__(self, world_size=(WINDOW_WIDTH, WINDOW_HEIGHT), view_size=None):
+        self.world_width, self.world_height = world_size or (None, None)
+        self.view_width, self.view_height = view_size or (SCREEN_WIDTH, SCREEN_HEIGHT)  # Window pixels
         self.x = 0
         self.y = 0
         self.zoom = 1.0
         self.target_zoom = 1.0
         self.zoom_speed = 0.1
+        self.render_scale = 1.0  # Render surface pixels per window pixel
     
-    def update(self, player1_pos, player2_pos):
-        # Calculate the box that contains both players
-        min_x = min(player1_pos[0], player2_pos[0])
-        max_x = max(player1_pos[0], player2_pos[0])
-        min_y = min(player1_pos[1], player2_pos[1])
-        max_y = max(player1_pos[1], player2_pos[1])
+    @property
+    def scale(self):
+        # Render surface pixels per world unit
+        return self.zoom * self.render_scale
+    
+    def update(self, positions):
+        # Calculate the box that contains all the given players
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if len(positions) == 0:
+            return
+        min_x, min_y = positions.min(axis=0)
+        max_x, max_y = positions.max(axis=0)
         
         # Calculate the box dimensions
         box_width = max_x - min_x + PADDING * 2
         box_height = max_y - min_y + PADDING * 2
         
         # Calculate required zoom to fit the box
-        zoom_x = SCREEN_WIDTH / box_width
-        zoom_y = SCREEN_HEIGHT / box_height
+        zoom_x = self.view_width / box_width
+        zoom_y = self.view_height / box_height
         self.target_zoom = min(zoom_x, zoom_y)
         
         # Clamp zoom to limits
@@ -65,26 +100,45 @@ class Camera:
         center_y = (min_y + max_y) / 2
         
         # Calculate camera position (centered on players)
-        self.x = center_x - SCREEN_WIDTH / (2 * self.zoom)
-        self.y = center_y - SCREEN_HEIGHT / (2 * self.zoom)
+        self.x = center_x - self.view_width / (2 * self.zoom)
+        self.y = center_y - self.view_height / (2 * self.zoom)
         
-        # Keep camera within map bounds
-        self.x = np.clip(self.x, 0, WINDOW_WIDTH - SCREEN_WIDTH / self.zoom)
-        self.y = np.clip(self.y, 0, WINDOW_HEIGHT - SCREEN_HEIGHT / self.zoom)
+        # Keep camera within map bounds (endless worlds have none)
+        if self.world_width is None:
+            return
+        self.x = np.clip(self.x, 0, self.world_width - self.view_width / self.zoom)
+        self.y = np.clip(self.y, 0, self.world_height - self.view_height / self.zoom)
+    
+    def world_bounds(self):
+        # Visible world area as (left, top, right, bottom)
+        return (self.x, self.y, self.x + self.view_width / self.zoom, self.y + self.view_height / self.zoom)
+    
+    def transform(self):
+        # World-to-screen affine matrix in homogeneous coordinates
+        return np.array([[self.scale, 0.0, -self.x * self.scale],
+                         [0.0, self.scale, -self.y * self.scale],
+                         [0.0, 0.0, 1.0]])
+    
+    def apply_points(self, points):
+        # Convert an (N, 2) array of world points to screen coordinates in one call
+        matrix = self.transform()
+        return np.asarray(points, dtype=float) @ matrix[:2, :2].T + matrix[:2, 2]
+    
+    def apply_rects(self, rects):
+        # Convert an (N, 4) array of world rectangles (x, y, width, height) to screen rectangles
+        rects = np.asarray(rects, dtype=float)
+        screen_rects = np.empty_like(rects)
+        screen_rects[:, :2] = self.apply_points(rects[:, :2])
+        screen_rects[:, 2:] = rects[:, 2:] * self.scale
+        return screen_rects
     
     def apply(self, pos):
         # Convert world coordinates to screen coordinates
-        screen_x = (pos[0] - self.x) * self.zoom
-        screen_y = (pos[1] - self.y) * self.zoom
-        return np.array([screen_x, screen_y])
+        return self.apply_points(pos)
     
     def apply_rect(self, rect):
         # Convert world rectangle to screen rectangle
-        screen_x = (rect.x - self.x) * self.zoom
-        screen_y = (rect.y - self.y) * self.zoom
-        screen_width = rect.width * self.zoom
-        screen_height = rect.height * self.zoom
-        return pygame.Rect(screen_x, screen_y, screen_width, screen_height)
+        return pygame.Rect(*self.apply_rects([tuple(rect)])[0])
 
 # Function to check if position is clear of obstacles and other spawn points
 def is_position_clear(x, y, obstacles, spawn_points, min_distance=400):  # Increased safe distance
@@ -93,112 +147,249 @@ def is_position_clear(x, y, obstacles, spawn_points, min_distance=400):  # Incre
         if math.dist((x, y), (sx, sy)) < min_distance:
             return False
     
-    # Check if position overlaps with any obstacle
-    test_rect = pygame.Rect(x - 160, y - 160, 320, 320)  # Larger safe area
-    for obstacle in obstacles:
-        if test_rect.colliderect(obstacle.rect):
-            return False
-    return True
+    # Check if position overlaps with any obstacle (larger safe area)
+    return not obstacles.overlapping(x - 160, y - 160, 320, 320).any()
 
-# Obstacle class
-class Obstacle:
-    def __init__(self, x, y, width, height):
-        self.rect = pygame.Rect(x, y, width, height)
-        
-    def draw(self, screen):
-        pygame.draw.rect(screen, GRAY, self.rect)
+# Narwhal silhouette template
+# Every point is a linear combination of (length, width, horn_length, horn_width),
+# stored as coefficients of shape (points, xy, 4). One matrix product scales the
+# whole outline and one rotation places it: body, horn and eye points turn with
+# the body angle, tail points with the tail angle around the tail start.
+SIL_CENTER = 0
+SIL_HORN = slice(33, 37)
+SIL_EYE = 37
+SIL_TAIL_START = 38
+SIL_TAIL_JOINT = 39
+SIL_TAIL_FIRST = slice(40, 44)
+SIL_TAIL_SECOND = slice(44, 48)
+SIL_BODY_FRAME = 38  # Points before this index use the body frame, the rest the tail frame
+SIL_POINTS = 48
+
+def _build_narwhal_template():
+    template = np.zeros((SIL_POINTS, 2, 4))
+    # Body is 70% of the length, centred 15% of it ahead of pos
+    body_offset = 0.7 * 0.15
+    template[SIL_CENTER, 0, 0] = body_offset
+    # Oval body, 32 points with tapered ends (t <= pi is the top half)
+    t = np.linspace(0, 2 * math.pi, 32)
+    template[1:33, 0, 0] = body_offset + np.cos(t) * 0.7 * 0.5
+    template[1:33, 1, 1] = np.sin(t) * 0.5 * (1.0 + 0.2 * np.sin(t))
+    # Straight horn from the front of the body
+    template[SIL_HORN, 0, 0] = body_offset + 0.7 * 0.5
+    template[SIL_HORN, 0, 2] = [0, 1, 1, 0]
+    template[SIL_HORN, 1, 3] = [1, 0.3, -0.3, -1]
+    # Eye sits 45 degrees off the body centre
+    template[SIL_EYE, 0, 0] = body_offset
+    template[SIL_EYE, :, 1] = 0.4 * math.cos(math.pi/4)
+    # Tail is 40% of the length, split 70/30 between the two segments
+    first_tail = 0.4 * 0.7
+    template[SIL_TAIL_JOINT, 0, 0] = -first_tail
+    template[SIL_TAIL_FIRST, 0, 0] = [0, -first_tail, -first_tail, 0]
+    template[SIL_TAIL_FIRST, 1, 1] = [0.36, 0.12, -0.12, -0.36]
+    template[SIL_TAIL_SECOND, 0, 0] = [-first_tail, -0.4, -0.4, -first_tail]
+    template[SIL_TAIL_SECOND, 1, 1] = [0.12, 0.7, -0.7, -0.12]
+    return template
+
+NARWHAL_TEMPLATE = _build_narwhal_template()
+TAIL_ORIGIN = np.array([[-0.7 * 0.25, 0, 0, 0], [0, 0, 0, 0]])  # Tail start in the body frame
+# Body halves are closed through the body centre
+BELLY_POLYGON = np.r_[SIL_CENTER, 17:33, SIL_CENTER]
+BACK_POLYGON = np.r_[SIL_CENTER, 1:17, SIL_CENTER]
+# Level of detail: narwhals are drawn simpler as their on-screen length shrinks.
+# LOD_THRESHOLDS holds the minimum projected length in pixels (player.length *
+# camera.zoom) for the full and reduced tiers; anything smaller is minimal.
+LOD_FULL = 0
+LOD_REDUCED = 1     # Half the body points, plain eye, single-layer heart
+LOD_MINIMAL = 2     # One-color body outline, no overlap circles, eye, eyelid or heart layers
+LOD_NAMES = ("full", "reduced", "minimal")
+LOD_THRESHOLDS = [200, 120]
+BELLY_POLYGON_REDUCED = np.r_[SIL_CENTER, 17:33:2, 32, SIL_CENTER]
+BACK_POLYGON_REDUCED = np.r_[SIL_CENTER, 1:17:2, 16, SIL_CENTER]
+BODY_POLYGON_MINIMAL = np.r_[1:33:4, 32]
+# Eyelid curve: offset of each point along the lid and how far it bends from the brow
+EYELID_OFFSET = 8 * (np.linspace(0, 1, 5) - 0.5)
+EYELID_BEND = math.pi/8 * np.sin(np.linspace(0, 1, 5) * math.pi)
+
+def _silhouette_bounds():
+    # Per-point clip bounds; the body centre and tail joints are left unclipped
+    low = np.zeros((SIL_POINTS, 2))
+    high = np.tile([float(WINDOW_WIDTH), float(WINDOW_HEIGHT)], (SIL_POINTS, 1))
+    low[SIL_EYE] = 6
+    high[SIL_EYE] -= 6
+    for index in (SIL_CENTER, SIL_TAIL_START, SIL_TAIL_JOINT):
+        low[index] = -np.inf
+        high[index] = np.inf
+    return low, high
+
+SIL_CLIP_LOW, SIL_CLIP_HIGH = _silhouette_bounds()
+
+def lod_tier(projected_length):
+    for tier, threshold in enumerate(LOD_THRESHOLDS):
+        if projected_length >= threshold:
+            return tier
+    return len(LOD_THRESHOLDS)
+
+def rotation_matrices(angles):
+    # Stack of 2x2 rotation matrices, one per angle in degrees
+    rad = np.radians(angles)
+    c, s = np.cos(rad), np.sin(rad)
+    return np.stack([np.stack([c, -s], -1), np.stack([s, c], -1)], -2)
+
+def narwhal_outlines(pos, angle, tail_angle, dims):
+    # Silhouettes for a batch of narwhals in one pass.
+    # pos is (P, 2), angle and tail_angle are (P,) in degrees and dims is (P, 4)
+    # holding length, width, horn_length and horn_width. Returns (P, 48, 2).
+    local = np.einsum('nck,pk->pnc', NARWHAL_TEMPLATE, dims)
+    body_rot = rotation_matrices(angle)
+    tail_rot = rotation_matrices(np.asarray(angle) + tail_angle)
+    points = np.empty_like(local)
+    points[:, :SIL_BODY_FRAME] = np.einsum('pnc,pdc->pnd', local[:, :SIL_BODY_FRAME], body_rot)
+    points[:, SIL_BODY_FRAME:] = np.einsum('pnc,pdc->pnd', local[:, SIL_BODY_FRAME:], tail_rot)
+    tail_origin = np.einsum('ck,pk->pc', TAIL_ORIGIN, dims)
+    points[:, SIL_BODY_FRAME:] += np.einsum('pc,pdc->pd', tail_origin, body_rot)[:, np.newaxis]
+    points += np.asarray(pos)[:, np.newaxis]
+    return np.clip(points, SIL_CLIP_LOW, SIL_CLIP_HIGH, out=points)
+
+def player_outlines(players, camera=None):
+    # Screen-space silhouettes for several players at once
+    pos = np.array([player.pos for player in players])
+    dims = np.array([[player.length, player.width, player.horn_length, player.horn_width]
+                     for player in players])
+    if camera is not None:
+        pos = camera.apply_points(pos)
+        dims = dims * camera.scale
+    return narwhal_outlines(pos, np.array([player.angle for player in players]),
+                            np.array([player.tail_angle for player in players]), dims)
+
+@functools.lru_cache(maxsize=None)
+def belly_color(color):
+    # Lighter belly color (30% lighter for more contrast), one shared tuple per color
+    return tuple(min(c + 75, 255) for c in color)
 
 # Player class
+# Body dimensions and handling are per-archetype constants on the class (a
+# subclass can define another kind of narwhal); instances only carry their own
+# state in slots, which keeps large free-for-all and bot scenes compact.
 class Player:
+    length = 280  # Increased body length for more oval shape
+    width = 50    # Reduced width to make more oval
+    horn_length = 100  # Keep horn length the same
+    horn_width = 10    # Keep horn width the same
+    rotation_speed = 6  # Increased rotation speed to match faster movement
+    thrust = 0.6    # Increased thrust by 50% from 0.4
+    resistance = 0.988  # Water resistance at low speed (less as the narwhal speeds up)
+    bounce_factor = 0.8  # Share of speed kept when bouncing off a wall
+    max_health = 3
+    # Tail joint properties
+    tail_length = length * 0.9  # Much longer tail
+    tail_response = 0.2  # Slower tail response for more fluid movement
+    
+    __slots__ = ('pos', 'vel', 'angle', 'color', 'belly_color', 'controls', 'turn', 'health',
+                 'tail_angle', 'target_tail_angle', 'speed', '_facing_angle', '_facing',
+                 '_facing_generation')
+    
     def __init__(self, x, y, color, controls):
         self.pos = np.array([float(x), float(y)])
         self.vel = np.array([0.0, 0.0])
         self.angle = 0
         self.color = color
-        # Calculate lighter belly color (30% lighter for more contrast)
-        self.belly_color = tuple(min(c + 75, 255) for c in color)
+        self.belly_color = belly_color(tuple(color))
         self.controls = controls
-        self.length = 280  # Increased body length for more oval shape
-        self.width = 50    # Reduced width to make more oval
-        self.horn_length = 100  # Keep horn length the same
-        self.horn_width = 10    # Keep horn width the same
-        self.rotation_speed = 6  # Increased rotation speed to match faster movement
-        self.thrust = 0.6    # Increased thrust by 50% from 0.4
+        self.turn = None  # Steering set by a bot (-1 left, 0 straight, 1 right); None reads the controls
         self.health = 3    
-        self.max_health = 3
-        # Tail joint properties
         self.tail_angle = 0
         self.target_tail_angle = 0
-        self.tail_length = self.length * 0.9  # Much longer tail
-        self.tail_response = 0.2  # Slower tail response for more fluid movement
+        # Per-tick cache: speed after the last move and the facing vector for _facing_angle
+        # (at fast_math's trig resolution when _facing_generation was current)
+        self.speed = 0.0
+        self._facing_angle = None
+        self._facing = (1.0, 0.0)
+        self._facing_generation = fast_math.trig_generation
+    
+    def clone(self):
+        # Independent copy for lookahead branches (only the arrays are mutable)
+        twin = object.__new__(type(self))
+        for name in Player.__slots__:
+            setattr(twin, name, getattr(self, name))
+        twin.pos = self.pos.copy()
+        twin.vel = self.vel.copy()
+        return twin
+    
+    def facing(self):
+        # Unit vector the narwhal points along, recomputed only when the angle (or the
+        # trig resolution) changes
+        if self.angle != self._facing_angle or self._facing_generation != fast_math.trig_generation:
+            self._facing = fast_math.direction(self.angle)
+            self._facing_angle = self.angle
+            self._facing_generation = fast_math.trig_generation
+        return self._facing
         
-    def move(self, obstacles, other_player=None):
+    def move(self, obstacles, others=(), world_size=(WINDOW_WIDTH, WINDOW_HEIGHT), particles=None, telemetry=None):
         try:
             prev_pos = self.pos.copy()
             prev_angle = self.angle
             
+            # Speed at the start of the tick, shared by steering and the tail
+            speed = fast_math.length(self.vel[0], self.vel[1])
+            
             # Rotate with momentum
-            keys = pygame.key.get_pressed()
             rotation_momentum = 0.8  # Maintains some rotation after key release
-            if keys[self.controls[0]]:  # Left
-                self.angle -= self.rotation_speed * (1 + abs(np.linalg.norm(self.vel)) * 0.05)
-            if keys[self.controls[1]]:  # Right
-                self.angle += self.rotation_speed * (1 + abs(np.linalg.norm(self.vel)) * 0.05)
+            if self.turn is not None:
+                self.angle += self.turn * self.rotation_speed * (1 + speed * 0.05)
+            elif self.controls is not None:  # Narwhals without controls swim straight
+                keys = pygame.key.get_pressed()
+                if keys[self.controls[0]]:  # Left
+                    self.angle -= self.rotation_speed * (1 + speed * 0.05)
+                if keys[self.controls[1]]:  # Right
+                    self.angle += self.rotation_speed * (1 + speed * 0.05)
             
             # Calculate tail physics with more elongated movement
-            turn_amount = self.angle - prev_angle
-            self.target_tail_angle = np.clip(turn_amount * -5, -80, 80)
-            
-            # Tail responds more to velocity but with smoother movement
-            if np.linalg.norm(self.vel) > 0.01:
-                vel_angle = math.degrees(math.atan2(self.vel[1], self.vel[0]))
-                angle_diff = (vel_angle - self.angle) % 360
-                if angle_diff > 180:
-                    angle_diff -= 360
-                self.target_tail_angle += np.clip(angle_diff * 0.4, -65, 65)
-            
-            # Add natural swaying with velocity influence
-            sway_amount = 12 * (1 + min(np.linalg.norm(self.vel) * 0.15, 1.0))
-            self.target_tail_angle += math.sin(pygame.time.get_ticks() * 0.003) * sway_amount
-            
-            # Smoothly interpolate tail angle
-            self.tail_angle += (self.target_tail_angle - self.tail_angle) * self.tail_response
+            self.swing_tail(self.angle - prev_angle, speed, pygame.time.get_ticks())
             
             # Move forward with momentum
-            direction = np.array([math.cos(math.radians(self.angle)), 
-                                math.sin(math.radians(self.angle))])
-            self.vel += direction * self.thrust
+            direction_x, direction_y = self.facing()
+            self.vel[0] += direction_x * self.thrust
+            self.vel[1] += direction_y * self.thrust
             
             # Apply water resistance (adjusted for higher speed)
-            speed = np.linalg.norm(self.vel)
+            speed = fast_math.length(self.vel[0], self.vel[1])
             if speed > 0:
-                resistance = 0.988 - min(speed * 0.001, 0.02)  # Less resistance for maintaining higher speeds
+                resistance = self.resistance - min(speed * 0.001, 0.02)  # Less resistance for maintaining higher speeds
                 self.vel *= resistance
+                speed *= resistance
+            self.speed = speed
             
             # Update position
             self.pos += self.vel
             
-            # Keep narwhal on screen with bounce
-            bounce_factor = 0.8
-            if self.pos[0] < self.length/2:
-                self.pos[0] = self.length/2
-                self.vel[0] = abs(self.vel[0]) * bounce_factor
-            elif self.pos[0] > WINDOW_WIDTH - self.length/2:
-                self.pos[0] = WINDOW_WIDTH - self.length/2
-                self.vel[0] = -abs(self.vel[0]) * bounce_factor
-            if self.pos[1] < self.length/2:
-                self.pos[1] = self.length/2
-                self.vel[1] = abs(self.vel[1]) * bounce_factor
-            elif self.pos[1] > WINDOW_HEIGHT - self.length/2:
-                self.pos[1] = WINDOW_HEIGHT - self.length/2
-                self.vel[1] = -abs(self.vel[1]) * bounce_factor
+            # Keep narwhal on screen with bounce (endless worlds have no walls)
+            if world_size is not None:
+                world_width, world_height = world_size
+                bounce_factor = self.bounce_factor
+                if self.pos[0] < self.length/2:
+                    self.pos[0] = self.length/2
+                    self.vel[0] = abs(self.vel[0]) * bounce_factor
+                elif self.pos[0] > world_width - self.length/2:
+                    self.pos[0] = world_width - self.length/2
+                    self.vel[0] = -abs(self.vel[0]) * bounce_factor
+                if self.pos[1] < self.length/2:
+                    self.pos[1] = self.length/2
+                    self.vel[1] = abs(self.vel[1]) * bounce_factor
+                elif self.pos[1] > world_height - self.length/2:
+                    self.pos[1] = world_height - self.length/2
+                    self.vel[1] = -abs(self.vel[1]) * bounce_factor
             
             # Obstacle collision detection and response with improved physics
             narwhal_radius = self.width * 0.6
-            for obstacle in obstacles:
+            records = obstacles.records
+            candidates = obstacles.near(self.pos[0], self.pos[1], narwhal_radius)
+            while candidates:
+                index = candidates.pop(0)
                 # Calculate closest point on obstacle to narwhal center
-                closest_x = max(obstacle.rect.left, min(self.pos[0], obstacle.rect.right))
-                closest_y = max(obstacle.rect.top, min(self.pos[1], obstacle.rect.bottom))
+                left, top = float(records['x'][index]), float(records['y'][index])
+                right, bottom = left + float(records['w'][index]), top + float(records['h'][index])
+                closest_x = max(left, min(self.pos[0], right))
+                closest_y = max(top, min(self.pos[1], bottom))
                 
                 # Calculate distance to closest point
                 distance_x = self.pos[0] - closest_x
@@ -216,72 +407,109 @@ class Player:
                     # Move narwhal out of obstacle
                     overlap = narwhal_radius - distance
                     self.pos += normal * overlap * 1.1  # Slight extra push to prevent sticking
+                    # The push can carry the narwhal into obstacles that were not near before;
+                    # the ones after this one are tested from where it is now
+                    candidates = [later for later in obstacles.near(self.pos[0], self.pos[1], narwhal_radius)
+                                  if later > index]
                     
                     # Calculate bounce response with angular momentum
                     dot_product = np.dot(self.vel, normal)
                     self.vel -= 2.0 * dot_product * normal  # Perfect reflection
                     self.vel *= 0.85  # Energy loss
                     
+                    # Kick up debris at the contact point, more for harder hits
+                    if particles is not None:
+                        particles.emit(closest_x, closest_y, min(30, abs(dot_product) * 4), PARTICLE_DEBRIS,
+                                       speed=abs(dot_product) * 0.6, direction=math.atan2(normal[1], normal[0]),
+                                       spread=1.0)
+                    if telemetry is not None:
+                        telemetry.event(EVENT_OBSTACLE, self, None, closest_x, closest_y, abs(dot_product))
+                    
                     # Add spin based on collision angle
-                    collision_angle = math.degrees(math.atan2(normal[1], normal[0]))
-                    angle_diff = (collision_angle - self.angle) % 360
-                    if angle_diff > 180:
-                        angle_diff -= 360
+                    collision_angle = fast_math.heading(normal[0], normal[1])
+                    angle_diff = fast_math.wrap_degrees(collision_angle - self.angle)
                     self.angle += angle_diff * 0.15  # More pronounced rotation effect
                     
                     # Add some randomness to prevent getting stuck
                     self.vel += np.array([random.uniform(-0.2, 0.2), random.uniform(-0.2, 0.2)])
             
             # Player collision with improved physics
-            if other_player:
+            for other_player in others:
                 dist = math.dist(self.pos, other_player.pos)
                 if dist > 0:  # Prevent division by zero
                     min_dist = (self.width + other_player.width) * 0.6  # Slightly reduced collision radius
-                    
+                
                     if dist < min_dist:
                         # Calculate collision normal
                         normal = (self.pos - other_player.pos) / dist
-                        
+                    
                         # Calculate relative velocity
                         rel_vel = self.vel - other_player.vel
-                        
+                    
                         # Calculate impulse
                         impulse = -1.8 * np.dot(rel_vel, normal)  # More bouncy collision
-                        
+                    
                         # Apply impulse
                         self.vel += normal * impulse * 0.5
-                        
+                        if telemetry is not None:
+                            telemetry.event(EVENT_BODY, self, other_player, self.pos[0], self.pos[1], impulse)
+                    
                         # Add some spin based on collision angle
-                        collision_angle = math.degrees(math.atan2(normal[1], normal[0]))
-                        angle_diff = (collision_angle - self.angle) % 360
-                        if angle_diff > 180:
-                            angle_diff -= 360
+                        collision_angle = fast_math.heading(normal[0], normal[1])
+                        angle_diff = fast_math.wrap_degrees(collision_angle - self.angle)
                         self.angle += angle_diff * 0.1
-                        
+                    
                         # Move apart to prevent sticking
                         overlap = min_dist - dist
                         self.pos += normal * (overlap * 0.6)  # Move more to prevent sticking
-                        
+                    
                         # Add slight random movement to prevent getting stuck
                         self.vel += np.array([random.uniform(-0.3, 0.3), random.uniform(-0.3, 0.3)])
+            
+            # Trail a wake of bubbles from the tail
+            if particles is not None and self.speed > 1:
+                direction_x, direction_y = self.facing()
+                tail_x = self.pos[0] - direction_x * self.length * 0.5
+                tail_y = self.pos[1] - direction_y * self.length * 0.5
+                particles.emit(tail_x, tail_y, self.speed * WAKE_RATE + particles.rng.random(), PARTICLE_BUBBLE,
+                               speed=1.0, direction=math.atan2(-direction_y, -direction_x), spread=0.4,
+                               velocity=(self.vel[0] * 0.2, self.vel[1] * 0.2))
         except Exception as e:
-            print(f"Error in move: {e}")
+            errors.report("Player.move", e)
             # Restore previous position if there's an error
             self.pos = prev_pos
     
+    def swing_tail(self, turn_amount, speed, time_ms):
+        # Tail follows this tick's turn, the drift against the heading (self.vel is
+        # the velocity at the start of the tick) and a sway over time_ms
+        self.target_tail_angle = fast_math.clamp(turn_amount * -5, -80, 80)
+        
+        # Tail responds more to velocity but with smoother movement
+        if speed > 0.01:
+            vel_angle = fast_math.heading(self.vel[0], self.vel[1])
+            angle_diff = fast_math.wrap_degrees(vel_angle - self.angle)
+            self.target_tail_angle += fast_math.clamp(angle_diff * 0.4, -65, 65)
+        
+        # Add natural swaying with velocity influence
+        sway_amount = 12 * (1 + min(speed * 0.15, 1.0))
+        self.target_tail_angle += math.sin(time_ms * 0.003) * sway_amount
+        
+        # Smoothly interpolate tail angle
+        self.tail_angle += (self.target_tail_angle - self.tail_angle) * self.tail_response
+    
     def get_horn_tip(self):
-        angle_rad = math.radians(self.angle)
-        tip_x = self.pos[0] + math.cos(angle_rad) * (self.length/2 + self.horn_length)
-        tip_y = self.pos[1] + math.sin(angle_rad) * (self.length/2 + self.horn_length)
+        direction_x, direction_y = self.facing()
+        tip_x = self.pos[0] + direction_x * (self.length/2 + self.horn_length)
+        tip_y = self.pos[1] + direction_y * (self.length/2 + self.horn_length)
         return (tip_x, tip_y)
         
-    def draw_heart(self, screen, pos, size):
+    def draw_heart(self, screen, pos, size, layers=3):
         try:
             x, y = pos
             radius = size // 2.6  # Increased base size by 15%
             
             # Draw the heart with a gradient effect
-            for i in range(3):  # Multiple layers for depth
+            for i in range(layers):  # Multiple layers for depth
                 scale = 1 - i * 0.15  # Each layer slightly smaller
                 current_radius = int(radius * scale)
                 current_x = x
@@ -306,6 +534,9 @@ class Player:
                 ]
                 pygame.draw.polygon(screen, dark_red, points)
             
+            if layers < 3:
+                return
+            
             # Add highlight effect
             highlight_pos = (x - radius//4, y - radius//4)
             highlight_radius = radius // 4
@@ -328,204 +559,144 @@ class Player:
             pygame.draw.polygon(screen, (100, 0, 0), outline_points, 2)  # Bottom outline
             
         except Exception as e:
-            print(f"Error drawing heart: {e}")
+            errors.report("Player.draw_heart", e)
             # Fallback to simple circle if there's an error
             try:
                 pygame.draw.circle(screen, RED, pos, size // 2)
             except:
                 pass
 
-    def draw(self, screen):
+    def outline(self, camera=None):
+        # Silhouette points for this narwhal alone
+        return player_outlines([self], camera)[0]
+
+    def screen_rect(self, outline, camera):
+        # Render surface area draw() can touch: the silhouette plus the eye, brow
+        # and heart, which have fixed pixel sizes (the heart is also kept on screen)
+        pixel = camera.render_scale
+        left, top = outline.min(axis=0)
+        right, bottom = outline.max(axis=0)
+        margin = 16 * pixel
+        rect = pygame.Rect(left - margin, top - margin, right - left + 2 * margin + 1, bottom - top + 2 * margin + 1)
+        screen_pos = camera.apply(self.pos)
+        heart = pygame.Rect(0, 0, 64 * pixel, 64 * pixel)
+        heart.center = (int(np.clip(screen_pos[0], 24, WINDOW_WIDTH-24)), int(np.clip(screen_pos[1], 24, WINDOW_HEIGHT-24)))
+        return rect.union(heart)
+
+    def draw(self, screen, camera=None, outline=None, tier=None):
         try:
-            angle_rad = math.radians(self.angle)
-            tail_angle_rad = math.radians(self.angle + self.tail_angle)
-            
-            # Calculate key positions and dimensions
-            total_body_length = self.length
-            body_length = total_body_length * 0.7  # More of the length dedicated to body
-            tail_length = total_body_length * 0.4  # Longer tail portion
-            first_tail_length = tail_length * 0.7  # First segment longer
-            second_tail_length = tail_length * 0.3  # Second segment shorter
-            
-            # Adjust positions for better overlap
-            body_center = self.pos + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * (body_length * 0.15)
-            # Move tail start further inside the body for better overlap
-            tail_start = self.pos - np.array([math.cos(angle_rad), math.sin(angle_rad)]) * (body_length * 0.25)
-            tail_joint = tail_start - np.array([math.cos(tail_angle_rad), math.sin(tail_angle_rad)]) * first_tail_length
-            tail_end = tail_joint - np.array([math.cos(tail_angle_rad), math.sin(tail_angle_rad)]) * second_tail_length
-            
-            # Draw oval body with wider front and lighter belly
-            body_points_top = []
-            body_points_bottom = []
-            num_points = 32
-            
-            for i in range(num_points):
-                try:
-                    t = i / (num_points - 1) * 2 * math.pi
-                    # Create more oval shape with tapered ends
-                    x = math.cos(t) * (body_length * 0.5)
-                    # Modify width based on position (wider in middle, tapered at ends)
-                    width_factor = 1.0 + 0.2 * math.sin(t)  # More pronounced oval shape
-                    y = math.sin(t) * (self.width * 0.5 * width_factor)
-                    
-                    # Rotate the point
-                    rotated_x = x * math.cos(angle_rad) - y * math.sin(angle_rad)
-                    rotated_y = x * math.sin(angle_rad) + y * math.cos(angle_rad)
-                    
-                    # Translate to body center
-                    point = body_center + np.array([rotated_x, rotated_y])
-                    
-                    # Ensure point is within screen bounds
-                    point[0] = np.clip(point[0], 0, WINDOW_WIDTH)
-                    point[1] = np.clip(point[1], 0, WINDOW_HEIGHT)
-                    
-                    # Split points into top and bottom for different colors
-                    if t <= math.pi:
-                        body_points_top.append(point)
-                    else:
-                        body_points_bottom.append(point)
-                except Exception as e:
-                    print(f"Error calculating body point {i}: {e}")
-                    continue
+            # Screen-space scale; world state is never modified for drawing
+            zoom = camera.scale if camera is not None else 1.0
+            pixel = camera.render_scale if camera is not None else 1.0  # For sizes given in window pixels
+            width = self.width * zoom
+            screen_pos = camera.apply(self.pos) if camera is not None else self.pos
+            if tier is None:
+                tier = lod_tier(self.length * zoom / pixel)
             
-            # Draw bottom (belly) part first
-            if len(body_points_bottom) >= 2:
-                points = [body_center] + body_points_bottom + [body_center]
-                pygame.draw.polygon(screen, self.belly_color, points)
+            # Whole silhouette in one vectorized step (or precomputed for a batch of players)
+            if outline is None:
+                outline = self.outline(camera)
+            tail_start = outline[SIL_TAIL_START]
+            tail_joint = outline[SIL_TAIL_JOINT]
             
-            # Draw top part
-            if len(body_points_top) >= 2:
-                points = [body_center] + body_points_top + [body_center]
-                pygame.draw.polygon(screen, self.color, points)
+            # Draw bottom (belly) part first, then top part
+            if tier == LOD_FULL:
+                pygame.draw.polygon(screen, self.belly_color, outline[BELLY_POLYGON])
+                pygame.draw.polygon(screen, self.color, outline[BACK_POLYGON])
+            elif tier == LOD_REDUCED:
+                pygame.draw.polygon(screen, self.belly_color, outline[BELLY_POLYGON_REDUCED])
+                pygame.draw.polygon(screen, self.color, outline[BACK_POLYGON_REDUCED])
+            else:
+                pygame.draw.polygon(screen, self.color, outline[BODY_POLYGON_MINIMAL])
             
             # 2. Draw first tail triangle with thinner base and better overlap
             try:
-                tail_width_start = self.width * 0.72  # 20% thinner (0.9 * 0.8)
-                tail_width_middle = self.width * 0.24  # Keep proportional
+                tail_width_start = width * 0.72  # 20% thinner (0.9 * 0.8)
+                tail_width_middle = width * 0.24  # Keep proportional
                 
                 # Draw an overlap circle at the connection point for smoother transition
-                overlap_radius = tail_width_start * 0.6
-                pygame.draw.circle(screen, self.color, 
-                                 (int(tail_start[0]), int(tail_start[1])), 
-                                 int(overlap_radius))
-                
-                first_tail_points = [
-                    tail_start + np.array([math.cos(tail_angle_rad + math.pi/2), math.sin(tail_angle_rad + math.pi/2)]) * tail_width_start/2,
-                    tail_joint + np.array([math.cos(tail_angle_rad + math.pi/2), math.sin(tail_angle_rad + math.pi/2)]) * tail_width_middle/2,
-                    tail_joint + np.array([math.cos(tail_angle_rad - math.pi/2), math.sin(tail_angle_rad - math.pi/2)]) * tail_width_middle/2,
-                    tail_start + np.array([math.cos(tail_angle_rad - math.pi/2), math.sin(tail_angle_rad - math.pi/2)]) * tail_width_start/2
-                ]
-                first_tail_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in first_tail_points]
-                pygame.draw.polygon(screen, self.color, first_tail_points)
+                if tier != LOD_MINIMAL:
+                    overlap_radius = tail_width_start * 0.6
+                    pygame.draw.circle(screen, self.color, 
+                                     (int(tail_start[0]), int(tail_start[1])), 
+                                     int(overlap_radius))
+                pygame.draw.polygon(screen, self.color, outline[SIL_TAIL_FIRST])
             except Exception as e:
-                print(f"Error drawing first tail: {e}")
+                errors.report("Player.draw first tail", e)
             
             # 3. Draw second tail triangle with better overlap
             try:
-                tail_width_end = self.width * 1.4
-                
                 # Draw an overlap circle at the joint for smoother transition
-                overlap_radius = tail_width_middle * 0.8
-                pygame.draw.circle(screen, self.color, 
-                                 (int(tail_joint[0]), int(tail_joint[1])), 
-                                 int(overlap_radius))
-                
-                second_tail_points = [
-                    tail_joint + np.array([math.cos(tail_angle_rad + math.pi/2), math.sin(tail_angle_rad + math.pi/2)]) * tail_width_middle/2,
-                    tail_end + np.array([math.cos(tail_angle_rad + math.pi/2), math.sin(tail_angle_rad + math.pi/2)]) * tail_width_end/2,
-                    tail_end + np.array([math.cos(tail_angle_rad - math.pi/2), math.sin(tail_angle_rad - math.pi/2)]) * tail_width_end/2,
-                    tail_joint + np.array([math.cos(tail_angle_rad - math.pi/2), math.sin(tail_angle_rad - math.pi/2)]) * tail_width_middle/2
-                ]
-                second_tail_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in second_tail_points]
-                pygame.draw.polygon(screen, self.color, second_tail_points)
+                if tier != LOD_MINIMAL:
+                    overlap_radius = tail_width_middle * 0.8
+                    pygame.draw.circle(screen, self.color, 
+                                     (int(tail_joint[0]), int(tail_joint[1])), 
+                                     int(overlap_radius))
+                pygame.draw.polygon(screen, self.color, outline[SIL_TAIL_SECOND])
             except Exception as e:
-                print(f"Error drawing second tail: {e}")
+                errors.report("Player.draw second tail", e)
             
             # 4. Draw straight horn
             try:
-                horn_base = body_center + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * (body_length * 0.5)
-                horn_tip = horn_base + np.array([math.cos(angle_rad), math.sin(angle_rad)]) * self.horn_length
-                
-                horn_points = [
-                    horn_base + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * self.horn_width,
-                    horn_tip + np.array([math.cos(angle_rad + math.pi/2), math.sin(angle_rad + math.pi/2)]) * (self.horn_width * 0.3),
-                    horn_tip + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * (self.horn_width * 0.3),
-                    horn_base + np.array([math.cos(angle_rad - math.pi/2), math.sin(angle_rad - math.pi/2)]) * self.horn_width
-                ]
-                # Clip points to screen
-                horn_points = [(np.clip(p[0], 0, WINDOW_WIDTH), np.clip(p[1], 0, WINDOW_HEIGHT)) for p in horn_points]
-                pygame.draw.polygon(screen, self.color, horn_points)
+                pygame.draw.polygon(screen, self.color, outline[SIL_HORN])
             except Exception as e:
-                print(f"Error drawing horn: {e}")
+                errors.report("Player.draw horn", e)
             
-            # 5. Draw angry eyes
+            # 5. Draw angry eyes (a plain eye when reduced, none when minimal)
             try:
-                # Calculate eye position
-                eye_pos = body_center + np.array([
-                    math.cos(angle_rad + math.pi/4) * self.width * 0.4,
-                    math.sin(angle_rad + math.pi/4) * self.width * 0.4
-                ])
-                eye_pos = (int(np.clip(eye_pos[0], 6, WINDOW_WIDTH-6)), 
-                          int(np.clip(eye_pos[1], 6, WINDOW_HEIGHT-6)))
+                if tier != LOD_MINIMAL:
+                    eye_pos = (int(outline[SIL_EYE][0]), int(outline[SIL_EYE][1]))
                 
-                # Draw white of eye
-                pygame.draw.circle(screen, WHITE, eye_pos, 8)
+                    # Draw white of eye
+                    pygame.draw.circle(screen, WHITE, eye_pos, 8 * pixel)
                 
-                # Draw black pupil (slightly offset downward for angry look)
-                pupil_pos = (eye_pos[0], eye_pos[1] + 1)
-                pygame.draw.circle(screen, BLACK, pupil_pos, 4)
+                    # Draw black pupil (slightly offset downward for angry look)
+                    pupil_pos = (eye_pos[0], eye_pos[1] + 1 * pixel)
+                    pygame.draw.circle(screen, BLACK, pupil_pos, 4 * pixel)
                 
-                # Draw angry eyebrow
-                brow_length = 12
-                brow_thickness = 3
+                if tier == LOD_FULL:
+                    # Draw angry eyebrow
+                    brow_length = 12 * pixel
+                    brow_thickness = max(1, round(3 * pixel))
                 
-                # Calculate eyebrow angle (angled down towards center)
-                brow_angle = angle_rad + math.pi/4 - math.pi/6  # Angled for angry look
+                    # Calculate eyebrow angle (angled down towards center)
+                    brow_degrees = self.angle + 45 - 30  # Angled for angry look
+                    brow_angle = math.radians(brow_degrees)
                 
-                # Calculate eyebrow points
-                brow_start = np.array([
-                    eye_pos[0] - math.cos(brow_angle) * brow_length,
-                    eye_pos[1] - math.sin(brow_angle) * brow_length - 4
-                ])
-                brow_end = np.array([
-                    eye_pos[0] + math.cos(brow_angle) * brow_length,
-                    eye_pos[1] + math.sin(brow_angle) * brow_length - 4
-                ])
+                    # Calculate eyebrow points
+                    brow_dir = np.array(fast_math.direction(brow_degrees)) * brow_length
+                    brow_start = np.array(eye_pos) - brow_dir - (0, 4 * pixel)
+                    brow_end = np.array(eye_pos) + brow_dir - (0, 4 * pixel)
                 
-                # Draw thick eyebrow line
-                pygame.draw.line(screen, self.color, brow_start, brow_end, brow_thickness)
+                    # Draw thick eyebrow line
+                    pygame.draw.line(screen, self.color, brow_start, brow_end, brow_thickness)
                 
-                # Draw eyelid (curved line above eye)
-                eyelid_points = []
-                for i in range(5):
-                    t = i / 4  # 0 to 1
-                    lid_angle = brow_angle - math.pi/8 * math.sin(t * math.pi)  # Curved angle
-                    lid_point = np.array([
-                        eye_pos[0] + math.cos(lid_angle) * 8 * (t - 0.5),
-                        eye_pos[1] + math.sin(lid_angle) * 8 * (t - 0.5) - 2
-                    ])
-                    eyelid_points.append(lid_point)
-                
-                # Draw eyelid
-                if len(eyelid_points) >= 2:
-                    pygame.draw.lines(screen, self.color, False, eyelid_points, 2)
+                    # Draw eyelid (curved line above eye) from the precomputed curve
+                    lid_angles = brow_angle - EYELID_BEND
+                    eyelid_points = np.empty((len(EYELID_OFFSET), 2))
+                    eyelid_points[:, 0] = eye_pos[0] + np.cos(lid_angles) * EYELID_OFFSET * pixel
+                    eyelid_points[:, 1] = eye_pos[1] + (np.sin(lid_angles) * EYELID_OFFSET - 2) * pixel
+                    pygame.draw.lines(screen, self.color, False, eyelid_points, max(1, round(2 * pixel)))
                 
             except Exception as e:
-                print(f"Error drawing eyes: {e}")
+                errors.report("Player.draw eyes", e)
             
             # 6. Draw heart
             try:
-                heart_pos = (int(np.clip(self.pos[0], 24, WINDOW_WIDTH-24)), 
-                           int(np.clip(self.pos[1], 24, WINDOW_HEIGHT-24)))
-                self.draw_heart(screen, heart_pos, 28)  # Slightly larger heart
+                heart_pos = (int(np.clip(screen_pos[0], 24, WINDOW_WIDTH-24)), 
+                           int(np.clip(screen_pos[1], 24, WINDOW_HEIGHT-24)))
+                if tier == LOD_MINIMAL:
+                    pygame.draw.circle(screen, (200, 0, 0), heart_pos, 28 // 3 * pixel)
+                else:
+                    self.draw_heart(screen, heart_pos, round(28 * pixel), layers=3 if tier == LOD_FULL else 1)  # Slightly larger heart
             except Exception as e:
-                print(f"Error drawing heart: {e}")
+                errors.report("Player.draw heart", e)
                 
         except Exception as e:
-            print(f"Error in draw: {e}")
+            errors.report("Player.draw", e)
             # Draw a simple rectangle as fallback
             try:
-                pygame.draw.rect(screen, self.color, (int(self.pos[0]-10), int(self.pos[1]-10), 20, 20))
+                pygame.draw.rect(screen, self.color, (int(screen_pos[0]-10), int(screen_pos[1]-10), 20, 20))
             except:
                 pass
 
@@ -537,9 +708,11 @@ class Button:
         self.color = color
         self.hover_color = hover_color
         self.is_hovered = False
+        self.drawn_hovered = None  # Hover state currently on screen
         self.font = pygame.font.Font(None, 36)
         
     def draw(self, screen):
+        self.drawn_hovered = self.is_hovered
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(screen, color, self.rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, self.rect, 3, border_radius=10)
@@ -566,23 +739,108 @@ class Level:
         self.obstacle_size_range = obstacle_size_range  # (min_size, max_size)
         self.background_color = background_color
         self.obstacle_color = obstacle_color
-        self.obstacles = []
+        self.obstacle_palette = [obstacle_color]  # Indexed by the obstacle records' color field
+        self.obstacles = ObstacleStore()
+        self.width = WINDOW_WIDTH
+        self.height = WINDOW_HEIGHT
+        self.arena = None  # Memory-mapped ArenaFile for custom maps
+        self.endless = None  # EndlessArena streaming chunks for endless mode
+        self.layout_check = None  # (problems found, obstacles dropped, seconds) for the last generated layout
+    
+    @classmethod
+    def from_arena(cls, path):
+        # Custom map: only the header is read here, obstacles are paged in during play
+        arena = ArenaFile(path)
+        level = cls(arena.name, arena.description, arena.obstacle_count, (0, 0),
+                    arena.background_color, arena.obstacle_color)
+        level.width, level.height = arena.size
+        level.arena = arena
+        return level
+    
+    @classmethod
+    def endless_mode(cls, name, description, obstacle_count, obstacle_size_range, background_color,
+                     obstacle_color, seed=None):
+        # Endless world with the density of obstacle_count obstacles per standard arena
+        level = cls(name, description, obstacle_count, obstacle_size_range, background_color, obstacle_color)
+        level.width = level.height = None
+        density = obstacle_count / (WINDOW_WIDTH * WINDOW_HEIGHT)
+        seed = random.randrange(2**32) if seed is None else seed
+        level.endless = EndlessArena(seed, density, obstacle_size_range, [(0, 0), (WINDOW_WIDTH/2, 0)])
+        return level
+    
+    @property
+    def world_size(self):
+        if self.width is None:
+            return None
+        return (self.width, self.height)
+    
+    def spawn_points(self, count=2):
+        if self.endless is not None:
+            points = [tuple(point) for point in self.endless.spawn_points]
+        elif self.arena is not None:
+            points = list(self.arena.spawn_points)
+        else:
+            points = [(self.width/4, self.height/2), (3*self.width/4, self.height/2)]
+        if count == 2:
+            return points
+        # Free-for-all: an even grid over the middle of the arena (a window's worth
+        # of sea around the regular spawn points when the world has no walls)
+        centre = np.mean(points, axis=0)
+        width, height = self.world_size or (WINDOW_WIDTH, WINDOW_HEIGHT)
+        columns = math.ceil(math.sqrt(count * width / height))
+        rows = math.ceil(count / columns)
+        return [(centre[0] + ((i % columns + 0.5) / columns - 0.5) * width * 0.8,
+                 centre[1] + ((i // columns + 0.5) / rows - 0.5) * height * 0.8) for i in range(count)]
+    
+    def obstacles_near(self, boxes):
+        # Obstacles touching any of the (left, top, right, bottom) boxes
+        if self.arena is not None:
+            self.obstacles = self.arena.gather(boxes)
+        elif self.endless is not None:
+            self.obstacles = self.endless.gather(boxes)
+        return self.obstacles
         
-    def generate_obstacles(self, spawn_points):
-        self.obstacles = []
-        max_attempts = 200
+    def generate_obstacles(self, spawn_points, rng=random):
+        # Returns a new layout without putting it in play (the match in progress keeps
+        # self.obstacles until the caller hands the new one over). rng is the random
+        # stream to draw the layout from: a worker thread gets its own random.Random,
+        # as the match keeps drawing from the random module meanwhile.
+        # Arena files have a fixed layout that is paged in by obstacles_near
+        if self.arena is not None:
+            return self.obstacles
         
-        while len(self.obstacles) < self.obstacle_count and max_attempts > 0:
-            x = random.randint(400, WINDOW_WIDTH-400)
-            y = random.randint(400, WINDOW_HEIGHT-400)
-            width = random.randint(self.obstacle_size_range[0], self.obstacle_size_range[1])
-            height = random.randint(self.obstacle_size_range[0], self.obstacle_size_range[1])
-            
-            if is_position_clear(x, y, self.obstacles, spawn_points):
-                self.obstacles.append(Obstacle(x, y, width, height))
-            max_attempts -= 1
+        # Endless worlds build the chunks around the spawn points up front, the rest streams in
+        if self.endless is not None:
+            boxes = [(x - SCREEN_WIDTH, y - SCREEN_HEIGHT, x + SCREEN_WIDTH, y + SCREEN_HEIGHT)
+                     for x, y in spawn_points]
+            self.endless.request(boxes, blocking=True)
+            return self.endless.gather(boxes)
         
-        return self.obstacles
+        # Build into a fresh store (may run on a worker thread while a match is on).
+        # Obstacles are only kept clear of the spawn points, not of each other, so a
+        # layout that seals off sea or leaves choke points is repaired by dropping
+        # obstacles, or generated again when it is beyond repair.
+        for _ in range(ARENA_ATTEMPTS):
+            obstacles = ObstacleStore(self.obstacle_count)
+            max_attempts = 200
+            
+            while len(obstacles) < self.obstacle_count and max_attempts > 0:
+                x = rng.randint(400, self.width-400)
+                y = rng.randint(400, self.height-400)
+                width = rng.randint(self.obstacle_size_range[0], self.obstacle_size_range[1])
+                height = rng.randint(self.obstacle_size_range[0], self.obstacle_size_range[1])
+                
+                if is_position_clear(x, y, obstacles, spawn_points):
+                    obstacles.add_rect(x, y, width, height)
+                max_attempts -= 1
+            
+            start = time.perf_counter()
+            obstacles, found, dropped, left = repair_arena(obstacles, self.world_size, spawn_points,
+                                                           Player.width * 0.6, Player.length / 2)
+            self.layout_check = (found, dropped, time.perf_counter() - start)
+            if not left:
+                break
+        return obstacles
 
 # Define levels
 levels = [
@@ -593,10 +851,20 @@ levels = [
     Level("Deep Sea", "Dark waters hide many obstacles...", 35, (60, 200), 
           DARK_BLUE, (40, 40, 60)),
     Level("Coral Reef", "Navigate through the colorful coral!", 30, (40, 160), 
-          (100, 200, 255), (255, 150, 150))
+          (100, 200, 255), (255, 150, 150)),
+    Level.endless_mode("Endless Ocean", "No walls - the sea goes on forever...", 25, (60, 180),
+                       (30, 90, 150), (20, 50, 80))
 ]
 
-def draw_home_screen(screen, buttons):
+def draw_home_screen(screen, buttons, updates=None):
+    # Once the menu is on screen only buttons whose hover highlight changed are redrawn
+    if updates is not None and not updates.full:
+        for button in buttons:
+            if button.drawn_hovered != button.is_hovered:
+                button.draw(screen)
+                updates.mark(button.rect)
+        return
+    
     # Draw background
     screen.fill(DARK_BLUE)
     
@@ -623,34 +891,241 @@ def draw_home_screen(screen, buttons):
         desc_rect = desc_text.get_rect(center=(SCREEN_WIDTH/2, 280 + i * 100 + 30))
         screen.blit(desc_text, desc_rect)
 
-def run_game(level):
-    # Create camera
-    camera = Camera()
+def create_level_buttons():
+    # One button per level, stacked under the title
+    level_buttons = []
+    for i, level in enumerate(levels):
+        button = Button(
+            SCREEN_WIDTH/2 - 150,  # x
+            250 + i * 100,         # y
+            300,                   # width
+            50,                    # height
+            level.name,           # text
+            BLUE,                 # color
+            (0, 150, 255)         # hover color
+        )
+        level_buttons.append(button)
+    return level_buttons
+
+def player_color(index):
+    # Blue and pink for the keyboard players, evenly spread hues for the rest
+    if index < 2:
+        return (BLUE, PINK)[index]
+    color = pygame.Color(0)
+    color.hsva = ((index * 137.5) % 360, 80, 95, 100)
+    return (color.r, color.g, color.b)
+
+def create_players(spawn_points):
+    # Player 1 (A/D) and player 2 (arrows) take the first two spawn points;
+    # free-for-all narwhals beyond them have no controls and face the centre
+    players = []
+    centre = np.mean(spawn_points, axis=0)
+    for index, (x, y) in enumerate(spawn_points):
+        controls = ([pygame.K_a, pygame.K_d], [pygame.K_LEFT, pygame.K_RIGHT])[index] if index < 2 else None
+        player = Player(x, y, player_color(index), controls)
+        if len(spawn_points) > 2:
+            player.angle = math.degrees(math.atan2(centre[1] - y, centre[0] - x))
+        players.append(player)
+    return players
+
+def round_winner(players):
+    living = [player for player in players if player.health > 0]
+    return f"Player {players.index(living[0]) + 1} Wins!" if living else "Draw!"
+
+def draw_health(screen, players):
+    # Two players get the classic corner pips, larger matches a compact grid.
+    # Returns the area drawn over.
+    pips = []
+    if len(players) == 2:
+        for player, left in zip(players, (50, screen.get_width() - 150)):
+            for i in range(player.max_health):
+                color = player.color if i < player.health else (100, 100, 100)
+                pips.append(pygame.draw.circle(screen, color, (left + i * 40, 50), 15))
+        return pips[0].unionall(pips[1:])
+    column_width = 12 * players[0].max_health + 14
+    columns = max(1, (screen.get_width() - 40) // column_width)
+    for index, player in enumerate(players):
+        left = 20 + (index % columns) * column_width
+        top = 20 + (index // columns) * 20
+        for i in range(player.max_health):
+            color = player.color if i < player.health else (100, 100, 100)
+            pips.append(pygame.draw.circle(screen, color, (left + i * 12 + 5, top), 5))
+    return pips[0].unionall(pips[1:])
+
+def pregenerate_arena(level, spawn_points, bot=None):
+    # Build the next arena on a worker thread so the end screen keeps running,
+    # along with the computer player's navigation grid for it. Returns a Future of
+    # the obstacles; the level keeps the current ones until the rematch starts.
+    # The layout comes from a stream seeded here, on the game thread, so it does
+    # not depend on how the worker's draws interleave with the match's.
+    arena = Future()
+    rng = random.Random(random.getrandbits(64))
+    def generate():
+        try:
+            obstacles = level.generate_obstacles(spawn_points, rng)
+            if bot is not None and level.arena is None:
+                bot_nav_grid(bot.player, obstacles, level.world_size)
+        except Exception as e:
+            arena.set_exception(e)
+        else:
+            arena.set_result(obstacles)
+    threading.Thread(target=generate, daemon=True).start()
+    return arena
+
+def sweep_and_prune(players, margin=0.0):
+    # Broadphase for body collisions: sort the players' x intervals, sweep once and
+    # keep pairs whose intervals overlap on both axes. Returns each player's
+    # candidate neighbours (indices in player order). margin widens every interval
+    # so pairs that only meet later in the tick are still reported.
+    radii = [player.width * 0.6 + margin for player in players]
+    order = sorted(range(len(players)), key=lambda i: players[i].pos[0] - radii[i])
+    neighbours = [[] for _ in players]
+    active = []
+    for i in order:
+        x, y = players[i].pos
+        left = x - radii[i]
+        active = [j for j in active if players[j].pos[0] + radii[j] >= left]
+        for j in active:
+            if abs(players[j].pos[1] - y) <= radii[i] + radii[j]:
+                neighbours[i].append(j)
+                neighbours[j].append(i)
+        active.append(i)
+    for candidates in neighbours:
+        candidates.sort()
+    return neighbours
+
+HORN_HIT_RADIUS = 15  # Horn tip to heart distance that counts as a hit
+HORN_KNOCKBACK = 45
+
+def find_horn_hits(players):
+    # Hearts are hashed into a grid of HORN_HIT_RADIUS cells; each horn tip only
+    # checks the 3x3 cells around it. Returns (attacker, victim) pairs in order.
+    cells = {}
+    for index, player in enumerate(players):
+        key = (int(player.pos[0] // HORN_HIT_RADIUS), int(player.pos[1] // HORN_HIT_RADIUS))
+        cells.setdefault(key, []).append(index)
+    hits = []
+    for attacker_index, attacker in enumerate(players):
+        tip = attacker.get_horn_tip()
+        cell_x, cell_y = int(tip[0] // HORN_HIT_RADIUS), int(tip[1] // HORN_HIT_RADIUS)
+        victims = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                victims.extend(cells.get((cell_x + dx, cell_y + dy), ()))
+        for victim_index in sorted(victims):
+            victim = players[victim_index]
+            if victim_index != attacker_index and math.dist(tip, victim.pos) < HORN_HIT_RADIUS:
+                hits.append((attacker, victim))
+    return hits
+
+def step_players(players, obstacles, world_size, check_hits=True, particles=None, telemetry=None):
+    # One simulation tick for any number of narwhals. Living players collide with
+    # each other through the sweep-and-prune broadphase; defeated ones drift.
+    # Effects are emitted into particles and events logged to telemetry when given.
+    living = [player for player in players if player.health > 0]
+    top_speed = max((fast_math.length(player.vel[0], player.vel[1]) for player in living), default=0.0)
+    margin = 2 * (top_speed + max(player.thrust for player in living)) if living else 0.0
+    neighbours = sweep_and_prune(living, margin)
+    for player, candidates in zip(living, neighbours):
+        player.move(obstacles, [living[j] for j in candidates], world_size, particles, telemetry)
+    for player in players:
+        if player.health <= 0:
+            player.move(obstacles, (), world_size, particles, telemetry)
+    
+    hits = find_horn_hits(living) if check_hits else []
+    for attacker, victim in hits:
+        victim.health -= 1
+        direction = victim.pos - attacker.pos
+        direction = direction / np.linalg.norm(direction)
+        attacker.vel -= direction * HORN_KNOCKBACK
+        victim.vel += direction * HORN_KNOCKBACK
+        if particles is not None:
+            particles.emit(victim.pos[0], victim.pos[1], HIT_SPARKS, PARTICLE_SPARK, speed=6.0)
+        if telemetry is not None:
+            telemetry.event(EVENT_HIT, attacker, victim, victim.pos[0], victim.pos[1], victim.health)
+    return hits
+
+def nearby_boxes(camera, players, margin=PADDING):
+    # Areas whose obstacles must be resident: the view and a margin around each player
+    boxes = [camera.world_bounds()]
+    for player in players:
+        reach = player.length + margin
+        boxes.append((player.pos[0] - reach, player.pos[1] - reach,
+                      player.pos[0] + reach, player.pos[1] + reach))
+    return boxes
+
+def run_game(level, player_count=2, render_target=None, updates=None, governor=None, telemetry=None,
+             auto_replay=False, bot_budget=None):
+    world_size = level.world_size
     
-    # Create spawn points list
-    spawn_points = []
+    # The world is drawn at the render scale, the HUD at full window resolution
+    if render_target is None:
+        render_target = RenderTarget(screen)
     
-    # Create players with safe spawning
-    player1_x = WINDOW_WIDTH/4
-    player1_y = WINDOW_HEIGHT/2
-    spawn_points.append((player1_x, player1_y))
+    # While the camera holds still only the regions that changed are pushed to the display
+    if updates is None:
+        updates = ScreenUpdates(screen)
+    updates.mark_all()
+    last_view = None
+    last_obstacle_rects = None
+    last_healths = None
+    
+    # Create camera
+    camera = Camera(world_size)
     
-    player2_x = 3*WINDOW_WIDTH/4
-    player2_y = WINDOW_HEIGHT/2
-    spawn_points.append((player2_x, player2_y))
+    # Create players with safe spawning
+    spawn_points = level.spawn_points(player_count)
     
     # Generate obstacles for the selected level
     obstacles = level.generate_obstacles(spawn_points)
+    level.obstacles = obstacles
     
     # Create players
-    player1 = Player(player1_x, player1_y, BLUE, [pygame.K_a, pygame.K_d])
-    player2 = Player(player2_x, player2_y, PINK, [pygame.K_LEFT, pygame.K_RIGHT])
+    players = create_players(spawn_points)
+    if telemetry is not None:
+        telemetry.start_match(players, world_size, obstacles)
+    
+    # Single player: the computer steers player 2 within bot_budget microseconds a tick
+    # (arena files page their obstacles in, so they have no whole layout to navigate)
+    bot = None
+    if bot_budget is not None:
+        players[1].controls = None
+        bot = BotController(players[1], step_players, bot_budget)
+        if level.arena is None:
+            bot.prepare(obstacles, world_size)
+    
+    # Bubbles, sparks and debris
+    particles = ParticlePool()
+    if governor is not None:
+        governor.track(particles)
+    
+    # The last few seconds for instant replays (F5, or after every horn hit with auto_replay)
+    replay = InstantReplay(players, camera, fps=FPS)
+    replay_requested = False
+    replay_due = None  # Ticks until the automatic replay of a hit
+    resume_state = None
+    replay_started = 0
+    
+    # Round state: "playing" -> "round_over" -> menu or rematch; "replay" pauses either
+    game_state = "playing"
+    winner = None
+    round_over_time = 0
+    next_arena = None
+    font = pygame.font.Font(None, 74)
+    font_small = pygame.font.Font(None, 36)
+    font_debug = pygame.font.Font(None, 24)
+    show_lod = False  # F3 profiling overlay: frame and AI times, each narwhal's level-of-detail tier
+    notice = None       # (text, ticks when it goes) for quicksave and quickload
+    notice_rect = None  # Where the notice was last drawn
+    last_frame_time = 0.0
     
     # Game loop
     running = True
     clock = pygame.time.Clock()
     
     while running:
+        frame_start = time.perf_counter()
+        
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -658,123 +1133,299 @@ def run_game(level):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     return True  # Return to menu
+                if event.key == pygame.K_F3:
+                    show_lod = not show_lod
+                if event.key == pygame.K_F5:
+                    if game_state == "replay":
+                        replay.stop()
+                    else:
+                        replay_requested = True
+                if event.key == pygame.K_F6:
+                    # Quicksave (during a replay, the paused match underneath). On the end
+                    # screen the rematch arena is already drawn from the random stream, so
+                    # it is saved along with it.
+                    saved_state = resume_state if game_state == "replay" else game_state
+                    on_end_screen = saved_state == "round_over"
+                    state = save_match(level, obstacles, players, camera, saved_state,
+                                       ROUND_OVER_DURATION - (pygame.time.get_ticks() - round_over_time)
+                                       if on_end_screen else 0,
+                                       next_arena.result() if on_end_screen else None)
+                    try:
+                        with open(QUICKSAVE_PATH, "wb") as save_file:
+                            save_file.write(state)
+                    except OSError as e:
+                        errors.report("quicksave", e)
+                        notice = ("Quicksave failed", pygame.time.get_ticks() + NOTICE_DURATION)
+                    else:
+                        notice = ("Saved", pygame.time.get_ticks() + NOTICE_DURATION)
+                if event.key == pygame.K_F9:
+                    # Quickload: the match carries on exactly as it did after the save
+                    try:
+                        with open(QUICKSAVE_PATH, "rb") as save_file:
+                            state = save_file.read()
+                        obstacles, game_state, round_left, next_obstacles = restore_match(state, level, players,
+                                                                                          camera)
+                    except (OSError, ValueError) as e:
+                        errors.report("quickload", e)
+                        notice = ("Quickload failed", pygame.time.get_ticks() + NOTICE_DURATION)
+                    else:
+                        notice = ("Loaded", pygame.time.get_ticks() + NOTICE_DURATION)
+                        if telemetry is not None:
+                            telemetry.start_match(players, world_size, obstacles)
+                        if bot is not None:
+                            bot.search = bot.plan = None  # Both were worked out for the match before the load
+                            if level.arena is None:
+                                bot.prepare(obstacles, world_size)
+                        particles.clear()
+                        replay.clear()
+                        replay_due = None
+                        winner = None
+                        if game_state == "round_over":
+                            winner = round_winner(players)
+                            round_over_time = pygame.time.get_ticks() - (ROUND_OVER_DURATION - round_left)
+                            if next_obstacles is None:
+                                next_arena = pregenerate_arena(level, spawn_points, bot)
+                            else:
+                                next_arena = Future()
+                                next_arena.set_result(next_obstacles)  # The rematch it was going to be
+                if game_state == "replay" and event.key in (pygame.K_UP, pygame.K_DOWN):
+                    replay.change_speed(2 if event.key == pygame.K_UP else 0.5)
+                if game_state == "round_over" and event.key == pygame.K_r:
+                    # Rematch on the arena generated during the countdown
+                    obstacles = next_arena.result()
+                    level.obstacles = obstacles
+                    players = create_players(spawn_points)
+                    if telemetry is not None:
+                        telemetry.start_match(players, world_size, obstacles)
+                    if bot is not None:
+                        players[1].controls = None
+                        bot = BotController(players[1], step_players, bot_budget)
+                        if level.arena is None:
+                            bot.prepare(obstacles, world_size)
+                    particles.clear()
+                    camera = Camera(world_size)
+                    replay.clear()
+                    replay_due = None
+                    game_state = "playing"
+                    winner = None
         
-        # Update
-        player1.move(obstacles, player2)
-        player2.move(obstacles, player1)
-        
-        # Update camera
-        camera.update(player1.pos, player2.pos)
+        # Instant replay: the round is paused while the last seconds play back
+        if replay_requested and game_state != "replay" and replay.start():
+            resume_state, game_state = game_state, "replay"
+            replay_started = pygame.time.get_ticks()
+            replay_due = None
+        replay_requested = False
+        if game_state == "replay" and not (replay.playing and replay.advance()):
+            game_state = resume_state
+            round_over_time += pygame.time.get_ticks() - replay_started  # The countdown waited
         
-        # Collision detection
-        p1_tip = player1.get_horn_tip()
-        p2_tip = player2.get_horn_tip()
+        # Leave the end screen once the countdown runs out
+        if game_state == "round_over":
+            remaining = ROUND_OVER_DURATION - (pygame.time.get_ticks() - round_over_time)
+            if remaining <= 0:
+                return True  # Return to menu
         
-        # Check if player1's horn hits player2's heart
-        if math.dist(p1_tip, player2.pos) < 15:
-            player2.health -= 1
-            direction = player2.pos - player1.pos
-            direction = direction / np.linalg.norm(direction)
-            player1.vel -= direction * 45
-            player2.vel += direction * 45
+        if game_state != "replay":
+            # Page in the obstacles around the view and the players (arena files only)
+            obstacles = level.obstacles_near(nearby_boxes(camera, players))
+            
+            # Update (horn hits only count while the round is on)
+            if bot is not None:
+                bot.update(players, obstacles, world_size)
+            hits = step_players(players, obstacles, world_size, check_hits=game_state == "playing",
+                                particles=particles, telemetry=telemetry)
+            particles.update()
+            if telemetry is not None:
+                telemetry.record_tick(players)
             
-        # Check if player2's horn hits player1's heart
-        if math.dist(p2_tip, player1.pos) < 15:
-            player1.health -= 1
-            direction = player1.pos - player2.pos
-            direction = direction / np.linalg.norm(direction)
-            player2.vel -= direction * 45
-            player1.vel += direction * 45
-        
-        # Draw
-        screen.fill(level.background_color)
-        
-        # Draw obstacles with camera transform
-        for obstacle in obstacles:
-            screen_rect = camera.apply_rect(obstacle.rect)
-            pygame.draw.rect(screen, level.obstacle_color, screen_rect)
+            # Update camera to frame every living player
+            living = [player for player in players if player.health > 0]
+            camera.update([player.pos for player in living or players])
+            replay.record(players, camera)
+            
+            # Show each hit again once the knockback has played out
+            if auto_replay and hits and replay_due is None:
+                replay_due = REPLAY_HIT_DELAY
+            elif replay_due is not None:
+                replay_due -= 1
+                replay_requested = replay_due <= 0
+            
+            # Check win condition: last narwhal swimming
+            if game_state == "playing" and len(living) <= 1:
+                winner = round_winner(players)
+                game_state = "round_over"
+                round_over_time = pygame.time.get_ticks()
+                remaining = ROUND_OVER_DURATION
+                next_arena = pregenerate_arena(level, spawn_points, bot)
+        
+        # Draw the world onto the render surface (during a replay, its stand-ins and camera)
+        canvas = render_target.surface
+        camera.render_scale = render_target.scale
+        view_players, view_camera = players, camera
+        if game_state == "replay":
+            view_players, view_camera = replay.show(camera)
+            obstacles = level.obstacles_near(nearby_boxes(view_camera, view_players))
+        canvas.fill(level.background_color)
+        
+        # Draw visible obstacles with camera transform
+        visible = obstacles.in_box(*view_camera.world_bounds())
+        colors = obstacles.records['color'][visible]
+        obstacle_rects = view_camera.apply_rects(obstacles.rects(visible))
+        for screen_rect, color in zip(obstacle_rects, colors):
+            pygame.draw.rect(canvas, level.obstacle_palette[color], screen_rect)
+        
+        # A moving camera (or newly paged-in obstacles, or a replay) changes the whole frame
+        view = (view_camera.x, view_camera.y, view_camera.scale)
+        still = (view == last_view and not show_lod and game_state != "replay"
+                 and np.array_equal(obstacle_rects, last_obstacle_rects))
+        if not still:
+            updates.mark_all()
+        last_view, last_obstacle_rects = view, obstacle_rects
+        
+        # Draw particles under the narwhals (they are not recorded, so replays go without)
+        if game_state != "replay":
+            particles.draw(canvas, camera)
+            if still and particles.drawn_rect is not None:
+                updates.mark(render_target.to_window(particles.drawn_rect))
         
         # Draw players with camera transform
-        for player in [player1, player2]:
-            orig_pos = player.pos.copy()
-            player.pos = camera.apply(player.pos)
-            orig_length = player.length
-            orig_width = player.width
-            orig_horn_length = player.horn_length
-            orig_horn_width = player.horn_width
-            player.length *= camera.zoom
-            player.width *= camera.zoom
-            player.horn_length *= camera.zoom
-            player.horn_width *= camera.zoom
-            player.draw(screen)
-            player.pos = orig_pos
-            player.length = orig_length
-            player.width = orig_width
-            player.horn_length = orig_horn_length
-            player.horn_width = orig_horn_width
+        tiers = []
+        for player, outline in zip(view_players, player_outlines(view_players, view_camera)):
+            tiers.append(lod_tier(player.length * view_camera.zoom))
+            player.draw(canvas, view_camera, outline, tiers[-1])
+            if still:
+                updates.mark(render_target.to_window(player.screen_rect(outline, view_camera)))
+        
+        # Scale the world up to the window
+        render_target.present()
+        
+        # Profiling overlay: frame and AI decision times, and each narwhal's level-of-detail tier
+        if show_lod:
+            timings = [(f"frame {last_frame_time * 1e3:.1f} ms", WHITE)]
+            if bot is not None:
+                search = f", searching {bot.search_ticks}/{BOT_HORIZON}" if bot.search is not None else ""
+                timings.append((f"AI {bot.decision_time * 1e6:.0f}/{bot.budget_us} us, {bot.mode}{search}",
+                                RED if bot.decision_time * 1e6 > bot.budget_us else WHITE))
+            for row, (text, color) in enumerate(timings):
+                screen.blit(font_debug.render(text, True, color), (20, screen.get_height() - 30 - 20 * row))
+            for player, tier in zip(view_players, tiers):
+                label = font_debug.render(f"LOD {tier} {LOD_NAMES[tier]} ({player.length * view_camera.zoom:.0f}px)",
+                                          True, (GREEN, (230, 200, 0), RED)[tier])
+                anchor = view_camera.apply(player.pos - (0, player.length * 0.4)) / view_camera.render_scale
+                screen.blit(label, label.get_rect(midbottom=anchor))
         
         # Draw health bars (fixed to screen)
-        for i in range(player1.max_health):
-            x = 50 + i * 40
-            color = BLUE if i < player1.health else (100, 100, 100)
-            pygame.draw.circle(screen, color, (x, 50), 15)
-        
-        for i in range(player2.max_health):
-            x = SCREEN_WIDTH - 150 + i * 40
-            color = PINK if i < player2.health else (100, 100, 100)
-            pygame.draw.circle(screen, color, (x, 50), 15)
-        
-        # Check win condition
-        if player1.health <= 0 or player2.health <= 0:
-            winner = "Player 2" if player1.health <= 0 else "Player 1"
-            font = pygame.font.Font(None, 74)
-            text = font.render(f"{winner} Wins!", True, WHITE)
-            screen.blit(text, (SCREEN_WIDTH/2 - 100, SCREEN_HEIGHT/2))
-            pygame.display.flip()
-            pygame.time.wait(2000)
-            return True  # Return to menu
-        
-        pygame.display.flip()
+        health_rect = draw_health(screen, view_players)
+        healths = [player.health for player in view_players]
+        if healths != last_healths:
+            updates.mark(health_rect)
+            last_healths = healths
+        
+        # Draw the end screen while the countdown runs
+        if game_state == "round_over":
+            text = font.render(winner, True, WHITE)
+            updates.mark(screen.blit(text, text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2))))
+            seconds_left = math.ceil(remaining / 1000)
+            hint_text = font_small.render(f"Press R for a rematch - back to menu in {seconds_left}", True, WHITE)
+            updates.mark(screen.blit(hint_text, hint_text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2 + 60))))
+        elif game_state == "replay":
+            replay_text = font_small.render(f"REPLAY x{replay.speed:g} - Up/Down for speed, F5 to skip", True, WHITE)
+            screen.blit(replay_text, replay_text.get_rect(center=(SCREEN_WIDTH/2, 110)))
+        
+        # Quicksave and quickload notices (where one was drawn is marked once more when it goes)
+        if notice is not None:
+            if pygame.time.get_ticks() < notice[1]:
+                notice_text = font_small.render(notice[0], True, WHITE)
+                notice_rect = screen.blit(notice_text, notice_text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT - 60)))
+            else:
+                notice = None
+            updates.mark(notice_rect)
+        
+        updates.present()
+        frame_time = time.perf_counter() - frame_start
+        last_frame_time = frame_time
+        render_target.frame_done(frame_time)
+        if governor is not None:
+            governor.frame_done(frame_time)
+        errors.tick()
         clock.tick(FPS)
     
     return False
 
-# Game setup
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Narwhal Battle")
-
-# Create level selection buttons
-level_buttons = []
-for i, level in enumerate(levels):
-    button = Button(
-        SCREEN_WIDTH/2 - 150,  # x
-        250 + i * 100,         # y
-        300,                   # width
-        50,                    # height
-        level.name,           # text
-        BLUE,                 # color
-        (0, 150, 255)         # hover color
-    )
-    level_buttons.append(button)
-
-# Main menu loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        
-        # Handle button events
-        for i, button in enumerate(level_buttons):
-            if button.handle_event(event):
-                # Run the game with selected level
-                return_to_menu = run_game(levels[i])
-                if not return_to_menu:
-                    running = False
-                break
+if __name__ == "__main__":
+    # Game setup
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Narwhal Battle")
+
+    parser = argparse.ArgumentParser(description="Starwhals")
+    parser.add_argument("arenas", nargs="*", help="Arena files to add to the level menu")
+    parser.add_argument("--players", type=int, default=2,
+                        help=f"Narwhals per match (2-{MAX_PLAYERS}); more than 2 is a free-for-all")
+    parser.add_argument("--lod-thresholds", type=float, nargs=2, metavar=("FULL", "REDUCED"), default=LOD_THRESHOLDS,
+                        help="Minimum on-screen narwhal length in pixels for full and reduced detail")
+    parser.add_argument("--render-scale", default="1.0",
+                        help="Fraction of the window resolution to draw the world at (0.5-1.0), "
+                             "or 'auto' to lower it while frames miss the FPS target")
+    parser.add_argument("--smooth-upscale", action="store_true",
+                        help="Filter the upscaled frame instead of using nearest-neighbour pixels")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="Log every tick of every match to a compressed telemetry file in DIR")
+    parser.add_argument("--telemetry-codec", choices=("zlib", "lzma"), default="zlib",
+                        help="Compression for telemetry files")
+    parser.add_argument("--auto-replay", action="store_true",
+                        help="Replay the last seconds in slow motion after every horn hit (F5 replays any time)")
+    parser.add_argument("--adaptive-quality", action="store_true",
+                        help="Lower narwhal detail, particles and render scale while frames miss the FPS target "
+                             "(changes are printed)")
+    parser.add_argument("--bot", action="store_true", help="Single player: the computer steers player 2")
+    parser.add_argument("--bot-budget", type=int, default=BOT_BUDGET_US, metavar="US",
+                        help="Microseconds the computer player may think per tick")
+    args = parser.parse_args()
+    if not 2 <= args.players <= MAX_PLAYERS:
+        parser.error(f"--players must be between 2 and {MAX_PLAYERS}")
+    LOD_THRESHOLDS[:] = args.lod_thresholds
+    auto_scale = args.render_scale == "auto"
+    if auto_scale and args.adaptive_quality:
+        parser.error("--adaptive-quality already manages the render scale")
+    render_target = RenderTarget(screen, 1.0 if auto_scale else float(args.render_scale), auto_scale,
+                                 args.smooth_upscale, FPS)
+    governor = QualityGovernor(FPS, render_target, LOD_THRESHOLDS) if args.adaptive_quality else None
+    updates = ScreenUpdates(screen)
+    
+    # Custom arena files given on the command line get their own buttons
+    for path in args.arenas:
+        levels.append(Level.from_arena(path))
     
-    # Draw home screen
-    draw_home_screen(screen, level_buttons)
-    pygame.display.flip()
+    # Create level selection buttons
+    level_buttons = create_level_buttons()
+
+    # Main menu loop
+    running = True
+    clock = pygame.time.Clock()
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        
+            # Handle button events
+            for i, button in enumerate(level_buttons):
+                if button.handle_event(event):
+                    # Run the game with selected level
+                    telemetry = (TelemetrySink(match_path(args.telemetry, levels[i].name), args.telemetry_codec)
+                                 if args.telemetry else None)
+                    return_to_menu = run_game(levels[i], args.players, render_target, updates, governor, telemetry,
+                                              args.auto_replay, args.bot_budget if args.bot else None)
+                    if telemetry is not None:
+                        telemetry.close()
+                    if not return_to_menu:
+                        running = False
+                    updates.mark_all()  # The game drew over the menu
+                    break
+    
+        # Draw home screen
+        draw_home_screen(screen, level_buttons, updates)
+        updates.present()
+        clock.tick(FPS)
 
-pygame.quit() 
\ No newline at end of file
+    errors.summarize()
+    pygame.quit() 
\ No newline at end of file
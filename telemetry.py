@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+# Streaming match telemetry
+#
+# The game thread writes every tick's player states, every collision or hit
+# event and the obstacle layout of each match into preallocated NumPy record buffers. Full buffers are handed to a
+# writer thread, which compresses each column separately (zlib or lzma) and
+# appends it as one chunk of the telemetry file. The game thread never
+# allocates or blocks: when the writer falls behind and no spare buffer is
+# free, the full buffer is discarded and counted, and the next chunk written
+# records how many buffers were lost before it.
+#
+# Layout (little-endian):
+#   header   magic, version, codec
+#   chunks   stream id, column count, row count, buffers dropped before it,
+#            then per column: name, dtype, compressed size, compressed bytes
+import lzma
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+TELEMETRY_MAGIC = b"SWTELEM\0"
+TELEMETRY_VERSION = 2  # Version 2 added the layout stream; version 1 files are still read
+TELEMETRY_HEADER = struct.Struct("<8sHB5x")   # magic, version, codec
+CHUNK_HEADER = struct.Struct("<BxHII")        # stream, columns, rows, dropped buffers
+COLUMN_HEADER = struct.Struct("<16s4sI")      # name, dtype, compressed size
+
+CODECS = {
+    "zlib": (0, lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (1, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+# Player state after every tick
+STATE_DTYPE = np.dtype([
+    ('tick', '<u4'), ('player', '<u2'),
+    ('x', '<f4'), ('y', '<f4'), ('vx', '<f4'), ('vy', '<f4'),
+    ('angle', '<f4'), ('health', '<i1'),
+])
+
+# Collisions, hits and match starts (x, y is where it happened)
+EVENT_DTYPE = np.dtype([
+    ('tick', '<u4'), ('kind', '<u1'), ('player', '<u2'), ('other', '<u2'),
+    ('x', '<f4'), ('y', '<f4'), ('strength', '<f4'),
+])
+EVENT_MATCH_START = 0  # player = number of players, x, y = world size (0, 0 when endless)
+EVENT_OBSTACLE = 1     # strength = speed into the obstacle
+EVENT_BODY = 2         # Narwhal against narwhal; strength = impulse
+EVENT_HIT = 3          # Horn hit: player = attacker, other = victim, strength = victim's health left
+EVENT_NAMES = ("match start", "obstacle", "body", "hit")
+NO_PLAYER = 0xFFFF
+
+# Obstacle rectangles at each match start (tick = the match start's tick). Arena
+# files and endless worlds page obstacles in, so only those loaded by then are recorded.
+LAYOUT_DTYPE = np.dtype([
+    ('tick', '<u4'), ('x', '<f4'), ('y', '<f4'), ('w', '<f4'), ('h', '<f4'), ('color', '<u1'),
+])
+
+STREAM_STATE = 0
+STREAM_EVENT = 1
+STREAM_LAYOUT = 2
+STREAMS = ((STREAM_STATE, "state", STATE_DTYPE), (STREAM_EVENT, "event", EVENT_DTYPE),
+           (STREAM_LAYOUT, "layout", LAYOUT_DTYPE))
+
+BUFFER_ROWS = 4096   # Rows per buffer (a minute of two-player states)
+SPARE_BUFFERS = 3    # Buffers per stream that can wait for the writer
+
+def match_path(directory, level_name):
+    # A new file per match, named after the time and the level
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{stamp}-{level_name.lower().replace(' ', '-')}.swt")
+
+class TelemetrySink:
+    def __init__(self, path, codec="zlib", buffer_rows=BUFFER_ROWS, spare_buffers=SPARE_BUFFERS, log=print):
+        self.path = path
+        self.codec = codec
+        self.log = log
+        self.tick = 0
+        self._ids = {}  # id(player) -> index in the match's player list
+        # Per stream: buffer being filled, rows in it, free buffers, buffers dropped since the last chunk
+        self._buffers = {}
+        self._rows = {}
+        self._free = {}
+        self._dropped = {}
+        self.dropped_buffers = 0  # Total over the match
+        for stream, _, dtype in STREAMS:
+            self._buffers[stream] = np.zeros(buffer_rows, dtype=dtype)
+            self._rows[stream] = 0
+            self._free[stream] = queue.SimpleQueue()
+            for _ in range(spare_buffers):
+                self._free[stream].put(np.zeros(buffer_rows, dtype=dtype))
+            self._dropped[stream] = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(TELEMETRY_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, CODECS[codec][0]))
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+
+    # --- Game thread ---
+    def start_match(self, players, world_size=None, obstacles=None):
+        self._ids = {id(player): index for index, player in enumerate(players)}
+        width, height = world_size or (0.0, 0.0)
+        self._event(EVENT_MATCH_START, len(players), NO_PLAYER, width, height, 0.0)
+        if obstacles is not None:
+            records = obstacles.records
+            for x, y, w, h, color in zip(records['x'], records['y'], records['w'], records['h'], records['color']):
+                buffer, row = self._row(STREAM_LAYOUT)
+                buffer[row] = (self.tick, x, y, w, h, color)
+
+    def _row(self, stream):
+        # Next free row of the stream's buffer, handing the buffer over first when full
+        rows = self._rows[stream]
+        buffer = self._buffers[stream]
+        if rows == len(buffer):
+            self._hand_over(stream)
+            rows = 0
+            buffer = self._buffers[stream]
+        self._rows[stream] = rows + 1
+        return buffer, rows
+
+    def _hand_over(self, stream):
+        try:
+            spare = self._free[stream].get_nowait()
+        except queue.Empty:
+            # Writer is behind: lose this buffer rather than stall the frame
+            self._dropped[stream] += 1
+            self.dropped_buffers += 1
+            self._rows[stream] = 0
+            return
+        self._queue.put((stream, self._buffers[stream], self._rows[stream], self._dropped[stream]))
+        self._dropped[stream] = 0
+        self._buffers[stream] = spare
+        self._rows[stream] = 0
+
+    def record_tick(self, players):
+        # States after the tick's simulation; events logged during the tick share its number
+        tick = self.tick
+        for index, player in enumerate(players):
+            buffer, row = self._row(STREAM_STATE)
+            buffer[row] = (tick, index, player.pos[0], player.pos[1], player.vel[0], player.vel[1],
+                           player.angle, player.health)
+        self.tick = tick + 1
+
+    def event(self, kind, player, other, x, y, strength=0.0):
+        # player and other are Player objects (or None)
+        self._event(kind, NO_PLAYER if player is None else self._ids.get(id(player), NO_PLAYER),
+                    NO_PLAYER if other is None else self._ids.get(id(other), NO_PLAYER), x, y, strength)
+
+    def _event(self, kind, player, other, x, y, strength):
+        buffer, row = self._row(STREAM_EVENT)
+        buffer[row] = (self.tick, kind, player, other, x, y, strength)
+
+    def close(self):
+        # Flush the partly filled buffers, wait for the writer and report losses
+        for stream, _, _ in STREAMS:
+            if self._rows[stream] or self._dropped[stream]:
+                self._queue.put((stream, self._buffers[stream], self._rows[stream], self._dropped[stream]))
+                self._rows[stream] = 0
+                self._dropped[stream] = 0
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        ratio = self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+        self.log(f"[telemetry] {self.path}: {self.tick} ticks, {self.bytes_out} bytes "
+                 f"({ratio:.1f}x {self.codec}), {self.dropped_buffers} buffers dropped")
+
+    # --- Writer thread ---
+    def _run_writer(self):
+        compress = CODECS[self.codec][1]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            stream, buffer, rows, dropped = item
+            if dropped:
+                self.log(f"[telemetry] writer fell behind: {dropped} {STREAMS[stream][1]} buffers dropped")
+            names = buffer.dtype.names
+            parts = [CHUNK_HEADER.pack(stream, len(names), rows, dropped)]
+            for name in names:
+                column = np.ascontiguousarray(buffer[name][:rows])
+                data = compress(column.tobytes())
+                self.bytes_in += column.nbytes
+                parts.append(COLUMN_HEADER.pack(name.encode("ascii"), column.dtype.str.encode("ascii"), len(data)))
+                parts.append(data)
+            self._file.write(b"".join(parts))
+            self.bytes_out += sum(len(part) for part in parts)
+            # The buffer can be filled again (the flush at close passes the live one)
+            if rows == len(buffer):
+                self._free[stream].put(buffer)
+
+def read_telemetry(path):
+    # Returns {"state": records, "event": records, "layout": records, "dropped": buffers lost per stream}
+    with open(path, "rb") as telemetry_file:
+        data = telemetry_file.read()
+    magic, version, codec = TELEMETRY_HEADER.unpack_from(data)
+    if magic != TELEMETRY_MAGIC or not 1 <= version <= TELEMETRY_VERSION:
+        raise ValueError(f"{path} is not a version 1-{TELEMETRY_VERSION} telemetry file")
+    decompress = next(entry[2] for entry in CODECS.values() if entry[0] == codec)
+    chunks = {stream: [] for stream, _, _ in STREAMS}
+    dropped = {name: 0 for _, name, _ in STREAMS}
+    offset = TELEMETRY_HEADER.size
+    while offset < len(data):
+        stream, columns, rows, lost = CHUNK_HEADER.unpack_from(data, offset)
+        offset += CHUNK_HEADER.size
+        records = np.zeros(rows, dtype=STREAMS[stream][2])
+        for _ in range(columns):
+            name, dtype, size = COLUMN_HEADER.unpack_from(data, offset)
+            offset += COLUMN_HEADER.size
+            records[name.rstrip(b"\0").decode("ascii")] = np.frombuffer(
+                decompress(data[offset:offset + size]), dtype=dtype.rstrip(b"\0").decode("ascii"))
+            offset += size
+        chunks[stream].append(records)
+        dropped[STREAMS[stream][1]] += lost
+    result = {name: np.concatenate(chunks[stream]) if chunks[stream] else np.zeros(0, dtype)
+              for stream, name, dtype in STREAMS}
+    result["dropped"] = dropped
+    return result